@@ -0,0 +1,130 @@
+"""
+Benchmark IPFSService upload/fetch throughput against the local Pinata stand-in
+
+Starts pinata_standin.py in a subprocess (so its work does not share our event
+loop), points IPFSService at it and measures throughput and event-loop
+blocking time at increasing concurrency.
+
+Usage (from backend/):
+    python benchmarks/bench_ipfs.py [--size-kb 1024] [--concurrency 1,8,32] [--rounds 4]
+"""
+import argparse
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import aiohttp
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def _wait_until_ready(base_url: str, timeout: float = 10.0) -> None:
+    deadline = time.monotonic() + timeout
+    async with aiohttp.ClientSession() as session:
+        while time.monotonic() < deadline:
+            try:
+                async with session.get(f"{base_url}/data/testAuthentication") as response:
+                    if response.status == 200:
+                        return
+            except aiohttp.ClientError:
+                pass
+            await asyncio.sleep(0.1)
+    raise RuntimeError("Pinata stand-in did not start")
+
+
+def _report(label: str, total_bytes: int, count: int, elapsed: float, monitor) -> None:
+    mb_per_s = total_bytes / (1024 * 1024) / elapsed
+    print(
+        f"   {label:<8} {mb_per_s:8.1f} MB/s {count / elapsed:8.1f} req/s | {monitor.summary()}"
+    )
+
+
+async def run(args, base_url: str) -> None:
+    from benchmarks.loop_monitor import LoopLagMonitor
+    from services.ipfs import IPFSService
+
+    await _wait_until_ready(base_url)
+    ipfs = IPFSService()
+    size = args.size_kb * 1024
+
+    for concurrency in (int(c) for c in args.concurrency.split(",")):
+        count = concurrency * args.rounds
+        payloads = [os.urandom(size) for _ in range(count)]
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def upload(payload: bytes) -> str:
+            async with semaphore:
+                result = await ipfs.upload_to_pinata(payload, "bench.bin")
+                return result["cid"]
+
+        async def fetch(cid: str) -> bytes:
+            async with semaphore:
+                return await ipfs.fetch_from_ipfs(cid)
+
+        print(f"\n🚦 concurrency {concurrency} ({count} x {args.size_kb} KB)")
+
+        async with LoopLagMonitor() as monitor:
+            start = time.perf_counter()
+            cids = await asyncio.gather(*(upload(p) for p in payloads))
+            elapsed = time.perf_counter() - start
+        _report("upload", size * count, count, elapsed, monitor)
+
+        async with LoopLagMonitor() as monitor:
+            start = time.perf_counter()
+            contents = await asyncio.gather(*(fetch(cid) for cid in cids))
+            elapsed = time.perf_counter() - start
+        _report("fetch", size * count, count, elapsed, monitor)
+
+        assert contents == payloads, "fetched content differs from upload"
+
+    print(f"\n📊 Gateway stats: {ipfs.get_gateway_stats()}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--size-kb", type=int, default=1024)
+    parser.add_argument("--concurrency", default="1,8,32")
+    parser.add_argument("--rounds", type=int, default=4, help="Requests per worker")
+    parser.add_argument("--latency-ms", type=float, default=0.0,
+                        help="Artificial latency added by the stand-in")
+    args = parser.parse_args()
+
+    port = _free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    # Must be set before config is imported
+    os.environ["PINATA_API_URL"] = base_url
+    os.environ["PINATA_GATEWAY"] = base_url
+    os.environ["IPFS_GATEWAYS"] = ""
+
+    print("=" * 60)
+    print("📦 IPFSService Throughput Benchmark (local Pinata stand-in)")
+    print("=" * 60)
+
+    standin = subprocess.Popen(
+        [sys.executable, "pinata_standin.py", "--port", str(port),
+         "--latency-ms", str(args.latency_ms)],
+        cwd=BACKEND_DIR,
+        stdout=subprocess.DEVNULL,
+    )
+    try:
+        asyncio.run(run(args, base_url))
+    finally:
+        standin.terminate()
+        standin.wait()
+
+    print("\n" + "=" * 60)
+
+
+if __name__ == "__main__":
+    main()
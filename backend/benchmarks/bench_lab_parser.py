@@ -0,0 +1,125 @@
+"""
+Benchmark the lab-value scanner against the previous two-regex parser
+
+The legacy parser is reproduced here (regex passes only, without building
+LabValue models), so its numbers are a lower bound. Pathological inputs are
+run at doubling sizes until the legacy parser exceeds --limit seconds, which
+shows how its time grows while the scanner stays linear.
+
+Usage (from backend/):
+    python benchmarks/bench_lab_parser.py [--size-kb 100] [--repeat 5] [--limit 2]
+"""
+import argparse
+import random
+import re
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from services.ai_analysis import scan_lab_values
+
+LEGACY_PATTERNS = [
+    r"(\w+(?:\s+\w+)*)\s*:\s*([\d.]+)\s*(\w+/?%?)\s*\(Normal:\s*([\d.-]+)\)",
+    r"(\w+(?:\s+\w+)*)\s+([\d.]+)\s+(\w+/?%?)\s+([\d.-]+)",
+]
+
+LAB_LINES = [
+    "Hemoglobin: {v:.1f} g/dL (Normal: 13-17)",
+    "Glucose {v:.0f} mg/dL 70-110",
+    "WBC Count {v:.1f} 10^3/uL 4.0 - 10.0",
+    "Total Cholesterol: {v:.0f} mg/dL (<200)",
+    "Platelets: {v:.0f} x10^3/uL (Reference Range: 150-400)",
+]
+FILLER_LINES = [
+    "Patient Name: John Doe    Age/Sex: 45 Y / M",
+    "Sample collected on 12/03/2024 at City Diagnostics Laboratory",
+    "Method: Spectrophotometry. Results relate only to the sample tested.",
+    "*** End of report *** Page 1 of 2",
+    "Referring physician Dr. A. Kumar, MBBS MD",
+]
+
+
+def legacy_parse(text: str) -> int:
+    return sum(
+        1 for pattern in LEGACY_PATTERNS for _ in re.finditer(pattern, text, re.IGNORECASE)
+    )
+
+
+def ocr_like_text(size: int) -> str:
+    rng = random.Random(42)
+    lines = []
+    total = 0
+    while total < size:
+        if rng.random() < 0.4:
+            line = rng.choice(LAB_LINES).format(v=rng.uniform(5, 300))
+        else:
+            line = rng.choice(FILLER_LINES)
+        lines.append(line)
+        total += len(line) + 1
+    return "\n".join(lines)
+
+
+PATHOLOGICAL = {
+    "words, no colon": lambda n: "result " * (n // 7),
+    "one long token": lambda n: "a" * n,
+    "one long hyphenated token": lambda n: "a-" * (n // 2),
+    "labels, no values": lambda n: "Hemoglobin Level: " * (n // 18),
+    "numbers, no units": lambda n: "Value 1.2 3.4 5.6 " * (n // 18),
+}
+
+
+def best_time(func, text: str, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(text)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--size-kb", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--limit", type=float, default=2.0,
+                        help="Stop growing a pathological input once legacy exceeds this (s)")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("🧪 Lab Value Parser Benchmark")
+    print("=" * 60)
+
+    text = ocr_like_text(args.size_kb * 1024)
+    found = len(scan_lab_values(text))
+    legacy_found = legacy_parse(text)
+    legacy = best_time(legacy_parse, text, args.repeat)
+    scanner = best_time(scan_lab_values, text, args.repeat)
+    print(f"\n📄 {args.size_kb} KB OCR-like text")
+    print(f"   legacy:  {legacy * 1000:8.1f} ms  ({legacy_found} matches, overlapping)")
+    print(f"   scanner: {scanner * 1000:8.1f} ms  ({found} values)")
+
+    for name, make in PATHOLOGICAL.items():
+        print(f"\n💣 {name}")
+        size = 1024
+        legacy_done = False
+        while size <= args.size_kb * 1024:
+            sample = make(size)
+            scanner = best_time(scan_lab_values, sample, 1)
+            if legacy_done:
+                print(f"   {size // 1024:4d} KB  legacy:   (skipped)   scanner: {scanner * 1000:8.1f} ms")
+            else:
+                legacy = best_time(legacy_parse, sample, 1)
+                legacy_done = legacy > args.limit
+                print(
+                    f"   {size // 1024:4d} KB  legacy: {legacy * 1000:8.1f} ms  "
+                    f"scanner: {scanner * 1000:8.1f} ms"
+                )
+            size *= 2
+
+    print("\n" + "=" * 60)
+
+
+if __name__ == "__main__":
+    main()
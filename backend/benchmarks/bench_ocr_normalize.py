@@ -0,0 +1,170 @@
+"""
+Benchmark OCR latency and accuracy with and without image pre-normalisation
+
+Each sample is an image with its ground-truth text in a .txt file of the
+same name. Without --samples, phone-photo-like samples are synthesised
+(large RGB canvases with an EXIF rotation and known lab-report lines),
+plus an A4 scan of a bordered results table, whose column rules once made
+the whole page measure as a single text line.
+Accuracy is the character error rate (edit distance / reference length)
+after whitespace is collapsed.
+
+Requires Tesseract to be installed.
+
+Usage (from backend/):
+    python benchmarks/bench_ocr_normalize.py [--samples DIR] [--count 5] [--target-height 40]
+"""
+import argparse
+import io
+import random
+import sys
+import time
+from pathlib import Path
+
+from PIL import Image, ImageDraw, ImageFont
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from services.ocr_preprocess import normalize_for_ocr
+from services.ocr_worker import ocr_image
+
+REPORT_LINES = [
+    "Hemoglobin 13.5 g/dL 13.0-17.0",
+    "Total WBC Count 7200 /uL 4000-11000",
+    "Platelet Count 2.5 lakh/uL 1.5-4.0",
+    "Fasting Glucose 96 mg/dL 70-100",
+    "Serum Creatinine 0.9 mg/dL 0.7-1.3",
+    "Total Cholesterol 182 mg/dL <200",
+]
+
+
+def character_error_rate(reference: str, hypothesis: str) -> float:
+    reference = " ".join(reference.split())
+    hypothesis = " ".join(hypothesis.split())
+    if not reference:
+        return float(bool(hypothesis))
+    previous = list(range(len(hypothesis) + 1))
+    for i, ref_char in enumerate(reference, 1):
+        current = [i]
+        for j, hyp_char in enumerate(hypothesis, 1):
+            current.append(min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (ref_char != hyp_char),
+            ))
+        previous = current
+    return previous[-1] / len(reference)
+
+
+def synthesise_samples(count: int):
+    rng = random.Random(7)
+    try:
+        font = ImageFont.truetype("DejaVuSans.ttf", 72)
+    except OSError:
+        font = ImageFont.load_default(size=72)
+
+    for index in range(count):
+        lines = rng.sample(REPORT_LINES, 4)
+        image = Image.new("RGB", (4032, 3024), (rng.randint(225, 250),) * 3)
+        draw = ImageDraw.Draw(image)
+        for row, line in enumerate(lines):
+            draw.text((700, 900 + row * 140), line, fill=(20, 20, 30), font=font)
+
+        # Store it rotated with an EXIF orientation tag, like a phone camera
+        exif = image.getexif()
+        exif[0x0112] = 8
+        buffer = io.BytesIO()
+        image.rotate(-90, expand=True).save(buffer, "JPEG", quality=90, exif=exif)
+        yield f"synthetic_{index}.jpg", buffer.getvalue(), "\n".join(lines)
+
+    # Tesseract reads a ruled table column by column
+    cells = [line.rsplit(" ", 3) for line in REPORT_LINES]
+    yield "bordered_table.png", bordered_table(), "\n".join(row[i] for i in range(4) for row in cells)
+
+
+def bordered_table() -> bytes:
+    """300 dpi A4 scan of a results table with 4 px column and row rules"""
+    try:
+        font = ImageFont.truetype("DejaVuSans.ttf", 40)
+    except OSError:
+        font = ImageFont.load_default(size=40)
+
+    image = Image.new("L", (2480, 3508), 255)
+    draw = ImageDraw.Draw(image)
+    columns = [200, 1000, 1400, 1750, 2280]
+    top, row_height = 400, 90
+    bottom = top + row_height * len(REPORT_LINES)
+    for x in columns:
+        draw.rectangle((x, top, x + 3, bottom), fill=0)
+    for row in range(len(REPORT_LINES) + 1):
+        y = top + row * row_height
+        draw.rectangle((columns[0], y, columns[-1] + 3, y + 3), fill=0)
+
+    for row, line in enumerate(REPORT_LINES):
+        test, value, unit, reference = line.rsplit(" ", 3)
+        for x, cell in zip(columns, (test, value, unit, reference)):
+            draw.text((x + 30, top + row * row_height + 22), cell, fill=0, font=font)
+
+    buffer = io.BytesIO()
+    image.save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+def load_samples(directory: Path):
+    for path in sorted(directory.iterdir()):
+        if path.suffix.lower() not in (".png", ".jpg", ".jpeg"):
+            continue
+        truth = path.with_suffix(".txt")
+        if truth.exists():
+            yield path.name, path.read_bytes(), truth.read_text(encoding="utf-8")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--samples", type=Path, help="Directory of images with .txt ground truth")
+    parser.add_argument("--count", type=int, default=5, help="Synthetic samples if no --samples")
+    parser.add_argument("--target-height", type=int, default=40)
+    parser.add_argument("--crop-margin", type=int, default=16)
+    parser.add_argument("--show-size", action="store_true", help="Print the normalised image size")
+    args = parser.parse_args()
+
+    samples = list(load_samples(args.samples) if args.samples else synthesise_samples(args.count))
+    if not samples:
+        print("❌ No samples found")
+        return
+
+    print("=" * 60)
+    print(f"🖼️ OCR Pre-normalisation Benchmark ({len(samples)} samples)")
+    print("=" * 60)
+
+    totals = {"raw": [0.0, 0.0], "normalized": [0.0, 0.0]}
+    for name, content, truth in samples:
+        print(f"\n📄 {name}")
+        for mode, normalize in (("raw", False), ("normalized", True)):
+            start = time.perf_counter()
+            _, text, _ = ocr_image(
+                content,
+                grayscale=True,
+                normalize=normalize,
+                target_text_height=args.target_height,
+                crop_margin=args.crop_margin,
+            )
+            elapsed = time.perf_counter() - start
+            cer = character_error_rate(truth, text)
+            if normalize and args.show_size:
+                with Image.open(io.BytesIO(content)) as image:
+                    size = normalize_for_ocr(image, args.target_height, args.crop_margin).size
+                print(f"   normalised to {size[0]}x{size[1]}")
+            totals[mode][0] += elapsed
+            totals[mode][1] += cer
+            print(f"   {mode:<10} {elapsed * 1000:8.0f} ms   CER {cer:6.1%}")
+
+    print("\n📊 Mean")
+    for mode, (elapsed, cer) in totals.items():
+        print(f"   {mode:<10} {elapsed / len(samples) * 1000:8.0f} ms   CER {cer / len(samples):6.1%}")
+
+    print("\n" + "=" * 60)
+
+
+if __name__ == "__main__":
+    main()
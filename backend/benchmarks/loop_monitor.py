@@ -0,0 +1,55 @@
+"""
+Event-loop lag sampling shared by the benchmark scripts
+"""
+import asyncio
+import time
+
+
+class LoopLagMonitor:
+    """
+    Measures how long the event loop is blocked while a workload runs
+    A ticker sleeps for `interval` seconds; any extra delay before it wakes
+    up is time the loop spent running something else without yielding.
+    """
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.lags = []
+        self._task = None
+        self._stopped = False
+
+    async def _tick(self):
+        while not self._stopped:
+            start = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            self.lags.append(max(time.perf_counter() - start - self.interval, 0.0))
+
+    async def __aenter__(self):
+        self._task = asyncio.create_task(self._tick())
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self._stopped = True
+        await self._task
+
+    @property
+    def max_ms(self) -> float:
+        return max(self.lags, default=0.0) * 1000
+
+    @property
+    def p99_ms(self) -> float:
+        if not self.lags:
+            return 0.0
+        ordered = sorted(self.lags)
+        return ordered[min(int(0.99 * len(ordered)), len(ordered) - 1)] * 1000
+
+    @property
+    def blocked_ms(self) -> float:
+        """Total time the loop was late by more than one millisecond"""
+        return sum(lag for lag in self.lags if lag > 0.001) * 1000
+
+    def summary(self) -> str:
+        return (
+            f"loop lag max {self.max_ms:.1f} ms, p99 {self.p99_ms:.1f} ms, "
+            f"blocked {self.blocked_ms:.0f} ms"
+        )
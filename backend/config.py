@@ -53,16 +53,54 @@ class Settings(BaseSettings):
     pinata_api_key: str = os.getenv("PINATA_API_KEY", "")
     pinata_secret_api_key: str = os.getenv("PINATA_SECRET_API_KEY", "")
     pinata_jwt: str = os.getenv("PINATA_JWT", "")
+    pinata_api_url: str = os.getenv("PINATA_API_URL", "https://api.pinata.cloud")
     pinata_gateway: str = os.getenv(
         "PINATA_GATEWAY", "https://gateway.pinata.cloud"
     )
+    # Extra gateways raced after PINATA_GATEWAY (comma-separated, in order)
+    ipfs_gateways: str = os.getenv("IPFS_GATEWAYS", "https://ipfs.io,https://dweb.link")
+    ipfs_hedge_delay_ms: int = int(os.getenv("IPFS_HEDGE_DELAY_MS", "300"))
+    ipfs_fetch_timeout: int = int(os.getenv("IPFS_FETCH_TIMEOUT", "30"))
+    ipfs_cache_dir: str = os.getenv("IPFS_CACHE_DIR", ".ipfs_cache")
+    ipfs_cache_max_mb: int = int(os.getenv("IPFS_CACHE_MAX_MB", "512"))
 
     # AI Services
     model_api_url: str = os.getenv("MODEL_API_URL", "http://localhost:5000/analyze")
     model_api_key: str = os.getenv("MODEL_API_KEY", "")
 
+    # OCR
+    ocr_workers: int = int(os.getenv("OCR_WORKERS", str(os.cpu_count() or 2)))
+    ocr_dpi: int = int(os.getenv("OCR_DPI", "200"))
+    ocr_grayscale: bool = os.getenv("OCR_GRAYSCALE", "true").lower() == "true"
+    ocr_use_text_layer: bool = os.getenv("OCR_USE_TEXT_LAYER", "true").lower() == "true"
+    ocr_text_layer_min_chars: int = int(os.getenv("OCR_TEXT_LAYER_MIN_CHARS", "20"))
+    ocr_normalize_images: bool = os.getenv("OCR_NORMALIZE_IMAGES", "true").lower() == "true"
+    ocr_target_text_height: int = int(os.getenv("OCR_TARGET_TEXT_HEIGHT", "40"))
+    ocr_crop_margin: int = int(os.getenv("OCR_CROP_MARGIN", "16"))
+    # Same default file as the ML service, so neither OCRs a document the other already did
+    ocr_cache_path: str = os.getenv(
+        "OCR_CACHE_PATH",
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".ocr_cache", "ocr_results.sqlite3"),
+    )
+    ocr_batch_max_files: int = int(os.getenv("OCR_BATCH_MAX_FILES", "20"))
+
+    # Background jobs
+    job_workers: int = int(os.getenv("JOB_WORKERS", "2"))
+    job_queue_size: int = int(os.getenv("JOB_QUEUE_SIZE", "100"))
+    job_retention_seconds: int = int(os.getenv("JOB_RETENTION_SECONDS", "3600"))
+    job_store_path: str = os.getenv("JOB_STORE_PATH", ".jobs/jobs.sqlite3")
+
+    # Knowledge tables (drug interactions, symptom -> condition)
+    knowledge_data_dir: str = os.getenv(
+        "KNOWLEDGE_DATA_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+    )
+    knowledge_index_dir: str = os.getenv("KNOWLEDGE_INDEX_DIR", ".knowledge_index")
+
     # Encryption
     master_encryption_key: str = os.getenv("MASTER_ENCRYPTION_KEY", "")
+    cipher_cache_size: int = int(os.getenv("CIPHER_CACHE_SIZE", "256"))
+    crypto_workers: int = int(os.getenv("CRYPTO_WORKERS", "4"))
+    encryption_chunk_size: int = int(os.getenv("ENCRYPTION_CHUNK_SIZE", "1048576"))
 
     # CORS
     cors_origins: str = os.getenv(
@@ -80,6 +118,12 @@ class Settings(BaseSettings):
         """Get CORS origins as list"""
         return [origin.strip() for origin in self.cors_origins.split(",")]
     
+    @property
+    def ipfs_gateways_list(self) -> List[str]:
+        """Gateways to read from, Pinata's own gateway first"""
+        extra = [gw.strip() for gw in self.ipfs_gateways.split(",") if gw.strip()]
+        return [self.pinata_gateway] + [gw for gw in extra if gw != self.pinata_gateway]
+
     @property
     def allowed_file_types_list(self) -> List[str]:
         """Get allowed file types as list"""
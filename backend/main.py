@@ -3,10 +3,12 @@ MediBytes Backend - Main Application
 FastAPI server with blockchain integration, AI analysis, and IPFS storage
 """
 
-from fastapi import FastAPI, HTTPException, Depends, UploadFile, File, Form, status
+from fastapi import FastAPI, HTTPException, Depends, UploadFile, File, Form, Header, status
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-from typing import Optional, List
+from fastapi.responses import JSONResponse, StreamingResponse
+from typing import Any, Dict, Optional, List, Tuple
+from collections import OrderedDict
+import json
 import uvicorn
 import logging
 
@@ -14,10 +16,11 @@ PATIENT_BLOCKCHAIN_ADDRESS = "0xBeDdBdED049f68D005723d4077314Afe0d5D326f"
 from config import settings
 from services.auth import AuthService, get_current_user
 from services.blockchain import BlockchainService
-from services.ipfs import IPFSService
+from services.ipfs import DecryptedFile, IPFSService
 from services.ai_analysis import AIService
-from services.database import DatabaseService
+from services.database import DatabaseService, normalize_cid
 from services.model import ModelService
+from services.jobs import JobQueue, JobStore, QueueFullError
 from models import (
     PatientRegister,
     PatientLogin,
@@ -61,6 +64,12 @@ ipfs_service = IPFSService()
 ai_service = AIService()
 db_service = DatabaseService()
 model_service = ModelService()
+job_queue = JobQueue(
+    workers=settings.job_workers,
+    max_queued=settings.job_queue_size,
+    retention=settings.job_retention_seconds,
+    store=JobStore(settings.job_store_path) if settings.job_store_path else None,
+)
 
 
 # ============================================================================
@@ -86,7 +95,9 @@ async def health_check():
         "api": "healthy",
         "blockchain": blockchain_service.is_connected(),
         "ipfs": await ipfs_service.test_connection(),
+        "ipfs_gateways": ipfs_service.get_gateway_stats(),
         "database": await db_service.test_connection(),
+        "jobs": job_queue.stats(),
     }
 
 
@@ -208,7 +219,7 @@ async def verify_doctor_wallet(wallet_data: DoctorWalletVerify):
 # ============================================================================
 
 
-@app.post("/api/patient/upload-report")
+@app.post("/api/patient/upload-report", status_code=status.HTTP_202_ACCEPTED)
 async def upload_medical_report(
     file: UploadFile = File(...),
     report_type: str = Form(...),
@@ -216,12 +227,17 @@ async def upload_medical_report(
     facility: str = Form(...),
     extracted_text: Optional[str] = Form(None),
     symptoms: Optional[str] = Form(None),
+    wait: bool = Form(False),
     current_user: User = Depends(get_current_user),
 ):
     """
     Patient uploads medical report with extracted text
     Text is stored UNENCRYPTED in IPFS for doctor access
     Doctor can then approve to push to blockchain as medical record
+
+    OCR, analysis, IPFS uploads and the database insert run as a background
+    job; the response carries a job ID to follow at /api/jobs/{job_id}/events.
+    Pass wait=true to block until the job finishes and get its result instead.
     """
     try:
         if current_user.role != "patient":
@@ -237,86 +253,39 @@ async def upload_medical_report(
 
         logger.info(f"Processing upload for patient: {current_user.user_id}")
 
-        # Step 1: Use extracted text from frontend (from ML service)
-        # If not provided, extract it now
-        if not extracted_text:
-            extracted_text = await ai_service.extract_text_ocr(file_content, f".{file_extension}")
-            logger.info("✅ OCR extraction completed")
+        async def pipeline(progress):
+            return await _process_report_upload(
+                progress,
+                current_user,
+                file_content,
+                file.filename,
+                file_extension,
+                report_type,
+                report_date,
+                facility,
+                extracted_text,
+                symptoms,
+            )
 
-        # Step 2: AI health analysis
-        ai_insights_obj = await ai_service.analyze_health_data(extracted_text, report_type)
-        ai_insights = ai_insights_obj.model_dump() if hasattr(ai_insights_obj, 'model_dump') else ai_insights_obj.dict()
+        try:
+            job = await job_queue.submit(current_user.user_id, "upload-report", pipeline)
+        except QueueFullError as e:
+            raise HTTPException(status_code=503, detail=str(e))
 
-        # Step 3: Prepare data for IPFS storage (UNENCRYPTED)
-        # Store extracted text and metadata together
-        text_data = {
-            "extracted_text": extracted_text,
-            "report_type": report_type,
-            "report_date": report_date,
-            "facility": facility,
-            "symptoms": symptoms,
-            "patient_id": current_user.user_id,
-            "uploaded_at": str(__import__('datetime').datetime.utcnow().isoformat()),
-        }
-        
-        import json
-        text_json = json.dumps(text_data).encode('utf-8')
-
-        # Step 4: Upload extracted text to IPFS (UNENCRYPTED)
-        extracted_text_response = await ipfs_service.upload_to_pinata(
-            text_json,
-            filename=f"extracted_text_{report_type}.json",
-            metadata={
-                "patient_id": current_user.user_id,
-                "report_type": report_type,
-                "content_type": "extracted_text",
-            },
-        )
-        extracted_text_cid = extracted_text_response.get("cid") if isinstance(extracted_text_response, dict) else extracted_text_response
-        logger.info(f"✅ Extracted text uploaded to IPFS: {extracted_text_cid}")
-
-        # Step 5: Encrypt and upload original file to IPFS
-        patient_address = current_user.user_id
-        encrypted_data = ipfs_service.encrypt_file(file_content, patient_address)
-
-        file_response = await ipfs_service.upload_to_pinata(
-            encrypted_data,
-            filename=file.filename,
-            metadata={
-                "patient_address": patient_address,
-                "report_type": report_type,
-                "timestamp": report_date,
-                "content_type": "encrypted_file",
-            },
-        )
-        file_cid = file_response.get("cid") if isinstance(file_response, dict) else file_response
-        logger.info(f"✅ Original file uploaded to IPFS: {file_cid}")
-
-        # Step 6: Store in database (PENDING approval)
-        report_record = await db_service.create_pending_report(
-            patient_id=current_user.user_id,
-            document_hash="PENDING_DOCTOR_APPROVAL",
-            ipfs_cid=file_cid,  # Encrypted file
-            extracted_text_cid=extracted_text_cid,  # Unencrypted extracted text
-            report_type=report_type,
-            facility=facility,
-            report_date=report_date,
-            symptoms=symptoms,
-            extracted_text=extracted_text,  # Store in database too
-            ai_summary=ai_insights.get("summary", "AI analysis completed"),
-            risk_level=ai_insights.get("risk_level", "pending_analysis"),
-            patient_email=current_user.email,
-        )
+        if wait:
+            async for snapshot in job.watch():
+                pass
+            if snapshot["status"] == "failed":
+                raise HTTPException(status_code=500, detail=snapshot["error"])
+            return JSONResponse(status_code=200, content=snapshot["result"])
 
         return {
             "success": True,
-            "message": "Report uploaded successfully. Awaiting doctor approval.",
-            "report_id": report_record["id"],
-            "ipfs_cid": file_cid,  # Encrypted file
-            "extracted_text_cid": extracted_text_cid,  # Unencrypted text (for doctor)
-            "extracted_text_gateway_url": f"https://gateway.pinata.cloud/ipfs/{extracted_text_cid}",  # Doctor can access this
-            "ai_insights": ai_insights,
-            "status": "PENDING_DOCTOR_APPROVAL",
+            "message": "Report received. Processing in background.",
+            "job_id": job.id,
+            "status_url": f"/api/jobs/{job.id}",
+            "events_url": f"/api/jobs/{job.id}/events",
+            "status": job.status,
         }
 
     except HTTPException:
@@ -326,6 +295,106 @@ async def upload_medical_report(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+async def _process_report_upload(
+    progress,
+    current_user: User,
+    file_content: bytes,
+    filename: str,
+    file_extension: str,
+    report_type: str,
+    report_date: str,
+    facility: str,
+    extracted_text: Optional[str],
+    symptoms: Optional[str],
+) -> dict:
+    """Background stages of upload-report; returns the upload result"""
+    # Step 1: Use extracted text from frontend (from ML service)
+    # If not provided, extract it now
+    if not extracted_text:
+        await progress("ocr")
+        extracted_text = await ai_service.extract_text_ocr(file_content, f".{file_extension}")
+        logger.info("✅ OCR extraction completed")
+
+    # Step 2: AI health analysis
+    await progress("analysis")
+    ai_insights_obj = await ai_service.analyze_health_data(extracted_text, report_type)
+    ai_insights = ai_insights_obj.model_dump() if hasattr(ai_insights_obj, 'model_dump') else ai_insights_obj.dict()
+
+    # Step 3: Prepare data for IPFS storage (UNENCRYPTED)
+    # Store extracted text and metadata together
+    text_data = {
+        "extracted_text": extracted_text,
+        "report_type": report_type,
+        "report_date": report_date,
+        "facility": facility,
+        "symptoms": symptoms,
+        "patient_id": current_user.user_id,
+        "uploaded_at": str(__import__('datetime').datetime.utcnow().isoformat()),
+    }
+    
+    text_json = json.dumps(text_data).encode('utf-8')
+
+    # Step 4: Upload extracted text to IPFS (UNENCRYPTED)
+    await progress("ipfs_text")
+    extracted_text_response = await ipfs_service.upload_to_pinata(
+        text_json,
+        filename=f"extracted_text_{report_type}.json",
+        metadata={
+            "patient_id": current_user.user_id,
+            "report_type": report_type,
+            "content_type": "extracted_text",
+        },
+    )
+    extracted_text_cid = extracted_text_response.get("cid") if isinstance(extracted_text_response, dict) else extracted_text_response
+    logger.info(f"✅ Extracted text uploaded to IPFS: {extracted_text_cid}")
+
+    # Step 5: Encrypt and upload original file to IPFS
+    await progress("ipfs_file")
+    patient_address = current_user.user_id
+    encrypted_data = await ipfs_service.encrypt_file_async(file_content, patient_address)
+
+    file_response = await ipfs_service.upload_to_pinata(
+        encrypted_data,
+        filename=filename,
+        metadata={
+            "patient_address": patient_address,
+            "report_type": report_type,
+            "timestamp": report_date,
+            "content_type": "encrypted_file",
+        },
+    )
+    file_cid = file_response.get("cid") if isinstance(file_response, dict) else file_response
+    logger.info(f"✅ Original file uploaded to IPFS: {file_cid}")
+
+    # Step 6: Store in database (PENDING approval)
+    await progress("database")
+    report_record = await db_service.create_pending_report(
+        patient_id=current_user.user_id,
+        document_hash="PENDING_DOCTOR_APPROVAL",
+        ipfs_cid=file_cid,  # Encrypted file
+        extracted_text_cid=extracted_text_cid,  # Unencrypted extracted text
+        report_type=report_type,
+        facility=facility,
+        report_date=report_date,
+        symptoms=symptoms,
+        extracted_text=extracted_text,  # Store in database too
+        ai_summary=ai_insights.get("summary", "AI analysis completed"),
+        risk_level=ai_insights.get("risk_level", "pending_analysis"),
+        patient_email=current_user.email,
+    )
+
+    return {
+        "success": True,
+        "message": "Report uploaded successfully. Awaiting doctor approval.",
+        "report_id": report_record["id"],
+        "ipfs_cid": file_cid,  # Encrypted file
+        "extracted_text_cid": extracted_text_cid,  # Unencrypted text (for doctor)
+        "extracted_text_gateway_url": f"{settings.pinata_gateway}/ipfs/{extracted_text_cid}",  # Doctor can access this
+        "ai_insights": ai_insights,
+        "status": "PENDING_DOCTOR_APPROVAL",
+    }
+
+
 @app.get("/api/patient/reports")
 async def get_patient_reports(current_user: User = Depends(get_current_user)):
     """Get all reports for logged-in patient with IPFS gateway URLs"""
@@ -338,20 +407,10 @@ async def get_patient_reports(current_user: User = Depends(get_current_user)):
         # Add IPFS gateway URLs to each report
         for report in pending_reports:
             # Handle both old format (JSON string) and new format (plain CID)
-            cid = report.get("ipfs_cid")
+            cid = normalize_cid(report.get("ipfs_cid"))
             if cid:
-                # If it's a dict or JSON string, extract the CID
-                if isinstance(cid, dict):
-                    cid = cid.get("cid")
-                elif isinstance(cid, str) and cid.startswith("{"):
-                    try:
-                        import json
-                        cid = json.loads(cid).get("cid")
-                    except:
-                        pass  # Keep original if parsing fails
-                
                 report["ipfs_cid"] = cid
-                report["ipfs_gateway_url"] = f"https://gateway.pinata.cloud/ipfs/{cid}"
+                report["ipfs_gateway_url"] = f"{settings.pinata_gateway}/ipfs/{cid}"
         
         # ✅ CRITICAL: Use the SAME hardcoded address that's used during doctor approval
         # This ensures records can be found on blockchain
@@ -429,6 +488,213 @@ async def get_patient_reports(current_user: User = Depends(get_current_user)):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.get("/api/reports/{cid}/file")
+async def download_report_file(
+    cid: str,
+    range_header: Optional[str] = Header(None, alias="Range"),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Stream the original report file, decrypted
+    Fetches the encrypted file through the local IPFS cache and supports
+    single HTTP byte ranges so viewers can page through large PDFs
+    """
+    try:
+        report = await db_service.get_report_by_cid(cid)
+        if not report:
+            raise HTTPException(status_code=404, detail="Report not found")
+
+        if current_user.role == "patient":
+            if report["patient_id"] != current_user.user_id:
+                raise HTTPException(status_code=403, detail="Access denied")
+        elif current_user.role != "doctor":
+            raise HTTPException(status_code=403, detail="Access denied")
+
+        # Files are encrypted with the uploading patient's ID (see upload-report).
+        # The file stays open until the response is done, so cache eviction
+        # cannot remove it mid-stream.
+        decrypted = await ipfs_service.open_cached(cid, report["patient_id"])
+        try:
+            total_size = decrypted.size
+            byte_range = _parse_range_header(range_header, total_size)
+            start, end = byte_range or (0, total_size - 1)
+            media_type = await _report_media_type(cid, decrypted)
+        except BaseException:
+            decrypted.close()
+            raise
+
+        async def body():
+            try:
+                async for part in decrypted.iter_range(start, end):
+                    yield part
+            finally:
+                decrypted.close()
+
+        headers = {
+            "Accept-Ranges": "bytes",
+            "Content-Length": str(max(end - start + 1, 0)),
+        }
+        if byte_range:
+            headers["Content-Range"] = f"bytes {start}-{end}/{total_size}"
+
+        return StreamingResponse(
+            body(),
+            status_code=206 if byte_range else 200,
+            media_type=media_type,
+            headers=headers,
+        )
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Report download failed: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+def _parse_range_header(
+    range_header: Optional[str], total_size: int
+) -> Optional[Tuple[int, int]]:
+    """
+    Parse a single "bytes=" range into an inclusive (start, end) pair
+    Returns None when the whole file should be served
+    """
+    if not range_header or not range_header.startswith("bytes=") or "," in range_header:
+        return None
+
+    start_text, _, end_text = range_header[len("bytes="):].strip().partition("-")
+    try:
+        if start_text:
+            start = int(start_text)
+            end = int(end_text) if end_text else total_size - 1
+        else:
+            # Suffix range: last N bytes
+            start = max(total_size - int(end_text), 0)
+            end = total_size - 1
+    except ValueError:
+        return None
+
+    if start >= total_size or start > end:
+        raise HTTPException(
+            status_code=416,
+            detail="Requested range not satisfiable",
+            headers={"Content-Range": f"bytes */{total_size}"},
+        )
+    return start, min(end, total_size - 1)
+
+
+# Media type per report CID; CIDs are content addresses, so it never changes
+# and only the first download of a file decrypts its first chunk to sniff it
+_MEDIA_TYPE_CACHE_SIZE = 4096
+_media_types: "OrderedDict[str, str]" = OrderedDict()
+
+
+async def _report_media_type(cid: str, decrypted: DecryptedFile) -> str:
+    media_type = _media_types.get(cid)
+    if media_type is None:
+        media_type = _sniff_media_type(await decrypted.read(0, 7))
+        _media_types[cid] = media_type
+        if len(_media_types) > _MEDIA_TYPE_CACHE_SIZE:
+            _media_types.popitem(last=False)
+    else:
+        _media_types.move_to_end(cid)
+    return media_type
+
+
+def _sniff_media_type(head: bytes) -> str:
+    """Guess media type of a decrypted report from its leading bytes"""
+    if head.startswith(b"%PDF"):
+        return "application/pdf"
+    if head.startswith(b"\x89PNG"):
+        return "image/png"
+    if head.startswith(b"\xff\xd8"):
+        return "image/jpeg"
+    return "application/octet-stream"
+
+
+# ============================================================================
+# OCR
+# ============================================================================
+
+
+@app.post("/api/ocr/batch")
+async def ocr_batch(
+    files: List[UploadFile] = File(...),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    OCR several documents in one call, streamed back as NDJSON
+    Pages of all documents are scheduled across the OCR worker pool and each
+    line is sent as soon as its page finishes (see AIService.iter_ocr_batch)
+    """
+    if len(files) > settings.ocr_batch_max_files:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {settings.ocr_batch_max_files} files per batch",
+        )
+
+    documents = []
+    for file in files:
+        file_content = await file.read()
+        if len(file_content) > settings.max_file_size_mb * 1024 * 1024:
+            raise HTTPException(status_code=413, detail=f"File too large: {file.filename}")
+
+        file_extension = (file.filename or "").split(".")[-1].lower()
+        if file_extension not in settings.allowed_file_types_list:
+            raise HTTPException(status_code=400, detail=f"Invalid file type: {file.filename}")
+
+        documents.append((file.filename, file_content, f".{file_extension}"))
+
+    logger.info(f"Batch OCR of {len(documents)} document(s) for {current_user.user_id}")
+
+    async def results():
+        async for event in ai_service.iter_ocr_batch(documents):
+            yield json.dumps(event) + "\n"
+
+    return StreamingResponse(
+        results(),
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+# ============================================================================
+# Background Jobs
+# ============================================================================
+
+
+async def _get_owned_job(job_id: str, current_user: User) -> Dict[str, Any]:
+    """Job lookup (in any uvicorn worker) that hides other users' jobs"""
+    job = await job_queue.lookup(job_id)
+    if job is None or job["owner"] != current_user.user_id:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job["snapshot"]
+
+
+@app.get("/api/jobs/{job_id}")
+async def get_job_status(job_id: str, current_user: User = Depends(get_current_user)):
+    """Current status, stage timings and (once finished) result of a job"""
+    return await _get_owned_job(job_id, current_user)
+
+
+@app.get("/api/jobs/{job_id}/events")
+async def stream_job_events(job_id: str, current_user: User = Depends(get_current_user)):
+    """
+    Server-Sent Events stream of job progress
+    One event per status/stage change; the stream ends when the job does
+    """
+    await _get_owned_job(job_id, current_user)
+
+    async def events():
+        async for snapshot in job_queue.watch(job_id):
+            yield f"event: {snapshot['status']}\ndata: {json.dumps(snapshot)}\n\n"
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 # ============================================================================
 # Doctor Operations
 # ============================================================================
@@ -447,20 +713,10 @@ async def get_doctor_pending_approvals(current_user: User = Depends(get_current_
         # Add IPFS gateway URLs and fetch patient info
         for report in pending_reports:
             # Handle both old format (JSON string) and new format (plain CID)
-            cid = report.get("ipfs_cid")
+            cid = normalize_cid(report.get("ipfs_cid"))
             if cid:
-                # If it's a dict or JSON string, extract the CID
-                if isinstance(cid, dict):
-                    cid = cid.get("cid")
-                elif isinstance(cid, str) and cid.startswith("{"):
-                    try:
-                        import json
-                        cid = json.loads(cid).get("cid")
-                    except:
-                        pass  # Keep original if parsing fails
-                
                 report["ipfs_cid"] = cid
-                report["ipfs_gateway_url"] = f"https://gateway.pinata.cloud/ipfs/{cid}"
+                report["ipfs_gateway_url"] = f"{settings.pinata_gateway}/ipfs/{cid}"
             
             # Fetch patient name from patients table
             try:
@@ -1053,7 +1309,7 @@ async def register_organ_donor(
             "data": {
                 "patient_id": patient_id,
                 "ipfs_cid": ipfs_cid,
-                "ipfs_url": f"https://gateway.pinata.cloud/ipfs/{ipfs_cid}",
+                "ipfs_url": f"{settings.pinata_gateway}/ipfs/{ipfs_cid}",
             },
         }
 
@@ -1112,7 +1368,7 @@ async def search_organ_donors(
                 {
                     **donor,
                     "compatibility_score": round(compatibility_score, 2),
-                    "ipfs_url": f"https://gateway.pinata.cloud/ipfs/{donor['ipfs_cid']}",
+                    "ipfs_url": f"{settings.pinata_gateway}/ipfs/{donor['ipfs_cid']}",
                 }
             )
 
@@ -1152,7 +1408,7 @@ async def get_donor_details(
             raise HTTPException(status_code=404, detail="Donor not found")
 
         # Add IPFS URL
-        donor["ipfs_url"] = f"https://gateway.pinata.cloud/ipfs/{donor['ipfs_cid']}"
+        donor["ipfs_url"] = f"{settings.pinata_gateway}/ipfs/{donor['ipfs_cid']}"
 
         logger.info(f"✅ Retrieved donor details: {patient_id}")
         return {"success": True, "donor": donor}
@@ -0,0 +1,179 @@
+"""
+Local Pinata stand-in for offline development, tests and benchmarks
+Implements the subset of the Pinata API and gateway that IPFSService uses,
+keeping pinned content in memory.
+
+Usage (from backend/):
+    python pinata_standin.py --port 8765 [--latency-ms 0]
+
+Then point the backend at it:
+    PINATA_API_URL=http://127.0.0.1:8765
+    PINATA_GATEWAY=http://127.0.0.1:8765
+    IPFS_GATEWAYS=
+"""
+from typing import Dict, Any
+from datetime import datetime
+import argparse
+import asyncio
+import base64
+import hashlib
+import json
+
+from aiohttp import web
+
+# Kept independent of the services package so the stand-in runs without
+# any backend configuration (Supabase, blockchain, ...)
+UNIXFS_BLOCK_SIZE = 262144
+_BASE58_ALPHABET = "123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz"
+
+
+def _base58_encode(data: bytes) -> str:
+    number = int.from_bytes(data, "big")
+    encoded = ""
+    while number:
+        number, remainder = divmod(number, 58)
+        encoded = _BASE58_ALPHABET[remainder] + encoded
+    leading_zeros = len(data) - len(data.lstrip(b"\x00"))
+    return "1" * leading_zeros + encoded
+
+
+def _varint(value: int) -> bytes:
+    out = bytearray()
+    while value > 0x7F:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+    return bytes(out)
+
+
+def _unixfs_file_block(content: bytes) -> bytes:
+    """dag-pb node kubo builds for a file that fits in one chunk"""
+    unixfs = b"\x08\x02"
+    if content:
+        unixfs += b"\x12" + _varint(len(content)) + content
+    unixfs += b"\x18" + _varint(len(content))
+    return b"\x0a" + _varint(len(unixfs)) + unixfs
+
+
+def compute_cid(content: bytes) -> str:
+    """
+    CID the stand-in assigns to content
+    Single-block files get the CIDv0 kubo would produce; larger files get a
+    raw-codec CIDv1 so IPFSService can still verify them.
+    """
+    if len(content) <= UNIXFS_BLOCK_SIZE:
+        digest = hashlib.sha256(_unixfs_file_block(content)).digest()
+        return _base58_encode(b"\x12\x20" + digest)
+
+    digest = hashlib.sha256(content).digest()
+    cid_bytes = b"\x01\x55\x12\x20" + digest
+    return "b" + base64.b32encode(cid_bytes).decode().lower().rstrip("=")
+
+
+class PinataStandin:
+    """In-memory pin store behind aiohttp routes"""
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.content: Dict[str, bytes] = {}
+        self.pins: Dict[str, Dict[str, Any]] = {}
+
+    def _pin(self, content: bytes, metadata: Dict[str, Any]) -> Dict[str, Any]:
+        cid = compute_cid(content)
+        self.content[cid] = content
+        timestamp = datetime.utcnow().isoformat() + "Z"
+        self.pins[cid] = {
+            "ipfs_pin_hash": cid,
+            "size": len(content),
+            "date_pinned": timestamp,
+            "metadata": {
+                "name": metadata.get("name"),
+                "keyvalues": metadata.get("keyvalues") or {},
+            },
+        }
+        return {"IpfsHash": cid, "PinSize": len(content), "Timestamp": timestamp}
+
+    async def _delay(self) -> None:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+    async def test_authentication(self, request: web.Request) -> web.Response:
+        return web.json_response({"message": "Congratulations! You are communicating with the Pinata API!"})
+
+    async def pin_file(self, request: web.Request) -> web.Response:
+        await self._delay()
+        content = b""
+        metadata: Dict[str, Any] = {}
+        reader = await request.multipart()
+        async for part in reader:
+            if part.name == "file":
+                content = await part.read(decode=False)
+                metadata.setdefault("name", part.filename)
+            elif part.name == "pinataMetadata":
+                metadata.update(json.loads(await part.text()))
+        return web.json_response(self._pin(bytes(content), metadata))
+
+    async def pin_json(self, request: web.Request) -> web.Response:
+        await self._delay()
+        body = await request.json()
+        content = json.dumps(body.get("pinataContent")).encode("utf-8")
+        return web.json_response(self._pin(content, body.get("pinataMetadata") or {}))
+
+    async def pin_by_hash(self, request: web.Request) -> web.Response:
+        await self._delay()
+        cid = (await request.json()).get("hashToPin")
+        if cid not in self.content:
+            return web.json_response({"error": "CID not found"}, status=404)
+        self.pins.setdefault(cid, {
+            "ipfs_pin_hash": cid,
+            "size": len(self.content[cid]),
+            "date_pinned": datetime.utcnow().isoformat() + "Z",
+            "metadata": {"name": None, "keyvalues": {}},
+        })
+        return web.json_response({"id": cid, "ipfsHash": cid, "status": "pinned"})
+
+    async def unpin(self, request: web.Request) -> web.Response:
+        await self._delay()
+        if self.pins.pop(request.match_info["cid"], None) is None:
+            return web.Response(text="Not found", status=404)
+        return web.Response(text="OK")
+
+    async def pin_list(self, request: web.Request) -> web.Response:
+        await self._delay()
+        limit = min(int(request.query.get("pageLimit", 10)), 1000)
+        offset = int(request.query.get("pageOffset", 0))
+        rows = list(self.pins.values())
+        return web.json_response({"count": len(rows), "rows": rows[offset : offset + limit]})
+
+    async def gateway(self, request: web.Request) -> web.Response:
+        await self._delay()
+        content = self.content.get(request.match_info["cid"])
+        if content is None:
+            return web.Response(text="Not found", status=404)
+        return web.Response(body=content, content_type="application/octet-stream")
+
+
+def create_app(latency: float = 0.0) -> web.Application:
+    standin = PinataStandin(latency)
+    app = web.Application(client_max_size=1024 ** 3)
+    app["standin"] = standin
+    app.router.add_get("/data/testAuthentication", standin.test_authentication)
+    app.router.add_post("/pinning/pinFileToIPFS", standin.pin_file)
+    app.router.add_post("/pinning/pinJSONToIPFS", standin.pin_json)
+    app.router.add_post("/pinning/pinByHash", standin.pin_by_hash)
+    app.router.add_delete("/pinning/unpin/{cid}", standin.unpin)
+    app.router.add_get("/data/pinList", standin.pin_list)
+    app.router.add_get("/ipfs/{cid}", standin.gateway)
+    return app
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local Pinata stand-in")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=0.0,
+                        help="Artificial delay added to every request")
+    args = parser.parse_args()
+
+    print(f"📌 Pinata stand-in on http://{args.host}:{args.port}")
+    web.run_app(create_app(args.latency_ms / 1000), host=args.host, port=args.port, print=None)
@@ -0,0 +1,58 @@
+"""
+Reconcile Pinata pins with the database
+Reports pins that no pending_reports / organ_donor_data row references.
+
+Usage (from backend/):
+    python reconcile_pins.py                 # dry run, report only
+    python reconcile_pins.py --apply         # unpin orphans in batches
+"""
+import argparse
+import asyncio
+
+from services.ipfs import IPFSService
+from services.database import DatabaseService
+from services.pin_reconciler import PinReconciler
+
+
+async def main(args):
+    print("=" * 60)
+    print("📌 Pinata Pin Reconciliation" + ("" if args.apply else " (dry run)"))
+    print("=" * 60)
+
+    reconciler = PinReconciler(
+        IPFSService(),
+        DatabaseService(),
+        grace_hours=args.grace_hours,
+        batch_size=args.batch_size,
+    )
+    report = await reconciler.run(dry_run=not args.apply)
+
+    print(f"\n   📊 Pinned CIDs:        {report['pinned']}")
+    print(f"   🗄️  Referenced in DB:   {report['referenced']}")
+    print(f"   🧹 Orphaned pins:      {len(report['orphaned'])} "
+          f"({report['orphaned_bytes'] / (1024 * 1024):.1f} MB)")
+    print(f"   ⏳ Skipped (recent):   {report['skipped_recent']}")
+    print(f"   ⚠️  Referenced, unpinned: {report['missing_pins']}")
+
+    if args.verbose:
+        for cid in report["orphaned"]:
+            print(f"      - {cid}")
+
+    if args.apply:
+        print(f"\n   ✅ Unpinned: {report['unpinned']}")
+        if report["failed"]:
+            print(f"   ❌ Failed:   {len(report['failed'])}")
+            for cid in report["failed"]:
+                print(f"      - {cid}")
+
+    print("\n" + "=" * 60)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Reconcile Pinata pins with the database")
+    parser.add_argument("--apply", action="store_true", help="Unpin orphaned files")
+    parser.add_argument("--grace-hours", type=int, default=24,
+                        help="Never unpin files pinned more recently than this")
+    parser.add_argument("--batch-size", type=int, default=25)
+    parser.add_argument("--verbose", action="store_true", help="List orphaned CIDs")
+    asyncio.run(main(parser.parse_args()))
@@ -3,23 +3,122 @@ MediBytes Backend - AI Analysis Service
 Handles OCR extraction (AI analysis integrated by separate team)
 """
 
-from typing import Dict, Any, List, Optional
-import io
+from typing import Dict, Any, List, Optional, AsyncIterator, Tuple
+from collections import deque
+from contextlib import aclosing
+from concurrent.futures import ProcessPoolExecutor
+import asyncio
+import os
+import tempfile
+import time
 from datetime import datetime
+import json
 import re
-import pytesseract
-from PIL import Image
 import pdf2image
-import os
 
 from config import settings
 from models import LabValue, AIInsights
-
-# Configure Tesseract path for Windows
-if os.name == 'nt':  # Windows
-    tesseract_path = r'C:\Program Files\Tesseract-OCR\tesseract.exe'
-    if os.path.exists(tesseract_path):
-        pytesseract.pytesseract.tesseract_cmd = tesseract_path
+from services import ocr_worker
+from services.ocr_cache import OCRCache, document_hash
+from services.knowledge import KnowledgeBase
+
+# Bump when OCR output would change for the same input and settings
+OCR_ENGINE_VERSION = "tesseract-1"
+
+# One lab result per match, e.g. "Hemoglobin: 12.5 g/dL (Normal: 13-17)" or
+# "Glucose 95 mg/dL 70-110". The parameter name only starts at the beginning
+# of a token (not after a letter, digit, hyphen or the slash of a unit, though
+# leading hyphens of a bullet are skipped), stays on one line and is at most
+# five words; words after the first may carry a "25-" style qualifier, as in
+# "Vitamin D 25-OH". Each token is therefore tried from one position only:
+# with a plain \b, every hyphen in "a-b-c-..." would be a new start that
+# rescans the rest of the token, which is quadratic in the token length.
+# Numbers are never split: the value must not be followed by more digits, and
+# a bare range must be set off by whitespace, so "150-450" is not 15 + 0-450.
+_NUMBER = r"\d+(?:\.\d+)?"
+_LAB_VALUE_PATTERN = re.compile(
+    rf"""
+    (?<![\w\-/])-*(?P<parameter>[A-Za-z][\w\-]*(?:[ \t]+(?:\d+-)?[A-Za-z][\w\-]*){{0,4}})
+    (?:[ \t]*:[ \t]*|[ \t]+)
+    (?P<value>{_NUMBER})(?!\.?\d)
+    (?:[ \t]*(?P<unit>%|(?:10\^\d+|[A-Za-z\u00b5\u03bc][\w\u00b5\u03bc^*.]*)(?:/[\w\u00b5\u03bc^*.]+)*))?
+    [ \t]*
+    (?:
+        \([ \t]*(?:(?:normal|ref(?:erence)?|range)[ \t]*(?:range)?[ \t]*:?[ \t]*)?
+        (?P<paren_range>{_NUMBER}[ \t]*-[ \t]*{_NUMBER}|[<>]=?[ \t]*{_NUMBER}|{_NUMBER})
+        [ \t]*\)
+      |
+        (?<=[ \t(])(?P<range>{_NUMBER}[ \t]*-[ \t]*{_NUMBER}|[<>]=?[ \t]*{_NUMBER})(?!\.?\d)
+    )
+    """,
+    re.IGNORECASE | re.VERBOSE,
+)
+_RANGE_BOUNDS = re.compile(rf"(?P<low>{_NUMBER})\s*-\s*(?P<high>{_NUMBER})|(?P<op>[<>])=?\s*(?P<bound>{_NUMBER})")
+
+
+def _lab_status(value: float, normal_range: str) -> str:
+    """Compare a value against "low-high", "<x" or ">x"; anything else is normal"""
+    bounds = _RANGE_BOUNDS.fullmatch(normal_range)
+    if bounds is None:
+        return "normal"
+    if bounds.group("low") is not None:
+        if value < float(bounds.group("low")):
+            return "low"
+        if value > float(bounds.group("high")):
+            return "high"
+        return "normal"
+    bound = float(bounds.group("bound"))
+    if bounds.group("op") == "<":
+        return "high" if value >= bound else "normal"
+    return "low" if value <= bound else "normal"
+
+
+# Section headers of the prompt's line format, e.g. "RISK_LEVEL: high" or
+# "**SUMMARY:**"; only recognised at the start of a line
+_SECTION_HEADER = re.compile(
+    r"^[ \t]*[*#]*[ \t]*(RISK_LEVEL|SUMMARY|ABNORMAL_VALUES|RISK_FACTORS|RECOMMENDATIONS|FOLLOW_UP)"
+    r"[ \t]*[*]*[ \t]*:[ \t]*[*]*",
+    re.IGNORECASE | re.MULTILINE,
+)
+_LIST_ITEM = re.compile(r"^[ \t]*(?:[-*\u2022]|\d+[.)])[ \t]+(.+?)[ \t]*$", re.MULTILINE)
+_CODE_FENCE = re.compile(r"^```(?:json)?[ \t]*\n?|\n?```[ \t]*$", re.IGNORECASE)
+
+
+def _iter_sections(text: str):
+    """Yield (SECTION, body) pairs, walking the response once"""
+    headers = list(_SECTION_HEADER.finditer(text))
+    for i, header in enumerate(headers):
+        end = headers[i + 1].start() if i + 1 < len(headers) else len(text)
+        yield header.group(1).upper(), text[header.end():end].strip()
+
+
+def _list_items(value: Any) -> List[str]:
+    """Bulleted/numbered lines (or a JSON list) as plain strings"""
+    if isinstance(value, list):
+        return [str(item).strip() for item in value if str(item).strip()]
+    if not value:
+        return []
+    text = str(value)
+    items = _LIST_ITEM.findall(text)
+    return items or [text.strip()]
+
+
+def scan_lab_values(text: str) -> List[LabValue]:
+    """Extract lab values in one pass; matches never overlap, so none repeat"""
+    lab_values = []
+    for match in _LAB_VALUE_PATTERN.finditer(text):
+        normal_range = match.group("paren_range") or match.group("range")
+        value = match.group("value")
+        lab_values.append(
+            LabValue(
+                parameter=match.group("parameter"),
+                value=value,
+                unit=match.group("unit") or "",
+                normal_range=normal_range,
+                status=_lab_status(float(value), normal_range),
+            )
+        )
+    return lab_values
 
 
 class AIService:
@@ -28,11 +127,24 @@ class AIService:
     def __init__(self):
         # AI analysis will be integrated by teammate
         self.ai_enabled = False
+        self._ocr_executor: Optional[ProcessPoolExecutor] = None
+        self._ocr_cache = OCRCache(settings.ocr_cache_path) if settings.ocr_cache_path else None
+        self._ocr_locks: Dict[str, asyncio.Lock] = {}
+        self._knowledge: Optional[KnowledgeBase] = None
 
     # ========================================================================
     # OCR - Extract Text from Medical Documents
     # ========================================================================
 
+    def _get_ocr_executor(self) -> ProcessPoolExecutor:
+        """Create the OCR process pool on first use"""
+        if self._ocr_executor is None:
+            self._ocr_executor = ProcessPoolExecutor(
+                max_workers=max(1, settings.ocr_workers),
+                initializer=ocr_worker.init_worker,
+            )
+        return self._ocr_executor
+
     async def extract_text_ocr(
         self, file_content: bytes, file_extension: str
     ) -> str:
@@ -41,31 +153,432 @@ class AIService:
         Supports: PDF, PNG, JPG, JPEG
         """
         try:
-            extracted_text = ""
+            result = await self.extract_text_ocr_detailed(file_content, file_extension)
+            return result["text"]
+
+        except Exception as e:
+            print(f"❌ OCR extraction failed: {e}")
+            return f"OCR Error: {str(e)}"
 
-            # Handle PDF files
-            if file_extension.lower() == ".pdf":
-                # Convert PDF to images
-                images = pdf2image.convert_from_bytes(file_content)
+    def _ocr_engine_tag(self) -> str:
+        """Engine and settings that determine OCR output, part of the cache key"""
+        return (
+            f"{OCR_ENGINE_VERSION}:dpi={settings.ocr_dpi}"
+            f":gray={int(settings.ocr_grayscale)}"
+            f":text_layer={int(settings.ocr_use_text_layer)}/{settings.ocr_text_layer_min_chars}"
+            f":normalize={int(settings.ocr_normalize_images)}"
+            f"/{settings.ocr_target_text_height}/{settings.ocr_crop_margin}"
+        )
+
+    async def extract_text_ocr_detailed(
+        self, file_content: bytes, file_extension: str
+    ) -> Dict[str, Any]:
+        """
+        OCR a document, reusing the cached result for identical documents
+        Returns the combined text plus per-page text, timings and source
+        """
+        if self._ocr_cache is None:
+            return await self._run_ocr(file_content, file_extension)
 
-                # OCR each page
-                for i, image in enumerate(images):
-                    page_text = pytesseract.image_to_string(image)
-                    extracted_text += f"\n--- Page {i+1} ---\n{page_text}"
+        sha256 = await asyncio.to_thread(document_hash, file_content)
+        engine = self._ocr_engine_tag()
 
-            # Handle image files
-            elif file_extension.lower() in [".png", ".jpg", ".jpeg"]:
-                image = Image.open(io.BytesIO(file_content))
-                extracted_text = pytesseract.image_to_string(image)
+        # Concurrent requests for the same document share one OCR run
+        lock = self._ocr_locks.setdefault(sha256, asyncio.Lock())
+        try:
+            async with lock:
+                cached = await asyncio.to_thread(self._ocr_cache.get, sha256, engine)
+                if cached is not None:
+                    print(f"🔍 OCR: cache hit for {sha256[:12]}")
+                    return {
+                        "text": cached["text"],
+                        "pages": cached["pages"] or [],
+                        "total_seconds": 0.0,
+                        "cached": True,
+                    }
+
+                result = await self._run_ocr(file_content, file_extension)
+                await asyncio.to_thread(
+                    self._ocr_cache.put, sha256, engine, result["text"], result["pages"]
+                )
+                return result
+        finally:
+            if not lock.locked():
+                self._ocr_locks.pop(sha256, None)
+
+    async def _run_ocr(self, file_content: bytes, file_extension: str) -> Dict[str, Any]:
+        """OCR a document in the process pool, one task per page"""
+        start = time.perf_counter()
+        pages = [page async for page in self.iter_ocr_pages(file_content, file_extension)]
+        total = time.perf_counter() - start
+
+        text = self._join_pages(pages, file_extension)
+
+        text_layer_pages = sum(1 for p in pages if p["source"] == "text_layer")
+        print(
+            f"🔍 OCR: {len(pages)} page(s) in {total:.2f}s, "
+            f"{text_layer_pages} from text layer "
+            f"(slowest page {max((p['seconds'] for p in pages), default=0):.2f}s)"
+        )
+
+        return {
+            "text": text,
+            "pages": pages,
+            "total_seconds": round(total, 3),
+            "cached": False,
+        }
+
+    @staticmethod
+    def _join_pages(pages: List[Dict[str, Any]], file_extension: str) -> str:
+        """Combined document text as returned by extract_text_ocr"""
+        if file_extension.lower() == ".pdf":
+            text = "".join(f"\n--- Page {p['page']} ---\n{p['text']}" for p in pages)
+        else:
+            text = pages[0]["text"] if pages else ""
+        return text.strip()
+
+    async def _plan_ocr_pages(
+        self, file_content: bytes, file_extension: str
+    ) -> Tuple[Optional[str], List[Any]]:
+        """
+        Work needed to OCR a document, one entry per page
+        Each entry is either a finished page result (from the PDF text layer)
+        or the arguments for an OCR worker call. Also returns the temporary
+        PDF the workers read from, which the caller must delete.
+        """
+        extension = file_extension.lower()
 
+        if extension in [".png", ".jpg", ".jpeg"]:
+            return None, [(
+                ocr_worker.ocr_image,
+                file_content,
+                settings.ocr_grayscale,
+                settings.ocr_normalize_images,
+                settings.ocr_target_text_height,
+                settings.ocr_crop_margin,
+            )]
+
+        if extension != ".pdf":
+            raise Exception(f"Unsupported file type: {file_extension}")
+
+        # Workers read the PDF from disk instead of each receiving a copy
+        with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as tmp:
+            tmp.write(file_content)
+
+        try:
+            info = await asyncio.to_thread(pdf2image.pdfinfo_from_path, tmp.name)
+            page_count = info["Pages"]
+
+            text_layer: List[str] = []
+            text_layer_seconds = 0.0
+            if settings.ocr_use_text_layer:
+                start = time.perf_counter()
+                text_layer = await self._extract_text_layer(tmp.name)
+                text_layer_seconds = (time.perf_counter() - start) / max(1, page_count)
+        except Exception:
+            os.unlink(tmp.name)
+            raise
+
+        plans: List[Any] = []
+        for page_number in range(1, page_count + 1):
+            if page_number <= len(text_layer) and self._is_usable_text_layer(
+                text_layer[page_number - 1]
+            ):
+                plans.append({
+                    "page": page_number,
+                    "text": text_layer[page_number - 1],
+                    "seconds": round(text_layer_seconds, 3),
+                    "source": "text_layer",
+                })
             else:
-                raise Exception(f"Unsupported file type: {file_extension}")
+                plans.append((
+                    ocr_worker.ocr_pdf_page,
+                    tmp.name,
+                    page_number,
+                    settings.ocr_dpi,
+                    settings.ocr_grayscale,
+                ))
+        return tmp.name, plans
+
+    @staticmethod
+    def _page_result(result: Tuple[int, str, float]) -> Dict[str, Any]:
+        page, text, seconds = result
+        return {"page": page, "text": text, "seconds": round(seconds, 3), "source": "ocr"}
+
+    async def iter_ocr_pages(
+        self, file_content: bytes, file_extension: str
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Yield OCR results page by page, in order, as soon as each is ready
+        Pages are rendered one at a time inside the workers, and only a
+        bounded window of pages is queued ahead, so memory does not grow
+        with page count and the first page is available early.
 
-            return extracted_text.strip()
+        PDF pages with a usable embedded text layer are returned directly
+        ("source": "text_layer"); only the rest are rasterised ("source": "ocr").
+        """
+        loop = asyncio.get_running_loop()
+        executor = self._get_ocr_executor()
+        tmp_path, plans = await self._plan_ocr_pages(file_content, file_extension)
+        pending = iter(plans)
+        in_flight: deque = deque()
+
+        def submit_next() -> None:
+            plan = next(pending, None)
+            if plan is not None:
+                in_flight.append(
+                    plan if isinstance(plan, dict) else loop.run_in_executor(executor, *plan)
+                )
 
-        except Exception as e:
-            print(f"❌ OCR extraction failed: {e}")
-            return f"OCR Error: {str(e)}"
+        try:
+            # Keep every worker busy while the head-of-line page finishes
+            for _ in range(2 * max(1, settings.ocr_workers)):
+                submit_next()
+
+            while in_flight:
+                entry = in_flight.popleft()
+                submit_next()
+                yield entry if isinstance(entry, dict) else self._page_result(await entry)
+        finally:
+            for entry in in_flight:
+                if not isinstance(entry, dict):
+                    entry.cancel()
+            if tmp_path:
+                os.unlink(tmp_path)
+
+    async def iter_ocr_batch(
+        self, documents: List[Tuple[str, bytes, str]]
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        OCR several (filename, content, extension) documents at once
+        Pages of all documents share one bounded window on the process pool
+        and are yielded as soon as each finishes, in completion order:
+
+            {"event": "page", "document": i, "filename", "page", "text", "seconds", "source"}
+            {"event": "document", "document": i, "filename", "pages", "cached", "failed_pages"}
+            {"event": "error", "document": i, "filename", "page", "error"}
+
+        Each document is OCR'd under the same per-hash lock as
+        extract_text_ocr_detailed. A document whose lock is already taken
+        (by another request, or by a duplicate earlier in this batch) is
+        put off until the rest of the batch is done and its locks are
+        released, and then waits for that run and reuses its cached result.
+        A batch therefore never waits for a lock while holding one.
+        A document the ML service already OCR'd comes back as one page
+        event with "page": None and the document's whole text.
+        """
+        deferred: List[Tuple[int, Tuple[str, bytes, str]]] = []
+        # Closed explicitly, so an abandoned stream releases its locks now
+        # rather than whenever the inner generator is garbage collected
+        async with aclosing(
+            self._iter_ocr_documents(list(enumerate(documents)), deferred)
+        ) as events:
+            async for event in events:
+                yield event
+        for index, document in deferred:
+            async with aclosing(self._iter_ocr_documents([(index, document)], None)) as events:
+                async for event in events:
+                    yield event
+
+    async def _iter_ocr_documents(
+        self,
+        documents: List[Tuple[int, Tuple[str, bytes, str]]],
+        deferred: Optional[List[Tuple[int, Tuple[str, bytes, str]]]],
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        iter_ocr_batch over (index, document) pairs; documents whose lock is
+        taken are appended to deferred, or waited for when deferred is None
+        """
+        loop = asyncio.get_running_loop()
+        executor = self._get_ocr_executor()
+        engine = self._ocr_engine_tag()
+        states: Dict[int, Dict[str, Any]] = {}
+        queue: deque = deque()
+        running: Dict[asyncio.Future, Tuple[int, int]] = {}
+
+        def release(sha256: str, lock: Optional[asyncio.Lock]) -> None:
+            if lock is None:
+                return
+            lock.release()
+            if not lock.locked():
+                self._ocr_locks.pop(sha256, None)
+
+        async def finish_page(index: int, page: Dict[str, Any]) -> List[Dict[str, Any]]:
+            state = states[index]
+            state["pages"].append(page)
+            events = [{"event": "page", "document": index, "filename": state["filename"], **page}]
+            if len(state["pages"]) + state["failed"] == state["page_count"]:
+                events.append(await finish_document(index))
+            return events
+
+        async def fail_page(index: int, page_number: int, error: Exception) -> List[Dict[str, Any]]:
+            state = states[index]
+            state["failed"] += 1
+            events = [{
+                "event": "error",
+                "document": index,
+                "filename": state["filename"],
+                "page": page_number,
+                "error": str(error),
+            }]
+            if len(state["pages"]) + state["failed"] == state["page_count"]:
+                events.append(await finish_document(index))
+            return events
+
+        async def finish_document(index: int) -> Dict[str, Any]:
+            state = states.pop(index)
+            try:
+                if state["tmp_path"]:
+                    os.unlink(state["tmp_path"])
+                pages = sorted(state["pages"], key=lambda p: p["page"])
+                if self._ocr_cache is not None and not state["failed"]:
+                    await asyncio.to_thread(
+                        self._ocr_cache.put,
+                        state["sha256"], engine, self._join_pages(pages, state["extension"]), pages,
+                    )
+            finally:
+                release(state["sha256"], state["lock"])
+            return {
+                "event": "document",
+                "document": index,
+                "filename": state["filename"],
+                "pages": state["page_count"],
+                "cached": False,
+                "failed_pages": state["failed"],
+            }
+
+        try:
+            for index, (filename, content, extension) in documents:
+                sha256 = await asyncio.to_thread(document_hash, content)
+                lock = None
+                if self._ocr_cache is not None:
+                    lock = self._ocr_locks.setdefault(sha256, asyncio.Lock())
+                    if deferred is not None and lock.locked():
+                        deferred.append((index, (filename, content, extension)))
+                        continue
+                    await lock.acquire()
+
+                error = None
+                try:
+                    cached = (
+                        await asyncio.to_thread(self._ocr_cache.get, sha256, engine)
+                        if self._ocr_cache is not None else None
+                    )
+                    if cached is None:
+                        tmp_path, plans = await self._plan_ocr_pages(content, extension)
+                except Exception as e:
+                    error = e
+                except BaseException:
+                    release(sha256, lock)
+                    raise
+
+                if error is not None:
+                    release(sha256, lock)
+                    yield {"event": "error", "document": index, "filename": filename, "page": None, "error": str(error)}
+                    continue
+
+                if cached is not None:
+                    release(sha256, lock)
+                    # Results from the ML service's engine have text only
+                    pages = cached["pages"] or [
+                        {"page": None, "text": cached["text"], "seconds": 0.0, "source": "ocr"}
+                    ]
+                    for page in pages:
+                        yield {"event": "page", "document": index, "filename": filename, **page}
+                    yield {
+                        "event": "document",
+                        "document": index,
+                        "filename": filename,
+                        "pages": len(cached["pages"]) if cached["pages"] else None,
+                        "cached": True,
+                        "failed_pages": 0,
+                    }
+                    continue
+
+                states[index] = {
+                    "filename": filename,
+                    "extension": extension,
+                    "sha256": sha256,
+                    "lock": lock,
+                    "tmp_path": tmp_path,
+                    "page_count": len(plans),
+                    "pages": [],
+                    "failed": 0,
+                }
+                if not plans:
+                    yield await finish_document(index)
+                    continue
+                queue.extend((index, page_number, plan) for page_number, plan in enumerate(plans, 1))
+
+            window = 2 * max(1, settings.ocr_workers)
+            while queue or running:
+                while queue and len(running) < window:
+                    index, page_number, plan = queue.popleft()
+                    if isinstance(plan, dict):
+                        for event in await finish_page(index, plan):
+                            yield event
+                        continue
+                    future = asyncio.ensure_future(loop.run_in_executor(executor, *plan))
+                    running[future] = (index, page_number)
+
+                if not running:
+                    continue
+
+                done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                for future in done:
+                    index, page_number = running.pop(future)
+                    try:
+                        page = self._page_result(future.result())
+                    except Exception as e:
+                        events = await fail_page(index, page_number, e)
+                    else:
+                        events = await finish_page(index, page)
+                    for event in events:
+                        yield event
+        finally:
+            for future in running:
+                future.cancel()
+            for state in states.values():
+                if state["tmp_path"]:
+                    os.unlink(state["tmp_path"])
+                release(state["sha256"], state["lock"])
+
+    async def _extract_text_layer(self, pdf_path: str) -> List[str]:
+        """
+        Embedded text of each PDF page via poppler's pdftotext
+        Returns an empty list if the text layer cannot be read
+        """
+        try:
+            process = await asyncio.create_subprocess_exec(
+                "pdftotext", "-layout", "-enc", "UTF-8", pdf_path, "-",
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.DEVNULL,
+            )
+            stdout, _ = await process.communicate()
+        except FileNotFoundError:
+            print("⚠️ pdftotext not found, OCR'ing every page")
+            return []
+
+        if process.returncode != 0:
+            return []
+
+        # pdftotext ends every page with a form feed
+        return stdout.decode("utf-8", errors="replace").split("\f")[:-1]
+
+    @staticmethod
+    def _is_usable_text_layer(text: str) -> bool:
+        """Whether a page's text layer is real text rather than empty or garbled"""
+        content = "".join(text.split())
+        if len(content) < settings.ocr_text_layer_min_chars:
+            return False
+
+        # Broken font encodings come out as replacement/private-use characters
+        # or pdftotext's "(cid:NN)" placeholders instead of letters
+        garbled = sum(
+            1 for ch in content if ch == "\ufffd" or "\ue000" <= ch <= "\uf8ff"
+        ) + 5 * content.count("(cid:")
+        alphanumeric = sum(1 for ch in content if ch.isalnum())
+        return garbled / len(content) < 0.05 and alphanumeric / len(content) >= 0.5
 
     # ========================================================================
     # OpenAI Analysis - Health Insights
@@ -146,66 +659,30 @@ FOLLOW_UP: [YES/NO]
 """
 
     def _parse_ai_response(self, response_text: str) -> AIInsights:
-        """Parse structured response from OpenAI"""
+        """
+        Parse structured response from OpenAI
+        Accepts the line format of _create_analysis_prompt as well as the
+        JSON object (optionally in a ```json fence) the ML service asks for
+        """
         try:
-            # Extract risk level
-            risk_match = re.search(r"RISK_LEVEL:\s*(\w+)", response_text, re.IGNORECASE)
-            risk_level = risk_match.group(1).lower() if risk_match else "unknown"
-
-            # Extract summary
-            summary_match = re.search(
-                r"SUMMARY:\s*(.+?)(?=ABNORMAL_VALUES|RISK_FACTORS|RECOMMENDATIONS|$)",
-                response_text,
-                re.IGNORECASE | re.DOTALL,
-            )
-            summary = summary_match.group(1).strip() if summary_match else ""
-
-            # Extract abnormal values
-            abnormal_section = re.search(
-                r"ABNORMAL_VALUES:\s*(.+?)(?=RISK_FACTORS|RECOMMENDATIONS|FOLLOW_UP|$)",
-                response_text,
-                re.IGNORECASE | re.DOTALL,
-            )
-            abnormal_values = []
-            if abnormal_section:
-                lines = abnormal_section.group(1).strip().split("\n")
-                for line in lines:
-                    if line.strip().startswith("-"):
-                        abnormal_values.append(line.strip()[1:].strip())
-
-            # Extract risk factors
-            risk_section = re.search(
-                r"RISK_FACTORS:\s*(.+?)(?=RECOMMENDATIONS|FOLLOW_UP|$)",
-                response_text,
-                re.IGNORECASE | re.DOTALL,
-            )
-            risk_factors = []
-            if risk_section:
-                lines = risk_section.group(1).strip().split("\n")
-                for line in lines:
-                    if line.strip().startswith("-"):
-                        risk_factors.append(line.strip()[1:].strip())
-
-            # Extract recommendations
-            rec_section = re.search(
-                r"RECOMMENDATIONS:\s*(.+?)(?=FOLLOW_UP|$)",
-                response_text,
-                re.IGNORECASE | re.DOTALL,
-            )
-            recommendations = []
-            if rec_section:
-                lines = rec_section.group(1).strip().split("\n")
-                for line in lines:
-                    if line.strip().startswith("-"):
-                        recommendations.append(line.strip()[1:].strip())
-
-            # Extract follow-up
-            followup_match = re.search(
-                r"FOLLOW_UP:\s*(YES|NO)", response_text, re.IGNORECASE
-            )
-            follow_up_needed = (
-                followup_match.group(1).upper() == "YES" if followup_match else True
-            )
+            stripped = _CODE_FENCE.sub("", response_text.strip())
+            if stripped.startswith("{"):
+                data = json.JSONDecoder().raw_decode(stripped)[0]
+                if isinstance(data, dict):
+                    return self._parse_ai_json(data)
+
+            # The first occurrence of a section wins, as before
+            sections: Dict[str, str] = {}
+            for section, body in _iter_sections(response_text):
+                sections.setdefault(section, body)
+
+            risk_level = sections.get("RISK_LEVEL", "").split(None, 1)
+            risk_level = risk_level[0].strip("*").lower() if risk_level else "unknown"
+            summary = sections.get("SUMMARY", "")
+            abnormal_values = scan_lab_values(sections.get("ABNORMAL_VALUES", ""))
+            risk_factors = _LIST_ITEM.findall(sections.get("RISK_FACTORS", ""))
+            recommendations = _LIST_ITEM.findall(sections.get("RECOMMENDATIONS", ""))
+            follow_up_needed = not sections.get("FOLLOW_UP", "").upper().startswith("NO")
 
             return AIInsights(
                 risk_level=risk_level,
@@ -227,6 +704,40 @@ FOLLOW_UP: [YES/NO]
                 follow_up_needed=True,
             )
 
+    def _parse_ai_json(self, data: Dict[str, Any]) -> AIInsights:
+        """Map a JSON analysis (our keys or the ML service's) onto AIInsights"""
+        lab_values = []
+        for item in data.get("values") or []:
+            if not isinstance(item, dict):
+                continue
+            status = str(item.get("status", "")).lower()
+            lab_values.append(
+                LabValue(
+                    parameter=str(item.get("test", "")),
+                    value=str(item.get("value", "")),
+                    unit=str(item.get("unit") or ""),
+                    normal_range=str(item.get("reference") or ""),
+                    status=status if status in ("high", "low", "critical") else "normal",
+                )
+            )
+        abnormal_values = [value for value in lab_values if value.status != "normal"]
+
+        follow_up = data.get("follow_up", data.get("doctor_visit"))
+        if isinstance(follow_up, bool):
+            follow_up_needed = follow_up
+        else:
+            follow_up_needed = not str(follow_up or "yes").strip().upper().startswith("NO")
+
+        return AIInsights(
+            risk_level=str(data.get("risk_level") or "unknown").lower(),
+            summary=str(data.get("summary") or ""),
+            recommendations=_list_items(data.get("recommendations")),
+            abnormal_values=abnormal_values,
+            extracted_lab_values=lab_values or None,
+            risk_factors=_list_items(data.get("risk_factors") or data.get("concerns")),
+            follow_up_needed=follow_up_needed,
+        )
+
     # ========================================================================
     # Lab Value Parsing (from OCR text)
     # ========================================================================
@@ -236,48 +747,17 @@ FOLLOW_UP: [YES/NO]
         Parse lab values from OCR text
         Looks for patterns like: "Hemoglobin: 12.5 g/dL (Normal: 13-17)"
         """
-        lab_values = []
+        return scan_lab_values(text)
 
-        # Common patterns for lab results
-        patterns = [
-            # Pattern: Parameter: Value Unit (Normal: Range)
-            r"(\w+(?:\s+\w+)*)\s*:\s*([\d.]+)\s*(\w+/?%?)\s*\(Normal:\s*([\d.-]+)\)",
-            # Pattern: Parameter Value Unit Normal Range
-            r"(\w+(?:\s+\w+)*)\s+([\d.]+)\s+(\w+/?%?)\s+([\d.-]+)",
-        ]
-
-        for pattern in patterns:
-            matches = re.finditer(pattern, text, re.IGNORECASE)
-            for match in matches:
-                parameter = match.group(1).strip()
-                value = match.group(2).strip()
-                unit = match.group(3).strip()
-                normal_range = match.group(4).strip()
-
-                # Determine status (simplified logic)
-                status = "normal"
-                try:
-                    val_float = float(value)
-                    if "-" in normal_range:
-                        low, high = map(float, normal_range.split("-"))
-                        if val_float < low:
-                            status = "low"
-                        elif val_float > high:
-                            status = "high"
-                except:
-                    status = "unknown"
-
-                lab_values.append(
-                    LabValue(
-                        parameter=parameter,
-                        value=value,
-                        unit=unit,
-                        normal_range=normal_range,
-                        status=status,
-                    )
-                )
+    # ========================================================================
+    # Local Knowledge Tables
+    # ========================================================================
 
-        return lab_values
+    def _get_knowledge(self) -> KnowledgeBase:
+        """Knowledge indexes are built/mapped on first use, then shared"""
+        if self._knowledge is None:
+            self._knowledge = KnowledgeBase(settings.knowledge_data_dir, settings.knowledge_index_dir)
+        return self._knowledge
 
     # ========================================================================
     # Symptom Analysis
@@ -285,15 +765,27 @@ FOLLOW_UP: [YES/NO]
 
     async def analyze_symptoms(self, symptoms: str) -> Dict[str, Any]:
         """
-        Analyze patient symptoms using AI
-        PLACEHOLDER - To be integrated by teammate
+        Match patient symptoms against the local symptom -> condition index
+        Returns the best-matching conditions, not a diagnosis
         """
         try:
-            # TODO: Integrate AI symptom analysis
+            conditions = self._get_knowledge().symptoms.match(symptoms)
+
+            if conditions:
+                lines = [
+                    f"- {c['condition']} ({', '.join(c['matched_symptoms'])}) - see a {c['specialist']}"
+                    for c in conditions
+                ]
+                analysis = "Possible conditions matching these symptoms:\n" + "\n".join(lines)
+                if any(c["urgency"] == "emergency" for c in conditions):
+                    analysis += "\n\n⚠️ Some of these symptoms may need emergency care."
+            else:
+                analysis = "No known conditions matched these symptoms."
+
             return {
-                "analysis": "Symptom analysis pending AI integration. Please consult with a healthcare provider.",
-                "success": True,
-                "placeholder": True
+                "analysis": analysis + "\n\nThis is not a diagnosis. Please consult with a healthcare provider.",
+                "conditions": conditions,
+                "success": True
             }
 
         except Exception as e:
@@ -306,17 +798,31 @@ FOLLOW_UP: [YES/NO]
 
     async def check_drug_interactions(self, medications: List[str]) -> Dict[str, Any]:
         """
-        Check for drug interactions
-        PLACEHOLDER - To be integrated by teammate
+        Check every pair of medications against the local interaction index
+        Brand names are mapped to generics; no network calls are made
         """
         try:
-            meds_text = ", ".join(medications)
-            
-            # TODO: Integrate AI drug interaction analysis
+            index = self._get_knowledge().interactions
+            names, interactions = index.lookup(medications)
+            unknown = [name for name in names if name not in index.known]
+
+            if interactions:
+                lines = [
+                    f"- {' + '.join(i['drugs'])} ({i['severity']}): {i['description']}"
+                    for i in interactions
+                ]
+                analysis = f"Found {len(interactions)} interaction(s):\n" + "\n".join(lines)
+            else:
+                analysis = f"No known interactions between {', '.join(names)}."
+            if unknown:
+                analysis += f"\n\nNot in the interaction table: {', '.join(unknown)}."
+
             return {
-                "analysis": f"Drug interaction check for {meds_text} pending AI integration. Please consult with a pharmacist or healthcare provider.",
-                "success": True,
-                "placeholder": True
+                "analysis": analysis + "\n\nPlease confirm with a pharmacist or healthcare provider.",
+                "medications": names,
+                "interactions": interactions,
+                "unknown_medications": unknown,
+                "success": True
             }
 
         except Exception as e:
@@ -360,7 +360,7 @@ class BlockchainService:
                         "approved_at": details[6],
                         "is_doctor_verified": details[7],
                         "metadata": details[8],
-                        "ipfs_gateway_url": f"https://gateway.pinata.cloud/ipfs/{details[0]}"
+                        "ipfs_gateway_url": f"{settings.pinata_gateway}/ipfs/{details[0]}"
                     }
                     
                     records.append(record)
@@ -5,11 +5,30 @@ Handles Supabase database operations for medical records and access control
 
 from typing import Dict, Any, List, Optional
 from datetime import datetime, timedelta
+import json
+import re
 from supabase import create_client, Client
 
 from config import settings
 from models import PendingReport, AccessPermission
 
+_CID_PATTERN = re.compile(r"^[A-Za-z0-9]+$")
+
+
+def normalize_cid(value: Any) -> Any:
+    """
+    Plain CID from an ipfs_cid column value; older rows hold the whole
+    Pinata upload response (a dict or its JSON encoding) instead
+    """
+    if isinstance(value, dict):
+        return value.get("cid")
+    if isinstance(value, str) and value.startswith("{"):
+        try:
+            return json.loads(value).get("cid")
+        except (ValueError, AttributeError):
+            pass  # Keep original if parsing fails
+    return value
+
 
 class DatabaseService:
     """Service for database operations via Supabase"""
@@ -184,6 +203,42 @@ class DatabaseService:
             print(f"❌ Get report by ID failed: {e}")
             return None
 
+    async def get_report_by_cid(self, ipfs_cid: str) -> Optional[Dict[str, Any]]:
+        """
+        Get report whose encrypted file is stored under the given CID
+        Rows with the legacy JSON-encoded ipfs_cid (see normalize_cid) match
+        too, since the listing endpoints hand out their plain CIDs
+        """
+        try:
+            if not _CID_PATTERN.match(ipfs_cid):
+                return None
+
+            result = (
+                self.supabase.table("pending_reports")
+                .select("*")
+                .eq("ipfs_cid", ipfs_cid)
+                .limit(1)
+                .execute()
+            )
+            if result.data:
+                return result.data[0]
+
+            # Legacy rows: the CID is somewhere inside the stored JSON
+            result = (
+                self.supabase.table("pending_reports")
+                .select("*")
+                .like("ipfs_cid", f"%{ipfs_cid}%")
+                .execute()
+            )
+            for report in result.data or []:
+                if normalize_cid(report.get("ipfs_cid")) == ipfs_cid:
+                    return report
+            return None
+
+        except Exception as e:
+            print(f"❌ Get report by CID failed: {e}")
+            return None
+
     async def mark_report_approved(
         self, report_id: str, doctor_address: str, tx_hash: str, document_hash: str = None, block_number: int = None
     ) -> bool:
@@ -716,3 +771,37 @@ class DatabaseService:
         }
 
         return compatibility_map.get(recipient_blood_type, [recipient_blood_type])
+
+    # ========================================================================
+    # IPFS Housekeeping
+    # ========================================================================
+
+    async def get_referenced_cids(self, page_size: int = 1000) -> List[str]:
+        """
+        Collect every IPFS CID referenced by pending_reports and organ_donor_data
+        Values are returned raw (legacy rows may hold a JSON-encoded upload result)
+        """
+        sources = [
+            ("pending_reports", ["ipfs_cid", "extracted_text_cid"]),
+            ("organ_donor_data", ["ipfs_cid"]),
+        ]
+
+        cids = []
+        for table, columns in sources:
+            offset = 0
+            while True:
+                result = (
+                    self.supabase.table(table)
+                    .select(", ".join(columns))
+                    .range(offset, offset + page_size - 1)
+                    .execute()
+                )
+                rows = result.data or []
+                for row in rows:
+                    cids.extend(row[column] for column in columns if row.get(column))
+
+                if len(rows) < page_size:
+                    break
+                offset += page_size
+
+        return cids
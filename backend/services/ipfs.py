@@ -3,16 +3,34 @@ MediBytes Backend - IPFS Service
 Handles Pinata integration for decentralized file storage
 """
 
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, AsyncIterator, BinaryIO, Tuple
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import threading
 import aiohttp
-import requests
 import json
 from datetime import datetime
 import hashlib
+import struct
 from cryptography.fernet import Fernet
 import base64
 
 from config import settings
+from services.ipfs_cache import IPFSCache
+from services.ipfs_gateway import GatewayFetcher
+
+# Encrypted files are stored as a header followed by one Fernet token per
+# plaintext chunk, so any byte range can be decrypted without the rest.
+CHUNKED_MAGIC = b"MBC1"
+CHUNKED_HEADER = struct.Struct(">4sIQ")  # magic, chunk size, plaintext size
+
+
+def _fernet_token_length(plaintext_length: int) -> int:
+    """Length of the base64 Fernet token produced for a plaintext size"""
+    # version + timestamp + IV + PKCS7-padded ciphertext + HMAC
+    raw_length = 1 + 8 + 16 + (plaintext_length // 16 + 1) * 16 + 32
+    return 4 * ((raw_length + 2) // 3)
 
 
 class IPFSService:
@@ -23,6 +41,7 @@ class IPFSService:
         self.pinata_secret_key = settings.pinata_secret_api_key
         self.pinata_jwt = settings.pinata_jwt
         self.pinata_gateway = settings.pinata_gateway
+        self.pinata_api_url = settings.pinata_api_url.rstrip("/")
 
         self.headers = {
             "Authorization": f"Bearer {self.pinata_jwt}",
@@ -30,6 +49,25 @@ class IPFSService:
             "pinata_secret_api_key": self.pinata_secret_key,
         }
 
+        # Per-patient Fernet ciphers (LRU) and the pool that runs them.
+        # cryptography releases the GIL while encrypting, so threads scale.
+        self._cipher_cache: "OrderedDict[str, Fernet]" = OrderedDict()
+        self._cipher_cache_size = max(1, settings.cipher_cache_size)
+        self._cipher_lock = threading.Lock()
+        self._crypto_executor = ThreadPoolExecutor(
+            max_workers=max(1, settings.crypto_workers),
+            thread_name_prefix="ipfs-crypto",
+        )
+        self.encryption_chunk_size = settings.encryption_chunk_size
+        self.gateway_fetcher = GatewayFetcher(
+            settings.ipfs_gateways_list,
+            hedge_delay=settings.ipfs_hedge_delay_ms / 1000,
+            timeout=settings.ipfs_fetch_timeout,
+        )
+        self.cache = IPFSCache(
+            settings.ipfs_cache_dir, settings.ipfs_cache_max_mb * 1024 * 1024
+        )
+
     # ========================================================================
     # Connection Test
     # ========================================================================
@@ -39,7 +77,7 @@ class IPFSService:
         try:
             async with aiohttp.ClientSession() as session:
                 async with session.get(
-                    "https://api.pinata.cloud/data/testAuthentication",
+                    f"{self.pinata_api_url}/data/testAuthentication",
                     headers=self.headers,
                 ) as response:
                     if response.status == 200:
@@ -69,28 +107,143 @@ class IPFSService:
         # Fernet requires base64-encoded 32-byte key
         return base64.urlsafe_b64encode(key_material)
 
+    def _get_cipher(self, patient_address: str) -> Fernet:
+        """Return the cached Fernet cipher for a patient, deriving it on a miss"""
+        with self._cipher_lock:
+            cipher = self._cipher_cache.get(patient_address)
+            if cipher is not None:
+                self._cipher_cache.move_to_end(patient_address)
+                return cipher
+
+        cipher = Fernet(self._get_encryption_key(patient_address))
+
+        with self._cipher_lock:
+            self._cipher_cache[patient_address] = cipher
+            self._cipher_cache.move_to_end(patient_address)
+            while len(self._cipher_cache) > self._cipher_cache_size:
+                self._cipher_cache.popitem(last=False)
+        return cipher
+
     def encrypt_file(self, file_content: bytes, patient_address: str) -> bytes:
-        """Encrypt file content for patient"""
+        """Encrypt file content for patient in independently decryptable chunks"""
         try:
-            key = self._get_encryption_key(patient_address)
-            cipher = Fernet(key)
-            encrypted = cipher.encrypt(file_content)
-            return encrypted
+            cipher = self._get_cipher(patient_address)
+            chunk_size = self.encryption_chunk_size
+            view = memoryview(file_content)
+
+            parts = [CHUNKED_HEADER.pack(CHUNKED_MAGIC, chunk_size, len(file_content))]
+            for offset in range(0, len(file_content), chunk_size):
+                parts.append(cipher.encrypt(bytes(view[offset : offset + chunk_size])))
+            return b"".join(parts)
         except Exception as e:
             print(f"❌ Encryption failed: {e}")
             raise Exception(f"Encryption error: {str(e)}")
 
     def decrypt_file(self, encrypted_content: bytes, patient_address: str) -> bytes:
-        """Decrypt file content for patient"""
+        """Decrypt file content for patient (chunked or legacy single token)"""
         try:
-            key = self._get_encryption_key(patient_address)
-            cipher = Fernet(key)
-            decrypted = cipher.decrypt(encrypted_content)
-            return decrypted
+            cipher = self._get_cipher(patient_address)
+            if not encrypted_content.startswith(CHUNKED_MAGIC):
+                return cipher.decrypt(encrypted_content)
+
+            _, chunk_size, plaintext_size = CHUNKED_HEADER.unpack_from(encrypted_content)
+            parts = []
+            offset = CHUNKED_HEADER.size
+            for start in range(0, plaintext_size, chunk_size):
+                length = _fernet_token_length(min(chunk_size, plaintext_size - start))
+                parts.append(cipher.decrypt(encrypted_content[offset : offset + length]))
+                offset += length
+            return b"".join(parts)
         except Exception as e:
             print(f"❌ Decryption failed: {e}")
             raise Exception(f"Decryption error: {str(e)}")
 
+    async def _run_crypto(self, func, *args):
+        """Run a blocking crypto call on the crypto thread pool"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._crypto_executor, func, *args)
+
+    async def encrypt_file_async(
+        self, file_content: bytes, patient_address: str
+    ) -> bytes:
+        """Encrypt file content on the crypto thread pool"""
+        return await self._run_crypto(self.encrypt_file, file_content, patient_address)
+
+    async def decrypt_file_async(
+        self, encrypted_content: bytes, patient_address: str
+    ) -> bytes:
+        """Decrypt file content on the crypto thread pool"""
+        return await self._run_crypto(
+            self.decrypt_file, encrypted_content, patient_address
+        )
+
+    # ========================================================================
+    # Streaming Decryption (byte ranges of cached encrypted files)
+    # ========================================================================
+
+    def _read_chunked_header(self, f: BinaryIO) -> Optional[tuple]:
+        """Return (chunk_size, plaintext_size) or None for legacy files"""
+        f.seek(0)
+        header = f.read(CHUNKED_HEADER.size)
+        if len(header) < CHUNKED_HEADER.size or not header.startswith(CHUNKED_MAGIC):
+            return None
+        _, chunk_size, plaintext_size = CHUNKED_HEADER.unpack(header)
+        return chunk_size, plaintext_size
+
+    def _open_file(self, path: str, patient_address: str) -> tuple:
+        """(open file, chunked header or None, plaintext for legacy files)"""
+        f = open(path, "rb")
+        try:
+            header = self._read_chunked_header(f)
+        except BaseException:
+            f.close()
+            raise
+        if header is not None:
+            return f, header, None
+        # Legacy single-token files can only be decrypted as a whole
+        with f:
+            f.seek(0)
+            return None, None, self.decrypt_file(f.read(), patient_address)
+
+    async def open_decrypted(self, path: str, patient_address: str) -> "DecryptedFile":
+        """
+        Open a cached encrypted file for reading plaintext ranges
+        The caller must close() it; until then the file stays open, so the
+        IPFS cache evicting it cannot cut a stream short
+        """
+        f, header, plaintext = await self._run_crypto(self._open_file, path, patient_address)
+        return DecryptedFile(self, f, patient_address, header, plaintext)
+
+    async def open_cached(self, cid: str, patient_address: str) -> "DecryptedFile":
+        """
+        Fetch a CID into the local cache and open it with open_decrypted
+        If it is evicted between the fetch and the open, it is fetched again
+        """
+        try:
+            return await self.open_decrypted(await self.fetch_cached(cid), patient_address)
+        except FileNotFoundError:
+            return await self.open_decrypted(await self.fetch_cached(cid), patient_address)
+
+    async def get_decrypted_size(self, path: str, patient_address: str) -> int:
+        """Plaintext size of a cached encrypted file"""
+        decrypted = await self.open_decrypted(path, patient_address)
+        decrypted.close()
+        return decrypted.size
+
+    async def iter_decrypted_range(
+        self, path: str, patient_address: str, start: int, end: int
+    ) -> AsyncIterator[bytes]:
+        """
+        Stream plaintext bytes [start, end] (inclusive) of a cached encrypted file
+        Only the chunks overlapping the range are read and decrypted
+        """
+        decrypted = await self.open_decrypted(path, patient_address)
+        try:
+            async for part in decrypted.iter_range(start, end):
+                yield part
+        finally:
+            decrypted.close()
+
     # ========================================================================
     # Upload to Pinata
     # ========================================================================
@@ -109,23 +262,24 @@ class IPFSService:
                 "keyvalues": metadata or {},
             }
 
-            # Prepare file
-            files = {
-                "file": (filename, file_content),
-                "pinataMetadata": (None, json.dumps(pinata_metadata)),
-            }
+            # Prepare multipart form
+            form = aiohttp.FormData()
+            form.add_field("file", file_content, filename=filename)
+            form.add_field("pinataMetadata", json.dumps(pinata_metadata))
 
             # Upload to Pinata
-            response = requests.post(
-                "https://api.pinata.cloud/pinning/pinFileToIPFS",
-                headers={"Authorization": f"Bearer {self.pinata_jwt}"},
-                files=files,
-            )
+            async with aiohttp.ClientSession() as session:
+                async with session.post(
+                    f"{self.pinata_api_url}/pinning/pinFileToIPFS",
+                    headers={"Authorization": f"Bearer {self.pinata_jwt}"},
+                    data=form,
+                ) as response:
+                    if response.status != 200:
+                        text = await response.text()
+                        raise Exception(f"Pinata upload failed: {text}")
 
-            if response.status_code != 200:
-                raise Exception(f"Pinata upload failed: {response.text}")
+                    result = await response.json()
 
-            result = response.json()
             cid = result["IpfsHash"]
 
             return {
@@ -153,7 +307,7 @@ class IPFSService:
 
             async with aiohttp.ClientSession() as session:
                 async with session.post(
-                    "https://api.pinata.cloud/pinning/pinJSONToIPFS",
+                    f"{self.pinata_api_url}/pinning/pinJSONToIPFS",
                     headers=self.headers,
                     json=payload,
                 ) as response:
@@ -180,22 +334,23 @@ class IPFSService:
     # ========================================================================
 
     async def fetch_from_ipfs(self, cid: str) -> bytes:
-        """Fetch file from IPFS via Pinata gateway"""
+        """Fetch file from IPFS, racing the configured gateways"""
         try:
-            url = f"{self.pinata_gateway}/ipfs/{cid}"
-
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url) as response:
-                    if response.status != 200:
-                        raise Exception(f"Failed to fetch: {response.status}")
-
-                    content = await response.read()
-                    return content
+            return await self.gateway_fetcher.fetch(cid)
 
         except Exception as e:
             print(f"❌ IPFS fetch failed: {e}")
             raise Exception(f"IPFS fetch error: {str(e)}")
 
+    def get_gateway_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Per-gateway latency percentiles and failure counts"""
+        return self.gateway_fetcher.get_stats()
+
+    async def fetch_cached(self, cid: str) -> str:
+        """Fetch content into the local cache and return its file path"""
+        path = await self.cache.get(cid, self.fetch_from_ipfs)
+        return str(path)
+
     async def fetch_json(self, cid: str) -> Dict[str, Any]:
         """Fetch JSON metadata from IPFS"""
         try:
@@ -216,7 +371,7 @@ class IPFSService:
 
             async with aiohttp.ClientSession() as session:
                 async with session.post(
-                    "https://api.pinata.cloud/pinning/pinByHash",
+                    f"{self.pinata_api_url}/pinning/pinByHash",
                     headers=self.headers,
                     json=payload,
                 ) as response:
@@ -231,7 +386,7 @@ class IPFSService:
         try:
             async with aiohttp.ClientSession() as session:
                 async with session.delete(
-                    f"https://api.pinata.cloud/pinning/unpin/{cid}",
+                    f"{self.pinata_api_url}/pinning/unpin/{cid}",
                     headers=self.headers,
                 ) as response:
                     return response.status == 200
@@ -245,7 +400,7 @@ class IPFSService:
         try:
             async with aiohttp.ClientSession() as session:
                 async with session.get(
-                    f"https://api.pinata.cloud/data/pinList?status=pinned&pageLimit={limit}",
+                    f"{self.pinata_api_url}/data/pinList?status=pinned&pageLimit={limit}",
                     headers=self.headers,
                 ) as response:
                     if response.status != 200:
@@ -258,6 +413,54 @@ class IPFSService:
             print(f"❌ Get pinned files failed: {e}")
             return []
 
+    async def iter_pinned_files(
+        self, page_size: int = 1000, concurrency: int = 4
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Stream every pinned file from Pinata's pinList
+        The first page gives the total count; the rest are fetched up to
+        `concurrency` pages ahead and yielded in order.
+        """
+        async with aiohttp.ClientSession(headers=self.headers) as session:
+            first_page = await self._fetch_pin_page(session, 0, page_size)
+            for row in first_page.get("rows", []):
+                yield row
+
+            offsets = iter(range(page_size, first_page.get("count", 0), page_size))
+            in_flight: deque = deque()
+
+            def schedule_next() -> None:
+                offset = next(offsets, None)
+                if offset is not None:
+                    in_flight.append(
+                        asyncio.create_task(self._fetch_pin_page(session, offset, page_size))
+                    )
+
+            for _ in range(max(1, concurrency)):
+                schedule_next()
+
+            try:
+                while in_flight:
+                    page = await in_flight.popleft()
+                    schedule_next()
+                    for row in page.get("rows", []):
+                        yield row
+            finally:
+                for task in in_flight:
+                    task.cancel()
+
+    async def _fetch_pin_page(
+        self, session: aiohttp.ClientSession, offset: int, page_size: int
+    ) -> Dict[str, Any]:
+        async with session.get(
+            f"{self.pinata_api_url}/data/pinList",
+            params={"status": "pinned", "pageLimit": page_size, "pageOffset": offset},
+        ) as response:
+            if response.status != 200:
+                text = await response.text()
+                raise Exception(f"pinList failed at offset {offset}: {text}")
+            return await response.json()
+
     # ========================================================================
     # Utility Functions
     # ========================================================================
@@ -275,3 +478,68 @@ class IPFSService:
         if cid.startswith("b"):
             return True
         return False
+
+
+class DecryptedFile:
+    """
+    A cached encrypted file opened once for one response
+
+    Chunks are read from the one open file handle, and the last decrypted
+    chunk is kept, so sniffing the first bytes and then streaming a range
+    that starts in the same chunk decrypts it only once. Legacy files are
+    decrypted as a whole when opened and served from memory.
+    """
+
+    def __init__(
+        self,
+        service: IPFSService,
+        f: Optional[BinaryIO],
+        patient_address: str,
+        header: Optional[tuple],
+        plaintext: Optional[bytes],
+    ):
+        self._service = service
+        self._file = f
+        self._patient_address = patient_address
+        self._plaintext = plaintext
+        self._chunk_size, self.size = header if header else (0, len(plaintext))
+        self._lock = threading.Lock()
+        self._last_chunk: Optional[Tuple[int, bytes]] = None
+
+    def _decrypt_chunk(self, index: int) -> bytes:
+        """Read and decrypt a single chunk"""
+        offset = CHUNKED_HEADER.size + index * _fernet_token_length(self._chunk_size)
+        length = _fernet_token_length(min(self._chunk_size, self.size - index * self._chunk_size))
+        with self._lock:
+            self._file.seek(offset)
+            token = self._file.read(length)
+        return self._service._get_cipher(self._patient_address).decrypt(token)
+
+    async def _chunk(self, index: int) -> bytes:
+        if self._last_chunk is None or self._last_chunk[0] != index:
+            chunk = await self._service._run_crypto(self._decrypt_chunk, index)
+            self._last_chunk = (index, chunk)
+        return self._last_chunk[1]
+
+    async def iter_range(self, start: int, end: int) -> AsyncIterator[bytes]:
+        """Plaintext bytes [start, end] (inclusive); only overlapping chunks are decrypted"""
+        end = min(end, self.size - 1)
+        if start > end:
+            return
+        if self._plaintext is not None:
+            yield self._plaintext[start : end + 1]
+            return
+        for index in range(start // self._chunk_size, end // self._chunk_size + 1):
+            chunk = await self._chunk(index)
+            chunk_start = index * self._chunk_size
+            yield chunk[max(start - chunk_start, 0) : end - chunk_start + 1]
+
+    async def read(self, start: int, end: int) -> bytes:
+        """Plaintext bytes [start, end] (inclusive) as one bytes object"""
+        return b"".join([part async for part in self.iter_range(start, end)])
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        self._last_chunk = None
@@ -0,0 +1,93 @@
+"""
+MediBytes Backend - IPFS Local Cache
+Size-bounded on-disk cache of IPFS content keyed by CID
+"""
+
+from typing import Awaitable, Callable, Dict
+from pathlib import Path
+import asyncio
+import os
+import re
+import uuid
+
+_CID_PATTERN = re.compile(r"^[A-Za-z0-9]+$")
+
+
+class IPFSCache:
+    """
+    On-disk cache for IPFS content
+
+    CIDs are content addresses, so cached files never go stale; the only
+    policy needed is eviction of least recently used files once the cache
+    grows past max_bytes.
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self._locks: Dict[str, asyncio.Lock] = {}
+
+    def path_for(self, cid: str) -> Path:
+        """Local path for a CID (rejects anything that is not a plain CID)"""
+        if not _CID_PATTERN.match(cid):
+            raise ValueError(f"Invalid CID: {cid}")
+        return self.cache_dir / cid
+
+    async def get(
+        self, cid: str, fetch: Callable[[str], Awaitable[bytes]]
+    ) -> Path:
+        """
+        Return the local path of a CID, fetching it on a miss
+        Concurrent misses for the same CID share a single fetch
+        """
+        path = self.path_for(cid)
+        if path.exists():
+            await asyncio.to_thread(os.utime, path)
+            return path
+
+        lock = self._locks.setdefault(cid, asyncio.Lock())
+        try:
+            async with lock:
+                if path.exists():
+                    return path
+
+                content = await fetch(cid)
+                await asyncio.to_thread(self._store, path, content)
+                await asyncio.to_thread(self._evict)
+                return path
+        finally:
+            if not lock.locked():
+                self._locks.pop(cid, None)
+
+    def _store(self, path: Path, content: bytes) -> None:
+        """Write atomically so readers never see a partial file"""
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f".{path.name}.{uuid.uuid4().hex}.tmp")
+        with open(tmp_path, "wb") as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+
+    def _evict(self) -> None:
+        """Drop least recently used files until the cache fits max_bytes"""
+        entries = []
+        total = 0
+        for entry in os.scandir(self.cache_dir):
+            if not entry.is_file() or entry.name.startswith("."):
+                continue
+            stat = entry.stat()
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+            total += stat.st_size
+
+        if total <= self.max_bytes:
+            return
+
+        entries.sort()
+        for _, size, entry_path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(entry_path)
+                total -= size
+            except OSError:
+                # Already gone, or (on Windows) open for a download in progress
+                pass
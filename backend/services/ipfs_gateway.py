@@ -0,0 +1,247 @@
+"""
+MediBytes Backend - IPFS Gateway Fetcher
+Races reads across several HTTP gateways and verifies content against its CID
+"""
+
+from typing import Dict, Any, List, Optional, Tuple
+from collections import deque
+import asyncio
+import base64
+import hashlib
+import time
+import aiohttp
+
+# Multicodec / multihash codes we understand
+CODEC_RAW = 0x55
+CODEC_DAG_PB = 0x70
+MULTIHASH_SHA2_256 = 0x12
+
+# Default chunk size used by Pinata/kubo; files up to this size are one block
+UNIXFS_BLOCK_SIZE = 262144
+
+_BASE58_ALPHABET = "123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz"
+_BASE58_INDEX = {char: index for index, char in enumerate(_BASE58_ALPHABET)}
+
+
+# ============================================================================
+# CID Decoding & Verification
+# ============================================================================
+
+
+def _base58_decode(text: str) -> bytes:
+    number = 0
+    for char in text:
+        number = number * 58 + _BASE58_INDEX[char]
+    decoded = number.to_bytes((number.bit_length() + 7) // 8, "big")
+    leading_zeros = len(text) - len(text.lstrip("1"))
+    return b"\x00" * leading_zeros + decoded
+
+
+def _read_varint(data: bytes, offset: int) -> Tuple[int, int]:
+    value = shift = 0
+    while True:
+        byte = data[offset]
+        offset += 1
+        value |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return value, offset
+        shift += 7
+
+
+def _encode_varint(value: int) -> bytes:
+    out = bytearray()
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if value:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return bytes(out)
+
+
+def parse_cid(cid: str) -> Tuple[int, int, int, bytes]:
+    """
+    Decode a CID into (version, codec, hash function, digest)
+    Supports CIDv0 (base58btc) and base32 CIDv1 ("b..." as returned by Pinata)
+    """
+    try:
+        if cid.startswith("Qm") and len(cid) == 46:
+            multihash = _base58_decode(cid)
+            version, codec = 0, CODEC_DAG_PB
+            offset = 0
+        elif cid.startswith("b"):
+            body = cid[1:].upper()
+            raw = base64.b32decode(body + "=" * (-len(body) % 8))
+            version, offset = _read_varint(raw, 0)
+            codec, offset = _read_varint(raw, offset)
+            multihash = raw
+        else:
+            raise ValueError("unsupported multibase")
+
+        hash_code, offset = _read_varint(multihash, offset)
+        length, offset = _read_varint(multihash, offset)
+        digest = multihash[offset : offset + length]
+        if len(digest) != length:
+            raise ValueError("truncated digest")
+        return version, codec, hash_code, digest
+    except (KeyError, IndexError, ValueError) as e:
+        raise ValueError(f"Invalid CID {cid}: {e}")
+
+
+def _unixfs_file_block(content: bytes) -> bytes:
+    """dag-pb block kubo produces for a single-chunk UnixFS file"""
+    unixfs = b"\x08\x02"  # Type = File
+    if content:
+        unixfs += b"\x12" + _encode_varint(len(content)) + content
+    unixfs += b"\x18" + _encode_varint(len(content))
+    return b"\x0a" + _encode_varint(len(unixfs)) + unixfs
+
+
+def verify_cid(cid: str, content: bytes) -> Optional[bool]:
+    """
+    Check that content hashes to the given CID
+    Returns None when the CID cannot be checked from the bytes alone
+    (multi-block dag-pb files, unknown encodings or non sha2-256 hashes).
+    """
+    try:
+        _, codec, hash_code, digest = parse_cid(cid)
+    except ValueError:
+        return None
+    if hash_code != MULTIHASH_SHA2_256:
+        return None
+
+    if codec == CODEC_RAW:
+        return hashlib.sha256(content).digest() == digest
+    if codec == CODEC_DAG_PB and len(content) <= UNIXFS_BLOCK_SIZE:
+        return hashlib.sha256(_unixfs_file_block(content)).digest() == digest
+    return None
+
+
+# ============================================================================
+# Gateway Racing
+# ============================================================================
+
+
+class GatewayStats:
+    """Rolling latency / failure counters for one gateway"""
+
+    def __init__(self, window: int = 200):
+        self.successes = 0
+        self.failures = 0
+        self.latencies: deque = deque(maxlen=window)
+
+    def record(self, latency: float, success: bool) -> None:
+        if success:
+            self.successes += 1
+            self.latencies.append(latency)
+        else:
+            self.failures += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        ordered = sorted(self.latencies)
+
+        def percentile(p: float) -> Optional[float]:
+            if not ordered:
+                return None
+            return round(ordered[min(int(p * len(ordered)), len(ordered) - 1)] * 1000, 1)
+
+        return {
+            "successes": self.successes,
+            "failures": self.failures,
+            "p50_ms": percentile(0.50),
+            "p95_ms": percentile(0.95),
+        }
+
+
+class GatewayFetcher:
+    """
+    Fetch IPFS content from an ordered list of gateways
+
+    The first gateway is tried immediately; if it has not answered within
+    hedge_delay seconds the second is started too and whichever returns
+    verified content first wins. Failures fall through to the remaining
+    gateways in order.
+    """
+
+    def __init__(self, gateways: List[str], hedge_delay: float, timeout: float):
+        if not gateways:
+            raise ValueError("At least one IPFS gateway is required")
+        self.gateways = [gateway.rstrip("/") for gateway in gateways]
+        self.hedge_delay = hedge_delay
+        self.timeout = timeout
+        self.stats: Dict[str, GatewayStats] = {
+            gateway: GatewayStats() for gateway in self.gateways
+        }
+
+    async def fetch(self, cid: str) -> bytes:
+        """Fetch and verify content, racing the first two gateways"""
+        errors = []
+        pending = set()
+        next_index = 0
+
+        async with aiohttp.ClientSession(
+            timeout=aiohttp.ClientTimeout(total=self.timeout)
+        ) as session:
+
+            def launch():
+                nonlocal next_index
+                gateway = self.gateways[next_index]
+                next_index += 1
+                task = asyncio.create_task(self._fetch_one(session, gateway, cid))
+                task.gateway = gateway
+                pending.add(task)
+
+            launch()
+            try:
+                while pending:
+                    hedging = next_index < min(2, len(self.gateways))
+                    done, _ = await asyncio.wait(
+                        pending,
+                        timeout=self.hedge_delay if hedging else None,
+                        return_when=asyncio.FIRST_COMPLETED,
+                    )
+                    if not done:
+                        launch()
+                        continue
+
+                    for task in done:
+                        pending.discard(task)
+                        try:
+                            return task.result()
+                        except Exception as e:
+                            errors.append(f"{task.gateway}: {e}")
+                            if next_index < len(self.gateways):
+                                launch()
+            finally:
+                for task in pending:
+                    task.cancel()
+                if pending:
+                    await asyncio.gather(*pending, return_exceptions=True)
+
+        raise Exception(f"All gateways failed for {cid}: {'; '.join(errors)}")
+
+    async def _fetch_one(
+        self, session: aiohttp.ClientSession, gateway: str, cid: str
+    ) -> bytes:
+        start = time.perf_counter()
+        try:
+            async with session.get(f"{gateway}/ipfs/{cid}") as response:
+                if response.status != 200:
+                    raise Exception(f"HTTP {response.status}")
+                content = await response.read()
+
+            if verify_cid(cid, content) is False:
+                raise Exception("content does not match CID")
+
+            self.stats[gateway].record(time.perf_counter() - start, True)
+            return content
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            self.stats[gateway].record(time.perf_counter() - start, False)
+            raise
+
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Latency percentiles and failure counts per gateway"""
+        return {gateway: stats.snapshot() for gateway, stats in self.stats.items()}
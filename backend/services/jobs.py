@@ -0,0 +1,298 @@
+"""
+MediBytes Backend - Background Jobs
+Asyncio job queue for work too slow to run inside a request
+
+A job runs in the uvicorn worker that accepted it. Its state is also
+written to a SQLite JobStore shared by all workers, so status and event
+requests that land on another worker can still follow it.
+"""
+
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+from datetime import datetime
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+# A job body receives a progress callback and returns the job's result
+ProgressCallback = Callable[[str], Awaitable[None]]
+JobFunction = Callable[[ProgressCallback], Awaitable[Any]]
+
+TERMINAL_STATUSES = ("succeeded", "failed")
+
+# How often a worker that does not run a job re-reads it from the store
+REMOTE_POLL_SECONDS = 0.5
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    owner TEXT NOT NULL,
+    snapshot TEXT NOT NULL,
+    finished_at REAL
+)
+"""
+
+
+class QueueFullError(Exception):
+    """Raised when a job is submitted while the queue is at capacity"""
+
+
+class Job:
+    """State of one background job; watchers are woken on every change"""
+
+    def __init__(self, owner: str, kind: str, func: JobFunction):
+        self.id = uuid.uuid4().hex
+        self.owner = owner
+        self.kind = kind
+        self.func = func
+        self.status = "queued"
+        self.stage: Optional[str] = None
+        self.stages: List[Dict[str, Any]] = []
+        self.result: Any = None
+        self.error: Optional[str] = None
+        self.created_at = datetime.utcnow().isoformat()
+        self.finished_at: Optional[float] = None
+        self._stage_started = 0.0
+        self._version = 0
+        self._changed = asyncio.Condition()
+
+    @property
+    def done(self) -> bool:
+        return self.status in TERMINAL_STATUSES
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "stage": self.stage,
+            "stages": [dict(stage) for stage in self.stages],
+            "result": self.result,
+            "error": self.error,
+            "created_at": self.created_at,
+        }
+
+    async def _notify(self) -> None:
+        async with self._changed:
+            self._version += 1
+            self._changed.notify_all()
+
+    def _close_stage(self) -> None:
+        if self.stages and self.stages[-1]["seconds"] is None:
+            self.stages[-1]["seconds"] = round(time.monotonic() - self._stage_started, 3)
+
+    def _set_stage(self, stage: str) -> None:
+        self._close_stage()
+        self.stage = stage
+        self.stages.append({"stage": stage, "seconds": None})
+        self._stage_started = time.monotonic()
+
+    async def watch(self) -> AsyncIterator[Dict[str, Any]]:
+        """Yield a snapshot now and after every change, until the job ends"""
+        seen = -1
+        while True:
+            async with self._changed:
+                await self._changed.wait_for(lambda: self._version != seen)
+                seen = self._version
+                snapshot = self.snapshot()
+            yield snapshot
+            if snapshot["status"] in TERMINAL_STATUSES:
+                return
+
+
+class JobStore:
+    """
+    Job snapshots in SQLite, readable from every uvicorn worker (WAL)
+
+    Calls block, so JobQueue runs them with asyncio.to_thread.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+        self._local = threading.local()
+
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        """One connection per thread and process; asyncio.to_thread may use any thread"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30)
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def put(self, owner: str, snapshot: Dict[str, Any]) -> None:
+        finished_at = time.time() if snapshot["status"] in TERMINAL_STATUSES else None
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO jobs VALUES (?, ?, ?, ?)",
+                (snapshot["job_id"], owner, json.dumps(snapshot, default=str), finished_at),
+            )
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """{"owner", "snapshot"} for a job, or None"""
+        row = self._connect().execute(
+            "SELECT owner, snapshot FROM jobs WHERE id = ?", (job_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        return {"owner": row[0], "snapshot": json.loads(row[1])}
+
+    def prune(self, retention: float) -> None:
+        """Forget finished jobs older than the retention period"""
+        with self._connect() as conn:
+            conn.execute(
+                "DELETE FROM jobs WHERE finished_at IS NOT NULL AND finished_at < ?",
+                (time.time() - retention,),
+            )
+
+
+class JobQueue:
+    """
+    Bounded queue drained by a fixed pool of worker tasks
+
+    Workers start lazily on the first submit, inside the running event loop.
+    Finished jobs are kept for `retention` seconds so clients can still read
+    their result. With a store, every state change is saved there, and jobs
+    run by other uvicorn workers are read (and polled) from it.
+    """
+
+    def __init__(
+        self,
+        workers: int = 2,
+        max_queued: int = 100,
+        retention: float = 3600,
+        store: Optional[JobStore] = None,
+    ):
+        self.workers = workers
+        self.max_queued = max_queued
+        self.retention = retention
+        self.store = store
+        self.jobs: Dict[str, Job] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+
+    def _ensure_started(self) -> None:
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.max_queued)
+            self._tasks = [
+                asyncio.create_task(self._worker()) for _ in range(max(1, self.workers))
+            ]
+            print(f"⚙️ Job queue started with {len(self._tasks)} worker(s)")
+
+    async def submit(self, owner: str, kind: str, func: JobFunction) -> Job:
+        """Queue a job and return it as soon as it is recorded"""
+        self._ensure_started()
+        await self._prune()
+
+        job = Job(owner, kind, func)
+        if self._queue.full():
+            raise QueueFullError("Job queue is full, try again later")
+
+        # Recorded before it can start, so other workers find it right away
+        self.jobs[job.id] = job
+        await self._save(job)
+        self._queue.put_nowait(job)
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        """A job run by this worker"""
+        return self.jobs.get(job_id)
+
+    async def lookup(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """{"owner", "snapshot"} for a job run by any worker, or None"""
+        job = self.jobs.get(job_id)
+        if job is not None:
+            return {"owner": job.owner, "snapshot": job.snapshot()}
+        if self.store is None:
+            return None
+        return await asyncio.to_thread(self.store.get, job_id)
+
+    async def watch(self, job_id: str) -> AsyncIterator[Dict[str, Any]]:
+        """Job.watch for a job run by any worker; other workers' jobs are polled"""
+        job = self.jobs.get(job_id)
+        if job is not None:
+            async for snapshot in job.watch():
+                yield snapshot
+            return
+
+        last = None
+        while True:
+            record = await self.lookup(job_id)
+            if record is None:
+                return
+            snapshot = record["snapshot"]
+            if snapshot != last:
+                last = snapshot
+                yield snapshot
+            if snapshot["status"] in TERMINAL_STATUSES:
+                return
+            await asyncio.sleep(REMOTE_POLL_SECONDS)
+
+    async def _save(self, job: Job) -> None:
+        if self.store is not None:
+            await asyncio.to_thread(self.store.put, job.owner, job.snapshot())
+
+    async def _changed(self, job: Job) -> None:
+        await self._save(job)
+        await job._notify()
+
+    async def _worker(self) -> None:
+        while True:
+            job = await self._queue.get()
+            try:
+                await self._run(job)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job: Job) -> None:
+        async def progress(stage: str) -> None:
+            job._set_stage(stage)
+            await self._changed(job)
+
+        try:
+            job.status = "running"
+            await self._changed(job)
+            job.result = await job.func(progress)
+            job.status = "succeeded"
+        except Exception as e:
+            job.error = getattr(e, "detail", None) or str(e)
+            job.status = "failed"
+            print(f"❌ Job {job.id} ({job.kind}) failed at {job.stage}: {job.error}")
+        finally:
+            job._close_stage()
+            job.func = None
+            job.finished_at = time.monotonic()
+            try:
+                await self._save(job)
+            except Exception as e:
+                print(f"⚠️ Could not save job {job.id}: {e}")
+            await job._notify()
+
+    async def _prune(self) -> None:
+        """Forget finished jobs older than the retention period"""
+        cutoff = time.monotonic() - self.retention
+        expired = [
+            job_id for job_id, job in self.jobs.items()
+            if job.finished_at is not None and job.finished_at < cutoff
+        ]
+        for job_id in expired:
+            del self.jobs[job_id]
+        if self.store is not None:
+            await asyncio.to_thread(self.store.prune, self.retention)
+
+    def stats(self) -> Dict[str, Any]:
+        """Workers and job counts of this uvicorn worker"""
+        counts: Dict[str, int] = {}
+        for job in self.jobs.values():
+            counts[job.status] = counts.get(job.status, 0) + 1
+        return {"workers": len(self._tasks), "jobs": counts}
@@ -0,0 +1,299 @@
+"""
+MediBytes Backend - Local Medical Knowledge Indexes
+Drug-interaction and symptom -> condition lookups over memory-mapped tables
+
+The curated seed tables live in backend/data/*.json. On first use they are
+compiled into sorted 64-bit hash arrays (.npy) in the index directory and
+memory-mapped from there; the index is rebuilt whenever a seed file changes.
+"""
+
+from typing import Any, BinaryIO, Callable, Dict, List, Optional, Tuple
+from itertools import combinations
+from pathlib import Path
+import hashlib
+import json
+import os
+import re
+import tempfile
+
+import numpy as np
+
+INDEX_VERSION = 1
+
+_NON_ALNUM = re.compile(r"[^a-z0-9]+")
+_CLAUSE_BREAK = re.compile(r"[.,;:!?\n]+")
+_CONTRACTED_NOT = re.compile(r"n['’]t\b")
+# Words that negate the rest of their clause ("no headache", "denies fever or chills")
+NEGATION_CUES = frozenset({"no", "not", "without", "denies", "denied", "deny", "never", "neither", "nor"})
+# Words that end a negated stretch early ("no fever but a headache")
+NEGATION_ENDS = frozenset({"but", "however", "although", "though", "except", "yet"})
+# Odd 64-bit constant used to combine two drug hashes into one pair key
+_PAIR_MIX = np.uint64(0x9E3779B97F4A7C15)
+
+
+def normalize_term(text: str) -> str:
+    """Lowercase, punctuation-free, single-spaced form of a drug or symptom"""
+    return _NON_ALNUM.sub(" ", text.lower()).strip()
+
+
+def term_hash(term: str) -> int:
+    """Stable 64-bit hash of a normalised term"""
+    return int.from_bytes(hashlib.blake2b(term.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def affirmed_runs(text: str) -> List[List[str]]:
+    """
+    Runs of normalised words the text asserts, with negated stretches left out
+    A negation cue covers the rest of its clause, up to punctuation or a word
+    such as "but": "no headache or fever, nausea" keeps only ["nausea"].
+    """
+    runs: List[List[str]] = []
+    for clause in _CLAUSE_BREAK.split(_CONTRACTED_NOT.sub(" not", text.lower())):
+        run: List[str] = []
+        negated = False
+        for word in normalize_term(clause).split():
+            if word in NEGATION_CUES:
+                negated = True
+            elif word in NEGATION_ENDS:
+                negated = False
+            elif not negated:
+                run.append(word)
+                continue
+            if run:
+                runs.append(run)
+                run = []
+        if run:
+            runs.append(run)
+    return runs
+
+
+def pair_keys(first: np.ndarray, second: np.ndarray) -> np.ndarray:
+    """Order-independent keys for pairs of term hashes (vectorised)"""
+    low = np.minimum(first, second)
+    high = np.maximum(first, second)
+    return (low * _PAIR_MIX) ^ high
+
+
+def _atomic_write(path: Path, write: Callable[[BinaryIO], None]) -> None:
+    """Write through a temp file of this writer's own, so concurrent rebuilds never share one"""
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            write(f)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def _atomic_save(path: Path, array: np.ndarray) -> None:
+    _atomic_write(path, lambda f: np.save(f, array))
+
+
+class InteractionIndex:
+    """Interactions keyed by normalised drug pair"""
+
+    def __init__(self, keys: np.ndarray, records: np.ndarray, seed: Dict[str, Any]):
+        self.keys = keys
+        self.records = records
+        self.interactions = seed["interactions"]
+        self.aliases = {normalize_term(k): normalize_term(v) for k, v in seed.get("aliases", {}).items()}
+        self.known = {normalize_term(d) for item in self.interactions for d in item["drugs"]}
+
+    def canonical(self, medication: str) -> str:
+        name = normalize_term(medication)
+        return self.aliases.get(name, name)
+
+    def lookup(self, medications: List[str]) -> Tuple[List[str], List[Dict[str, Any]]]:
+        """
+        Canonical medication names and every known interaction among them
+        All k*(k-1)/2 pair keys are searched in one vectorised call
+        """
+        names = list(dict.fromkeys(self.canonical(m) for m in medications if m.strip()))
+        if len(names) < 2 or self.keys.size == 0:
+            return names, []
+
+        hashes = np.array([term_hash(name) for name in names], dtype=np.uint64)
+        first, second = np.triu_indices(len(names), k=1)
+        wanted = pair_keys(hashes[first], hashes[second])
+
+        positions = np.searchsorted(self.keys, wanted)
+        positions[positions == self.keys.size] = 0
+        hits = np.flatnonzero(self.keys[positions] == wanted)
+
+        found = []
+        for hit in hits:
+            item = self.interactions[int(self.records[positions[hit]])]
+            pair = {normalize_term(d) for d in item["drugs"]}
+            # Guard against 64-bit hash collisions
+            if pair == {names[first[hit]], names[second[hit]]}:
+                found.append({
+                    "drugs": [names[first[hit]], names[second[hit]]],
+                    "severity": item["severity"],
+                    "description": item["description"],
+                })
+        return names, found
+
+
+class SymptomIndex:
+    """Inverted index from symptom phrase to the conditions listing it"""
+
+    def __init__(
+        self,
+        keys: np.ndarray,
+        offsets: np.ndarray,
+        postings: np.ndarray,
+        seed: Dict[str, Any],
+        max_words: int,
+    ):
+        self.keys = keys
+        self.offsets = offsets
+        self.postings = postings
+        self.conditions = seed["conditions"]
+        self.max_words = max_words
+
+    def match(self, text: str, limit: int = 5) -> List[Dict[str, Any]]:
+        """
+        Conditions ranked by how many of their symptoms the text mentions
+        Negated symptoms ("no headache") do not count
+        """
+        phrases = list(dict.fromkeys(
+            " ".join(words[i:i + n])
+            for words in affirmed_runs(text)
+            for n in range(1, self.max_words + 1)
+            for i in range(len(words) - n + 1)
+        ))
+        if not phrases or self.keys.size == 0:
+            return []
+
+        hashes = np.array([term_hash(p) for p in phrases], dtype=np.uint64)
+        positions = np.searchsorted(self.keys, hashes)
+        positions[positions == self.keys.size] = 0
+        hits = np.flatnonzero(self.keys[positions] == hashes)
+
+        matched: Dict[int, List[str]] = {}
+        for hit in hits:
+            slot = positions[hit]
+            for condition in self.postings[self.offsets[slot]:self.offsets[slot + 1]]:
+                matched.setdefault(int(condition), []).append(phrases[hit])
+
+        ranked = sorted(
+            matched.items(),
+            key=lambda item: (-len(item[1]), -len(item[1]) / len(self.conditions[item[0]]["symptoms"])),
+        )
+        results = []
+        for condition_id, symptoms in ranked[:limit]:
+            condition = self.conditions[condition_id]
+            results.append({
+                "condition": condition["name"],
+                "matched_symptoms": symptoms,
+                "score": round(len(symptoms) / len(condition["symptoms"]), 2),
+                "specialist": condition.get("specialist"),
+                "urgency": condition.get("urgency"),
+            })
+        return results
+
+
+class KnowledgeBase:
+    """Builds (when stale) and memory-maps the knowledge indexes"""
+
+    def __init__(self, data_dir: str, index_dir: str):
+        self.data_dir = Path(data_dir)
+        self.index_dir = Path(index_dir)
+        self._interactions: Optional[InteractionIndex] = None
+        self._symptoms: Optional[SymptomIndex] = None
+
+    @property
+    def interactions(self) -> InteractionIndex:
+        if self._interactions is None:
+            self._load()
+        return self._interactions
+
+    @property
+    def symptoms(self) -> SymptomIndex:
+        if self._symptoms is None:
+            self._load()
+        return self._symptoms
+
+    def _load(self) -> None:
+        interaction_seed = json.loads((self.data_dir / "drug_interactions.json").read_text(encoding="utf-8"))
+        symptom_seed = json.loads((self.data_dir / "symptom_conditions.json").read_text(encoding="utf-8"))
+
+        digest = hashlib.sha256(
+            json.dumps([INDEX_VERSION, interaction_seed, symptom_seed], sort_keys=True).encode()
+        ).hexdigest()
+        try:
+            meta = json.loads((self.index_dir / "meta.json").read_text())
+        except (OSError, ValueError):
+            meta = {}
+        if meta.get("digest") != digest:
+            meta = self._build(interaction_seed, symptom_seed, digest)
+
+        try:
+            self._map(interaction_seed, symptom_seed, meta)
+        except (OSError, ValueError, KeyError) as e:
+            # A missing or truncated array (e.g. deleted, or a build that was cut off)
+            print(f"⚠️ Knowledge index unreadable ({e}), rebuilding")
+            meta = self._build(interaction_seed, symptom_seed, digest)
+            self._map(interaction_seed, symptom_seed, meta)
+
+    def _map(
+        self, interaction_seed: Dict[str, Any], symptom_seed: Dict[str, Any], meta: Dict[str, Any]
+    ) -> None:
+        def mapped(name: str) -> np.ndarray:
+            return np.load(self.index_dir / f"{name}.npy", mmap_mode="r")
+
+        interactions = InteractionIndex(
+            mapped("interaction_keys"), mapped("interaction_records"), interaction_seed
+        )
+        self._symptoms = SymptomIndex(
+            mapped("symptom_keys"),
+            mapped("symptom_offsets"),
+            mapped("symptom_postings"),
+            symptom_seed,
+            meta["max_words"],
+        )
+        self._interactions = interactions
+
+    def _build(
+        self, interaction_seed: Dict[str, Any], symptom_seed: Dict[str, Any], digest: str
+    ) -> Dict[str, Any]:
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+
+        # Drug pairs -> interaction record, sorted by pair key
+        pairs: Dict[int, int] = {}
+        for record, item in enumerate(interaction_seed["interactions"]):
+            for first, second in combinations(item["drugs"], 2):
+                key = pair_keys(
+                    np.array([term_hash(normalize_term(first))], dtype=np.uint64),
+                    np.array([term_hash(normalize_term(second))], dtype=np.uint64),
+                )[0]
+                pairs.setdefault(int(key), record)
+        keys = np.array(sorted(pairs), dtype=np.uint64)
+        _atomic_save(self.index_dir / "interaction_keys.npy", keys)
+        _atomic_save(
+            self.index_dir / "interaction_records.npy",
+            np.array([pairs[int(k)] for k in keys], dtype=np.int32),
+        )
+
+        # Symptom phrase -> condition ids, as CSR arrays sorted by phrase hash
+        postings_by_phrase: Dict[int, List[int]] = {}
+        max_words = 1
+        for condition_id, condition in enumerate(symptom_seed["conditions"]):
+            for symptom in condition["symptoms"]:
+                phrase = normalize_term(symptom)
+                max_words = max(max_words, len(phrase.split()))
+                postings_by_phrase.setdefault(term_hash(phrase), []).append(condition_id)
+        symptom_keys = np.array(sorted(postings_by_phrase), dtype=np.uint64)
+        lists = [postings_by_phrase[int(k)] for k in symptom_keys]
+        offsets = np.zeros(len(lists) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(ids) for ids in lists])
+        postings = np.array([i for ids in lists for i in ids], dtype=np.int32)
+        _atomic_save(self.index_dir / "symptom_keys.npy", symptom_keys)
+        _atomic_save(self.index_dir / "symptom_offsets.npy", offsets)
+        _atomic_save(self.index_dir / "symptom_postings.npy", postings)
+
+        meta = {"digest": digest, "max_words": max_words}
+        _atomic_write(self.index_dir / "meta.json", lambda f: f.write(json.dumps(meta).encode()))
+        print(f"📚 Built knowledge index: {len(keys)} drug pairs, {len(symptom_keys)} symptoms")
+        return meta
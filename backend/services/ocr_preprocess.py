@@ -0,0 +1,123 @@
+"""
+MediBytes Backend - OCR Image Pre-normalisation
+Brings photos and scans to a size and form Tesseract reads well
+"""
+
+from typing import Optional, Tuple
+import numpy as np
+from PIL import Image, ImageOps
+
+# Page statistics are estimated on a copy no larger than this (longest side)
+_ANALYSIS_SIZE = 1024
+# Fraction of a row/column that must be ink for it to count as content
+_INK_FRACTION = 0.005
+# An unbroken stroke longer than this fraction of the content height (or
+# width) is a table rule or border, not text
+_RULE_LENGTH = 0.1
+# Never shrink by more than this, or below this longest side: a wrong line
+# height estimate must not be able to reduce a page to a thumbnail
+_MIN_SCALE = 0.5
+_MIN_OUTPUT_SIDE = 1000
+
+
+def otsu_threshold(gray: np.ndarray) -> int:
+    """Grey level that best separates ink from paper (Otsu's method)"""
+    hist = np.bincount(gray.ravel(), minlength=256).astype(np.float64)
+    weight = np.cumsum(hist)
+    total = weight[-1]
+    if total == 0:
+        return 128
+    mean = np.cumsum(hist * np.arange(256))
+    between = (mean[-1] * weight - mean * total) ** 2 / (weight * (total - weight) + 1e-9)
+    return int(np.argmax(between))
+
+
+def content_box(ink: np.ndarray) -> Optional[Tuple[int, int, int, int]]:
+    """(top, bottom, left, right) of the region containing ink, or None"""
+    rows = np.flatnonzero(ink.mean(axis=1) > _INK_FRACTION)
+    cols = np.flatnonzero(ink.mean(axis=0) > _INK_FRACTION)
+    if rows.size == 0 or cols.size == 0:
+        return None
+    return int(rows[0]), int(rows[-1]) + 1, int(cols[0]), int(cols[-1]) + 1
+
+
+def longest_runs(ink: np.ndarray) -> np.ndarray:
+    """Length of the longest run of consecutive inked rows in each column"""
+    run = np.zeros(ink.shape[1], dtype=np.int32)
+    longest = np.zeros(ink.shape[1], dtype=np.int32)
+    for row in ink:
+        run = (run + 1) * row
+        np.maximum(longest, run, out=longest)
+    return longest
+
+
+def text_line_height(ink: np.ndarray) -> Optional[float]:
+    """
+    Median height of runs of consecutive inked rows, i.e. text lines
+    Vertical rules (e.g. table column lines) would ink every row and merge
+    the whole page into one "line", so their columns are ignored; rows
+    crossed by a horizontal rule are treated as gaps. Rows count as inked
+    relative to the emptiest rows, so leftover rule ink (dotted or broken
+    lines) does not merge lines either.
+    """
+    if ink.size == 0:
+        return None
+    height, width = ink.shape
+    text_ink = ink[:, longest_runs(ink) <= _RULE_LENGTH * height]
+    if text_ink.shape[1] == 0:
+        return None
+    rule_rows = longest_runs(text_ink.T) > _RULE_LENGTH * width
+    fraction = text_ink.mean(axis=1)
+    baseline = np.percentile(fraction[~rule_rows], 5) if not rule_rows.all() else 0.0
+    rows = (fraction > baseline + _INK_FRACTION) & ~rule_rows
+    edges = np.flatnonzero(np.diff(np.concatenate(([False], rows, [False])).astype(np.int8)))
+    runs = edges[1::2] - edges[::2]
+    runs = runs[runs >= 2]
+    if runs.size == 0:
+        return None
+    return float(np.median(runs))
+
+
+def normalize_for_ocr(
+    image: Image.Image, target_text_height: int = 40, crop_margin: int = 16
+) -> Image.Image:
+    """
+    EXIF-orient, grayscale, crop to content and downscale to a text height
+
+    Statistics (threshold, content box, line height) come from a downsampled
+    copy, so their cost does not depend on the camera resolution. Images
+    whose text is already at or below target_text_height pixels per line are
+    never enlarged, and no image is shrunk below _MIN_SCALE or a longest
+    side of _MIN_OUTPUT_SIDE pixels.
+    """
+    image = ImageOps.exif_transpose(image).convert("L")
+    gray = np.asarray(image)
+
+    step = max(1, -(-max(gray.shape) // _ANALYSIS_SIZE))
+    sample = gray[::step, ::step]
+    ink = sample < otsu_threshold(sample)
+
+    box = content_box(ink)
+    if box is not None:
+        top, bottom, left, right = (edge * step for edge in box)
+        height, width = gray.shape
+        image = image.crop((
+            max(0, left - crop_margin),
+            max(0, top - crop_margin),
+            min(width, right + crop_margin),
+            min(height, bottom + crop_margin),
+        ))
+        ink = ink[box[0]:box[1], box[2]:box[3]]
+
+    line_height = text_line_height(ink)
+    if line_height is not None:
+        scale = max(
+            target_text_height / (line_height * step),
+            _MIN_SCALE,
+            min(1.0, _MIN_OUTPUT_SIDE / max(image.size)),
+        )
+        if scale < 1:
+            size = (max(1, round(image.width * scale)), max(1, round(image.height * scale)))
+            image = image.resize(size, Image.LANCZOS)
+
+    return image
@@ -0,0 +1,69 @@
+"""
+MediBytes Backend - OCR Worker Functions
+Run inside the OCR process pool; kept top-level so they can be pickled
+"""
+
+from typing import Tuple
+import io
+import os
+import time
+import pytesseract
+from PIL import Image
+import pdf2image
+
+from services.ocr_preprocess import normalize_for_ocr
+
+# Configure Tesseract path for Windows
+if os.name == 'nt':  # Windows
+    tesseract_path = r'C:\Program Files\Tesseract-OCR\tesseract.exe'
+    if os.path.exists(tesseract_path):
+        pytesseract.pytesseract.tesseract_cmd = tesseract_path
+
+
+def init_worker() -> None:
+    """Pool initializer: one Tesseract thread per worker process"""
+    # Parallelism comes from the pool; letting every tesseract process spawn
+    # its own OpenMP threads as well only oversubscribes the CPU.
+    os.environ["OMP_THREAD_LIMIT"] = "1"
+
+
+def ocr_pdf_page(
+    pdf_path: str, page_number: int, dpi: int = 200, grayscale: bool = True
+) -> Tuple[int, str, float]:
+    """
+    Rasterise and OCR a single PDF page; returns (page, text, seconds)
+    Only this page is ever rendered, and it is freed before returning, so a
+    worker's memory is bounded by one page regardless of document length.
+    """
+    start = time.perf_counter()
+    images = pdf2image.convert_from_path(
+        pdf_path,
+        dpi=dpi,
+        grayscale=grayscale,
+        first_page=page_number,
+        last_page=page_number,
+    )
+    text = ""
+    for image in images:
+        text = pytesseract.image_to_string(image)
+        image.close()
+    del images
+    return page_number, text, time.perf_counter() - start
+
+
+def ocr_image(
+    file_content: bytes,
+    grayscale: bool = True,
+    normalize: bool = True,
+    target_text_height: int = 40,
+    crop_margin: int = 16,
+) -> Tuple[int, str, float]:
+    """OCR an image file; returns (1, text, seconds)"""
+    start = time.perf_counter()
+    with Image.open(io.BytesIO(file_content)) as image:
+        if normalize:
+            image = normalize_for_ocr(image, target_text_height, crop_margin)
+        elif grayscale:
+            image = image.convert("L")
+        text = pytesseract.image_to_string(image)
+    return 1, text, time.perf_counter() - start
@@ -0,0 +1,127 @@
+"""
+MediBytes Backend - Pin Reconciliation
+Finds Pinata pins that no database row references and optionally unpins them
+"""
+
+from typing import Dict, Any, List, Optional
+from datetime import datetime, timedelta, timezone
+import asyncio
+import json
+
+from services.ipfs_gateway import parse_cid
+
+
+def cid_key(cid: str) -> bytes:
+    """
+    Compact, version-independent key for a CID (codec byte + digest)
+    CIDv0 and CIDv1 spellings of the same dag-pb node map to the same key.
+    """
+    try:
+        _, codec, _, digest = parse_cid(cid)
+        return bytes([codec & 0xFF]) + digest
+    except ValueError:
+        return cid.encode()
+
+
+def _normalize_cid(value: Any) -> Optional[str]:
+    """Extract a plain CID from legacy JSON-encoded upload results"""
+    if isinstance(value, dict):
+        value = value.get("cid")
+    elif isinstance(value, str) and value.startswith("{"):
+        try:
+            value = json.loads(value).get("cid")
+        except ValueError:
+            return None
+    return value or None
+
+
+class PinReconciler:
+    """Diff Pinata pins against CIDs referenced in the database"""
+
+    def __init__(
+        self,
+        ipfs_service,
+        db_service,
+        grace_hours: int = 24,
+        batch_size: int = 25,
+        batch_pause: float = 1.0,
+    ):
+        self.ipfs = ipfs_service
+        self.db = db_service
+        # Uploads are pinned before their database row is written
+        self.grace = timedelta(hours=grace_hours)
+        self.batch_size = batch_size
+        self.batch_pause = batch_pause
+
+    async def run(self, dry_run: bool = True) -> Dict[str, Any]:
+        """
+        Reconcile pins with the database
+        With dry_run=False, orphaned pins older than the grace period are unpinned
+        """
+        referenced = {
+            cid_key(cid)
+            for cid in map(_normalize_cid, await self.db.get_referenced_cids())
+            if cid
+        }
+
+        cutoff = datetime.now(timezone.utc) - self.grace
+        pinned_keys = set()
+        orphans: List[Dict[str, Any]] = []
+        recent_orphans = 0
+
+        async for row in self.ipfs.iter_pinned_files():
+            cid = row["ipfs_pin_hash"]
+            key = cid_key(cid)
+            pinned_keys.add(key)
+            if key in referenced:
+                continue
+
+            if self._pinned_at(row) > cutoff:
+                recent_orphans += 1
+                continue
+            orphans.append({"cid": cid, "size": row.get("size", 0)})
+
+        report = {
+            "dry_run": dry_run,
+            "pinned": len(pinned_keys),
+            "referenced": len(referenced),
+            "orphaned": [orphan["cid"] for orphan in orphans],
+            "orphaned_bytes": sum(orphan["size"] for orphan in orphans),
+            "skipped_recent": recent_orphans,
+            "missing_pins": len(referenced - pinned_keys),
+            "unpinned": 0,
+            "failed": [],
+        }
+
+        if not dry_run:
+            unpinned, failed = await self._unpin_in_batches(report["orphaned"])
+            report["unpinned"] = unpinned
+            report["failed"] = failed
+
+        return report
+
+    async def _unpin_in_batches(self, cids: List[str]) -> tuple:
+        unpinned = 0
+        failed = []
+        for start in range(0, len(cids), self.batch_size):
+            batch = cids[start : start + self.batch_size]
+            results = await asyncio.gather(*(self.ipfs.unpin(cid) for cid in batch))
+            for cid, ok in zip(batch, results):
+                if ok:
+                    unpinned += 1
+                else:
+                    failed.append(cid)
+
+            # Stay under Pinata's API rate limit between batches
+            if start + self.batch_size < len(cids):
+                await asyncio.sleep(self.batch_pause)
+
+        return unpinned, failed
+
+    def _pinned_at(self, row: Dict[str, Any]) -> datetime:
+        try:
+            pinned = datetime.fromisoformat(row["date_pinned"].replace("Z", "+00:00"))
+            return pinned if pinned.tzinfo else pinned.replace(tzinfo=timezone.utc)
+        except (KeyError, AttributeError, ValueError):
+            # Unknown age: treat as recent so it is never unpinned blindly
+            return datetime.now(timezone.utc)
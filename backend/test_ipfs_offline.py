@@ -0,0 +1,104 @@
+"""
+Test script to exercise IPFSService offline against the local Pinata stand-in
+"""
+import asyncio
+import os
+import subprocess
+import sys
+import time
+
+STANDIN_PORT = 8765
+STANDIN_URL = f"http://127.0.0.1:{STANDIN_PORT}"
+
+# Point the service at the stand-in before config is imported
+os.environ["PINATA_API_URL"] = STANDIN_URL
+os.environ["PINATA_GATEWAY"] = STANDIN_URL
+os.environ["IPFS_GATEWAYS"] = ""
+# Importing services builds the Supabase clients, which need a URL and key
+# (nothing connects); the encryption key only has to be stable for the run
+os.environ.setdefault("SUPABASE_URL", "http://127.0.0.1:1")
+os.environ.setdefault("SUPABASE_KEY", "offline")
+os.environ.setdefault("MASTER_ENCRYPTION_KEY", "offline-test-key")
+
+from services.ipfs import IPFSService
+
+PATIENT_ADDRESS = "0xBeDdBdED049f68D005723d4077314Afe0d5D326f"
+
+
+async def test_ipfs_offline():
+    print("=" * 60)
+    print("🧪 Testing IPFSService against local Pinata stand-in")
+    print("=" * 60)
+
+    ipfs = IPFSService()
+
+    print("\n1️⃣ Checking connection...")
+    assert await ipfs.test_connection()
+
+    print("\n2️⃣ Uploading encrypted file...")
+    original = os.urandom(3 * 1024 * 1024 + 17)
+    encrypted = await ipfs.encrypt_file_async(original, PATIENT_ADDRESS)
+    upload = await ipfs.upload_to_pinata(encrypted, "report.pdf", {"report_type": "lab"})
+    print(f"   ✅ CID: {upload['cid']}")
+
+    print("\n3️⃣ Fetching and decrypting a byte range...")
+    path = await ipfs.fetch_cached(upload["cid"])
+    assert await ipfs.get_decrypted_size(path, PATIENT_ADDRESS) == len(original)
+    start, end = 1024 * 1024 - 5, 2 * 1024 * 1024 + 5
+    chunks = [c async for c in ipfs.iter_decrypted_range(path, PATIENT_ADDRESS, start, end)]
+    assert b"".join(chunks) == original[start : end + 1]
+    print("   ✅ Range decrypted correctly")
+
+    print("\n3️⃣b Streaming from one open file...")
+    decrypted = await ipfs.open_cached(upload["cid"], PATIENT_ADDRESS)
+    assert await decrypted.read(0, 7) == original[:8]
+    # Evicted from the cache mid-stream: the open file is still read
+    os.remove(path)
+    chunks = [c async for c in decrypted.iter_range(start, end)]
+    decrypted.close()
+    assert b"".join(chunks) == original[start : end + 1]
+    print("   ✅ Range read after the cache entry was evicted")
+
+    print("\n3️⃣c Legacy single-token file...")
+    legacy = ipfs._get_cipher(PATIENT_ADDRESS).encrypt(original[:4096])
+    legacy_upload = await ipfs.upload_to_pinata(legacy, "legacy.pdf", {"report_type": "lab"})
+    decrypted = await ipfs.open_cached(legacy_upload["cid"], PATIENT_ADDRESS)
+    assert decrypted.size == 4096
+    assert await decrypted.read(10, 99) == original[10:100]
+    decrypted.close()
+    assert await ipfs.unpin(legacy_upload["cid"])
+    print("   ✅ Legacy file decrypted once and sliced")
+
+    print("\n4️⃣ Uploading and fetching JSON...")
+    metadata = {"extracted_text": "Hemoglobin: 13.5 g/dL", "report_type": "lab"}
+    json_upload = await ipfs.upload_json(metadata, "extracted_text.json")
+    assert await ipfs.fetch_json(json_upload["cid"]) == metadata
+    print(f"   ✅ CID: {json_upload['cid']}")
+
+    print("\n5️⃣ Pin management...")
+    assert await ipfs.pin_by_cid(json_upload["cid"])
+    pinned = [row["ipfs_pin_hash"] async for row in ipfs.iter_pinned_files(page_size=1)]
+    assert set(pinned) == {upload["cid"], json_upload["cid"]}
+    assert await ipfs.unpin(json_upload["cid"])
+    pinned = [row["ipfs_pin_hash"] async for row in ipfs.iter_pinned_files()]
+    assert pinned == [upload["cid"]]
+    print(f"   ✅ {len(pinned)} pin(s) remaining")
+
+    print(f"\n📊 Gateway stats: {ipfs.get_gateway_stats()}")
+
+    print("\n" + "=" * 60)
+    print("✅ Test Complete")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    standin = subprocess.Popen(
+        [sys.executable, "pinata_standin.py", "--port", str(STANDIN_PORT)],
+        stdout=subprocess.DEVNULL,
+    )
+    try:
+        time.sleep(1)
+        asyncio.run(test_ipfs_offline())
+    finally:
+        standin.terminate()
+        standin.wait()
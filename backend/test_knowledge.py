@@ -0,0 +1,59 @@
+"""
+Test script for the local knowledge indexes: negated symptoms, and
+rebuilding an index whose files are missing (runs offline)
+"""
+import os
+import tempfile
+from pathlib import Path
+
+# Importing services connects nothing, but the clients need configuration
+os.environ.setdefault("SUPABASE_URL", "http://127.0.0.1:1")
+os.environ.setdefault("SUPABASE_KEY", "offline")
+
+from services.knowledge import KnowledgeBase, affirmed_runs
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+
+RUNS = [
+    ("no headache", []),
+    ("Headache, no fever or chills", [["headache"]]),
+    ("I don't have a cough but my throat is sore", [["i", "do"], ["my", "throat", "is", "sore"]]),
+    ("Denies chest pain. Wheezing at night", [["wheezing", "at", "night"]]),
+]
+
+
+def matched_symptoms(kb: KnowledgeBase, text: str):
+    return {s for c in kb.symptoms.match(text, limit=50) for s in c["matched_symptoms"]}
+
+
+def test_knowledge():
+    print("=" * 60)
+    print("🧪 Testing knowledge indexes")
+    print("=" * 60)
+
+    for text, expected in RUNS:
+        assert affirmed_runs(text) == expected, (text, affirmed_runs(text))
+        print(f"   ✅ {text!r}: {expected}")
+
+    with tempfile.TemporaryDirectory() as index_dir:
+        kb = KnowledgeBase(DATA_DIR, index_dir)
+        assert matched_symptoms(kb, "headache") == {"headache"}
+        assert matched_symptoms(kb, "no headache") == set()
+        assert matched_symptoms(kb, "fever, no headache") == {"fever"}
+        print("   ✅ Negated symptoms are not matched")
+
+        # meta.json is current but an array is gone: rebuilt, not a crash
+        os.unlink(Path(index_dir) / "symptom_postings.npy")
+        kb = KnowledgeBase(DATA_DIR, index_dir)
+        assert matched_symptoms(kb, "headache") == {"headache"}
+        assert (Path(index_dir) / "symptom_postings.npy").exists()
+        assert not [p for p in os.listdir(index_dir) if p.endswith(".tmp")]
+        print("   ✅ Missing index file rebuilt")
+
+    print("\n" + "=" * 60)
+    print("✅ Test Complete")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    test_knowledge()
@@ -0,0 +1,47 @@
+"""
+Test script for the lab-value scanner: report lines and the lab values
+scan_lab_values must read from them (runs offline)
+"""
+import os
+
+# Importing services connects nothing, but the clients need configuration
+os.environ.setdefault("SUPABASE_URL", "http://127.0.0.1:1")
+os.environ.setdefault("SUPABASE_KEY", "offline")
+
+from services.ai_analysis import scan_lab_values
+
+CASES = [
+    ("Hemoglobin: 12.5 g/dL (Normal: 13-17)", [("Hemoglobin", "12.5", "g/dL", "13-17", "low")]),
+    ("Glucose 95 mg/dL 70-110", [("Glucose", "95", "mg/dL", "70-110", "normal")]),
+    ("WBC Count 7.2 10^3/uL 4.0 - 10.0", [("WBC Count", "7.2", "10^3/uL", "4.0 - 10.0", "normal")]),
+    ("Total Cholesterol: 240 mg/dL (<200)", [("Total Cholesterol", "240", "mg/dL", "<200", "high")]),
+    ("- Glucose 95mg/dL(70-110)", [("Glucose", "95", "mg/dL", "70-110", "normal")]),
+    # A number is never split into a value and the start of a range
+    ("Platelets 150-450 200", []),
+    # The qualifier belongs to the name, and "mL" of "ng/mL" is not a name
+    ("Vitamin D 25-OH: 18 ng/mL 30-100", [("Vitamin D 25-OH", "18", "ng/mL", "30-100", "low")]),
+    # Linear on one long hyphenated token
+    ("a-" * 50000, []),
+]
+
+
+def test_lab_parser():
+    print("=" * 60)
+    print("🧪 Testing scan_lab_values")
+    print("=" * 60)
+
+    for text, expected in CASES:
+        found = [
+            (lab.parameter, lab.value, lab.unit, lab.normal_range, lab.status)
+            for lab in scan_lab_values(text)
+        ]
+        assert found == expected, (text[:60], found)
+        print(f"   ✅ {text[:40]!r}: {len(found)} value(s)")
+
+    print("\n" + "=" * 60)
+    print("✅ Test Complete")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    test_lab_parser()
@@ -317,6 +317,7 @@ export function UploadRecord() {
   const [loading, setLoading] = useState(false)
   const [error, setError] = useState('')
   const [success, setSuccess] = useState(false)
+  const [uploadStage, setUploadStage] = useState('')
   const { logout } = useAuth()
   const [isVisible, setIsVisible] = useState(false)
 
@@ -403,7 +404,42 @@ const handleSubmit = async (e: React.FormEvent) => {
       throw new Error(errorData.detail || `Failed to upload report (${response.status})`)
     }
 
-    await response.json()
+    // Step 5: Processing continues in a background job; follow its progress
+    const { job_id } = await response.json()
+    if (job_id) {
+      const events = await fetch(`${BACKEND_API_URL}/api/jobs/${job_id}/events`, {
+        headers: {
+          'Authorization': `Bearer ${session.access_token}`,
+        },
+      })
+      if (!events.ok || !events.body) {
+        throw new Error(`Failed to track upload (${events.status})`)
+      }
+
+      const reader = events.body.getReader()
+      const decoder = new TextDecoder()
+      let buffer = ''
+      let job: any = null
+      while (true) {
+        const { done, value } = await reader.read()
+        if (done) break
+        buffer += decoder.decode(value, { stream: true })
+        const messages = buffer.split('\n\n')
+        buffer = messages.pop() || ''
+        for (const message of messages) {
+          const data = message.split('\n').find((line) => line.startsWith('data: '))
+          if (data) {
+            job = JSON.parse(data.slice(6))
+            setUploadStage(job.stage || job.status)
+          }
+        }
+      }
+
+      if (!job || job.status !== 'succeeded') {
+        throw new Error(job?.error || 'Failed to process report')
+      }
+    }
+
     setSuccess(true)
     setError('')
     
@@ -415,6 +451,7 @@ const handleSubmit = async (e: React.FormEvent) => {
     setError(err.message || 'Failed to upload report')
   } finally {
     setLoading(false)
+    setUploadStage('')
   }
 }
 
@@ -578,7 +615,7 @@ const handleSubmit = async (e: React.FormEvent) => {
                 disabled={loading}
                 className="w-full px-6 py-4 bg-gradient-to-r from-primary-500 to-teal-500 text-white rounded-xl font-semibold shadow-lg hover:shadow-xl transition-all disabled:opacity-50 disabled:cursor-not-allowed"
               >
-                {loading ? 'Uploading...' : 'Upload Report'}
+                {loading ? (uploadStage ? `Processing (${uploadStage})...` : 'Uploading...') : 'Upload Report'}
               </button>
             </div>
           </form>
@@ -1,6 +1,6 @@
 import { useState } from 'react'
 import { useNavigate } from 'react-router-dom'
-import { analyzeLabReport, AnalysisData, LabValue } from './services/mlApi'
+import { analyzeLabReportStream, AnalysisData, LabValue } from './services/mlApi'
 
 // Icons
 const UploadIcon = () => (
@@ -87,7 +87,11 @@ export default function HealthInsights() {
     setError('')
     
     try {
-      const result = await analyzeLabReport(file)
+      // Show the analysis as the model writes it, then the final result
+      const result = await analyzeLabReportStream(file, (partial) => {
+        if (partial.extracted_text) setExtractedText(partial.extracted_text)
+        if (partial.analysis) setAnalysis(partial.analysis)
+      })
       
       setExtractedText(result.extracted_text || '')
       
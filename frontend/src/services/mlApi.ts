@@ -57,6 +57,7 @@ export interface AnalysisData {
 export interface AnalysisResult {
   extracted_text: string;
   analysis: AnalysisData | string;
+  cached?: boolean;              // Served from the ML service's analysis cache
 }
 
 /**
@@ -76,6 +77,58 @@ export async function analyzeLabReport(file: File): Promise<AnalysisResult> {
   return response.json();
 }
 
+/**
+ * Full analysis, streamed - calls onUpdate as each field of the analysis arrives
+ */
+export async function analyzeLabReportStream(
+  file: File,
+  onUpdate: (partial: Partial<AnalysisResult> & { analysis?: AnalysisData }) => void
+): Promise<AnalysisResult> {
+  const formData = new FormData();
+  formData.append('file', file);
+
+  const response = await fetch(`${ML_API}/analyze?stream=true`, {
+    method: 'POST',
+    headers,
+    body: formData
+  });
+
+  if (!response.ok || !response.body) throw new Error('Analysis failed');
+
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+  let extractedText = '';
+  const fields: AnalysisData = {};
+  while (true) {
+    const { done, value } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+    const messages = buffer.split('\n\n');
+    buffer = messages.pop() || '';
+    for (const message of messages) {
+      const event = message.split('\n').find((line) => line.startsWith('event: '))?.slice(7);
+      const data = message.split('\n').find((line) => line.startsWith('data: '));
+      if (!event || !data) continue;
+      const payload = JSON.parse(data.slice(6));
+
+      if (event === 'text') {
+        extractedText = payload.extracted_text;
+        onUpdate({ extracted_text: extractedText });
+      } else if (event === 'field') {
+        (fields as any)[payload.name] = payload.value;
+        onUpdate({ extracted_text: extractedText, analysis: { ...fields } });
+      } else if (event === 'done') {
+        return payload as AnalysisResult;
+      } else if (event === 'error') {
+        throw new Error(payload.error || 'Analysis failed');
+      }
+    }
+  }
+
+  throw new Error('Analysis stream ended unexpectedly');
+}
+
 /**
  * Analyze manually entered lab values
  */
@@ -22,4 +22,8 @@ def create_app():
     from app.routes.analysis import analysis_bp
     app.register_blueprint(analysis_bp, url_prefix='/api')
     
+    # Load the OCR model in the background; /api/health reports when it is ready
+    from app.utils.ocr_model import start_warm_up
+    start_warm_up()
+    
     return app
@@ -12,6 +12,40 @@ class Config:
     # OCR Configuration
     OCR_LANGUAGES = ['en']
     OCR_GPU = True
+    # SQLite OCR result cache, shared by the gunicorn workers and, by default,
+    # with the backend (the repository's .ocr_cache); empty disables it
+    OCR_CACHE_PATH = os.environ.get(
+        'OCR_CACHE_PATH',
+        os.path.join(os.path.dirname(__file__), '..', '..', '.ocr_cache', 'ocr_results.sqlite3'),
+    )
+    # DocTR micro-batching: pages per model call, and how long to wait for more
+    OCR_MAX_BATCH_SIZE = int(os.environ.get('OCR_MAX_BATCH_SIZE', 8))
+    OCR_BATCH_WAIT_MS = float(os.environ.get('OCR_BATCH_WAIT_MS', 10))
+    # Longest a request waits for its pages to be recognised, in seconds
+    OCR_TIMEOUT = float(os.environ.get('OCR_TIMEOUT', 120))
+    # Torch intra-op threads per process (0 = torch default); gunicorn.conf.py
+    # sets this per worker so workers do not oversubscribe the CPUs
+    TORCH_THREADS = int(os.environ.get('TORCH_THREADS', 0))
+    
+    # Keep-alive connections to Ollama per worker process
+    OLLAMA_POOL_SIZE = int(os.environ.get('OLLAMA_POOL_SIZE', 10))
+    
+    # LLM analysis cache: in-memory entries per worker (0 disables), lifetime,
+    # and an optional SQLite file shared by all workers (empty = memory only)
+    LLM_CACHE_SIZE = int(os.environ.get('LLM_CACHE_SIZE', 512))
+    LLM_CACHE_TTL = int(os.environ.get('LLM_CACHE_TTL', 86400))
+    LLM_CACHE_PATH = os.environ.get('LLM_CACHE_PATH', '')
+    
+    # Answer from REFERENCE_RANGES alone when they recognise at least this
+    # fraction of the result lines in a report (1.1 = always use the LLM)
+    FAST_PATH_MIN_COVERAGE = float(os.environ.get('FAST_PATH_MIN_COVERAGE', 0.8))
+    
+    # Analyte catalogue (synonyms, units, sex/age ranges) used by ReportAnalyzer;
+    # REFERENCE_RANGES below override its default ranges
+    METRIC_CATALOGUE_PATH = os.environ.get(
+        'METRIC_CATALOGUE_PATH',
+        os.path.join(os.path.dirname(__file__), 'data', 'metric_catalogue.json'),
+    )
     
     # Health metrics reference ranges
     REFERENCE_RANGES = {
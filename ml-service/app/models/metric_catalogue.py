@@ -0,0 +1,193 @@
+import json
+import re
+from functools import lru_cache
+
+import numpy as np
+
+from app.config import Config
+
+SEX_CODES = {'male': 1, 'm': 1, 'female': 2, 'f': 2}
+
+_NUMBER = r'\d+(?:\.\d+)?'
+# A gap of spaces/tabs that never crosses a line
+_GAP = r'[^\S\n]*'
+_UNIT = r'(?:x' + _GAP + r')?10\^\d+/[A-Za-z]+|[A-Za-z%/µ°][^\s(]*'
+
+
+def _trie_pattern(words):
+    """
+    Regex alternation for a set of literal words with shared prefixes
+    factored out, so matching does not try every word at every position
+    """
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[''] = None
+
+    def build(node):
+        end = '' in node
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        if end:
+            return '(?:' + body + ')?'
+        return body
+
+    return build(trie)
+
+
+def _number(text):
+    """Readings keep the form they were written in: int unless there is a decimal point"""
+    return float(text) if '.' in text else int(text)
+
+
+def normalize_name(name):
+    return ' '.join(name.replace('_', ' ').lower().split())
+
+
+def sex_code(sex):
+    """0 for unknown, 1 male, 2 female"""
+    return SEX_CODES.get(str(sex).strip().lower(), 0) if sex is not None else 0
+
+
+class MetricCatalogue:
+    """
+    Analytes with synonyms, units and sex/age-specific reference ranges,
+    compiled for single-pass extraction and vectorised range lookup
+    """
+
+    def __init__(self, metrics, overrides=None):
+        metrics = [dict(metric) for metric in metrics]
+        by_key = {metric['key']: metric for metric in metrics}
+
+        # Config.REFERENCE_RANGES stays authoritative for the defaults it names
+        for key, ref in (overrides or {}).items():
+            metric = by_key.get(key)
+            if metric is None:
+                metric = {'key': key, 'name': key.replace('_', ' ').title(),
+                          'synonyms': [normalize_name(key)], 'ranges': [{}]}
+                metrics.append(metric)
+                by_key[key] = metric
+            metric['unit'] = ref['unit']
+            metric['ranges'] = metric['ranges'][:-1] + [{'min': ref['min'], 'max': ref['max']}]
+
+        self.keys = [metric['key'] for metric in metrics]
+        self.index = {key: i for i, key in enumerate(self.keys)}
+        self.names = [metric['name'] for metric in metrics]
+        self.units = [metric.get('unit', '') for metric in metrics]
+        self.pairs = {self.index[m['key']]: self.index[m['pair']] for m in metrics if m.get('pair') in self.index}
+        self.unit_factors = [
+            {normalize_name(unit).replace(' ', ''): factor for unit, factor in m.get('unit_factors', {}).items()}
+            for m in metrics
+        ]
+
+        self.synonyms = {}
+        for i, metric in enumerate(metrics):
+            for synonym in [metric['key'], metric['name']] + metric.get('synonyms', []):
+                self.synonyms.setdefault(normalize_name(synonym), i)
+
+        # Default range per metric, plus the specific rules in priority order
+        self.default_min = np.array([m['ranges'][-1]['min'] for m in metrics], dtype=float)
+        self.default_max = np.array([m['ranges'][-1]['max'] for m in metrics], dtype=float)
+        rules = [(i, rule) for i, m in enumerate(metrics) for rule in m['ranges'][:-1]]
+        self.rule_metric = np.array([i for i, _ in rules], dtype=np.int64)
+        self.rule_sex = np.array([sex_code(rule.get('sex')) for _, rule in rules], dtype=np.int8)
+        self.rule_age_min = np.array([rule.get('age_min', -np.inf) for _, rule in rules], dtype=float)
+        self.rule_age_max = np.array([rule.get('age_max', np.inf) for _, rule in rules], dtype=float)
+        self.rule_has_age = np.array([('age_min' in rule or 'age_max' in rule) for _, rule in rules])
+        self.rule_min = np.array([rule['min'] for _, rule in rules], dtype=float)
+        self.rule_max = np.array([rule['max'] for _, rule in rules], dtype=float)
+
+        # Longest synonym wins at a position, e.g. "hdl cholesterol" over "hdl"
+        names = sorted((s for s in self.synonyms if len(s) > 1), key=len, reverse=True)
+        flexible = _trie_pattern(names).replace(r'\ ', r'[^\S\n]+')
+        # Qualifiers between name and value are skipped: "(Fasting)", or a
+        # bare number-word one such as the 25-OH of "Vitamin D 25-OH 30"
+        self.pattern = re.compile(
+            rf"""
+            (?<![A-Za-z0-9])(?P<name>{flexible})(?![A-Za-z0-9])
+            {_GAP}(?:\([^()\n]{{0,30}}\){_GAP})?
+            (?:\d+-[A-Za-z]+(?![A-Za-z0-9]){_GAP})?
+            (?:[:=\-]{_GAP})?
+            (?P<value>{_NUMBER})
+            (?:{_GAP}/{_GAP}(?P<second>{_NUMBER}))?
+            (?:{_GAP}(?P<unit>{_UNIT}))?
+            """,
+            re.IGNORECASE | re.VERBOSE,
+        )
+
+    @classmethod
+    def load(cls, path=None, overrides=None):
+        with open(path or Config.METRIC_CATALOGUE_PATH, encoding='utf-8') as f:
+            data = json.load(f)
+        return cls(data['metrics'], Config.REFERENCE_RANGES if overrides is None else overrides)
+
+    def lookup(self, name):
+        """Metric index for a key, name or synonym, or None"""
+        if name in self.index:
+            return self.index[name]
+        return self.synonyms.get(normalize_name(name))
+
+    def _convert(self, i, value, unit):
+        if unit:
+            factor = self.unit_factors[i].get(normalize_name(unit).rstrip('.,;').replace(' ', '').lstrip('x'))
+            if factor is not None:
+                return round(value * factor, 4)
+        return value
+
+    def scan(self, text):
+        """
+        [(metric index, value, start offset)] for every reading in one pass
+        over the text; values are converted to the catalogue unit
+        """
+        found = []
+        for match in self.pattern.finditer(text):
+            i = self.synonyms[normalize_name(match.group('name'))]
+            value = _number(match.group('value'))
+            unit = match.group('unit')
+            second = match.group('second')
+            if second is not None and i in self.pairs:
+                found.append((i, value, match.start()))
+                found.append((self.pairs[i], _number(second), match.start()))
+            else:
+                found.append((i, self._convert(i, value, unit), match.start()))
+        return found
+
+    def bounds(self, indices, sex=None, age=None):
+        """
+        (mins, maxs) for each metric index, vectorised; sex and age may be
+        scalars or arrays aligned with indices (sex as codes or strings,
+        unknown age as NaN/None)
+        """
+        indices = np.asarray(indices, dtype=np.int64)
+        if sex is None or isinstance(sex, str):
+            sex = np.full(indices.shape, sex_code(sex), dtype=np.int8)
+        else:
+            sex = np.asarray(sex)
+            if sex.dtype.kind in 'OUS':
+                sex = np.array([sex_code(s) for s in sex], dtype=np.int8)
+            sex = np.broadcast_to(sex, indices.shape)
+        age = np.broadcast_to(np.asarray(np.nan if age is None else age, dtype=float), indices.shape)
+
+        mins = self.default_min[indices]
+        maxs = self.default_max[indices]
+        # Apply rules lowest priority first, so the first matching rule wins;
+        # rules for metrics that are not being looked up are skipped
+        for r in np.flatnonzero(np.isin(self.rule_metric, indices))[::-1]:
+            applies = indices == self.rule_metric[r]
+            if self.rule_sex[r]:
+                applies &= sex == self.rule_sex[r]
+            if self.rule_has_age[r]:
+                applies &= (age >= self.rule_age_min[r]) & (age <= self.rule_age_max[r])
+            mins = np.where(applies, self.rule_min[r], mins)
+            maxs = np.where(applies, self.rule_max[r], maxs)
+        return mins, maxs
+
+
+@lru_cache(maxsize=None)
+def get_catalogue(path=None):
+    """Catalogue loaded and compiled once per process"""
+    return MetricCatalogue.load(path)
@@ -1,52 +1,64 @@
-import re
+import numpy as np
 from app.config import Config
+from app.models.metric_catalogue import get_catalogue, sex_code
 
 class ReportAnalyzer:
     def __init__(self):
         self.reference_ranges = Config.REFERENCE_RANGES
+        # Metric catalogue (app/data/metric_catalogue.json) with
+        # REFERENCE_RANGES applied as the default ranges of the metrics it names
+        self.catalogue = get_catalogue()
     
-    def analyze_from_text(self, text):
+    def analyze_from_text(self, text, sex=None, age=None):
         """
         Analyze health metrics from extracted text
         """
-        # Extract common health metrics from text
+        # Extract every catalogued metric from the text in one pass
         metrics = self._extract_metrics_from_text(text)
         
         # Evaluate metrics
-        return self.evaluate_metrics(metrics)
+        return self.evaluate_metrics(metrics, sex=sex, age=age)
     
-    def analyze_from_metrics(self, metrics_data):
+    def analyze_from_metrics(self, metrics_data, sex=None, age=None):
         """
         Analyze pre-structured health metrics
         """
-        return self.evaluate_metrics(metrics_data)
+        return self.evaluate_metrics(metrics_data, sex=sex, age=age)
     
-    def evaluate_metrics(self, metrics):
+    def evaluate_metrics(self, metrics, sex=None, age=None):
         """
         Evaluate health metrics against reference ranges
+        Metrics may be named by catalogue key or any synonym; ranges depend on
+        sex ('male'/'female') and age in years when given. All comparisons
+        are done at once on arrays of values and bounds.
         """
+        known = []
+        for metric_name, value in metrics.items():
+            index = self.catalogue.lookup(metric_name)
+            if index is not None and value is not None:
+                known.append((index, value))
+        
         analyzed_metrics = []
         abnormal_count = 0
         
-        for metric_name, value in metrics.items():
-            if metric_name in self.reference_ranges:
-                ref_range = self.reference_ranges[metric_name]
-                
-                is_normal = ref_range['min'] <= value <= ref_range['max']
-                status = 'normal' if is_normal else 'abnormal'
-                
-                if not is_normal:
-                    abnormal_count += 1
-                
+        if known:
+            indices = np.array([index for index, _ in known])
+            values = np.array([value for _, value in known], dtype=float)
+            mins, maxs = self.catalogue.bounds(indices, sex=sex, age=age)
+            flags = np.where(values < mins, 'low', np.where(values > maxs, 'high', 'normal'))
+            abnormal_count = int(np.count_nonzero(flags != 'normal'))
+            
+            for (index, value), low, high, flag in zip(known, mins.tolist(), maxs.tolist(), flags.tolist()):
                 analyzed_metrics.append({
-                    'name': metric_name.replace('_', ' ').title(),
+                    'name': self.catalogue.names[index],
                     'value': value,
-                    'unit': ref_range['unit'],
+                    'unit': self.catalogue.units[index],
                     'normalRange': {
-                        'min': ref_range['min'],
-                        'max': ref_range['max']
+                        'min': low,
+                        'max': high
                     },
-                    'status': status
+                    'status': 'normal' if flag == 'normal' else 'abnormal',
+                    'flag': flag
                 })
         
         # Determine overall risk
@@ -71,36 +83,79 @@ class ReportAnalyzer:
             'recommendations': recommendations
         }
     
+    def analyze_batch(self, columns, sex=None, age=None):
+        """
+        Evaluate many patients at once from columnar input
+        
+        Args:
+            columns: metric name -> values, one per patient (dict of lists or
+                arrays, a pandas DataFrame or a pyarrow Table); NaN/None means
+                not measured. Unknown metric names are ignored.
+            sex: 'male'/'female' per patient (or one value for all)
+            age: age in years per patient (or one value for all)
+        
+        Returns:
+            dict of arrays: 'metrics' (keys, one per column), 'values',
+            'min', 'max' and 'flags' (patients x metrics; flags are -1 low,
+            0 normal, 1 high, and also 0 where not measured, so read them
+            with 'measured'), 'measured' and 'abnormal' masks, and per-patient
+            'abnormal_count', 'measured_count' and 'risk'. Risk follows
+            evaluate_metrics.
+        """
+        if hasattr(columns, 'column_names'):
+            columns = {name: columns.column(name).to_numpy(zero_copy_only=False) for name in columns.column_names}
+        
+        keys, indices, data = [], [], []
+        patients = 0
+        for name, values in columns.items():
+            patients = len(values)
+            index = self.catalogue.lookup(name)
+            if index is not None and index not in indices:
+                keys.append(self.catalogue.keys[index])
+                indices.append(index)
+                data.append(np.asarray(values, dtype=float))
+        
+        values = np.column_stack(data) if data else np.empty((patients, 0))
+        
+        if sex is not None and not isinstance(sex, str):
+            sex = np.array([sex_code(s) for s in sex], dtype=np.int8)[:, None]
+        if age is not None and np.ndim(age):
+            age = np.array([np.nan if a is None else a for a in age], dtype=float)[:, None]
+        mins, maxs = self.catalogue.bounds(
+            np.broadcast_to(np.array(indices, dtype=np.int64), values.shape), sex=sex, age=age
+        )
+        
+        measured = ~np.isnan(values)
+        flags = np.where(values < mins, -1, np.where(values > maxs, 1, 0)).astype(np.int8)
+        abnormal = flags != 0
+        measured_count = measured.sum(axis=1)
+        abnormal_count = abnormal.sum(axis=1)
+        
+        ratio = np.divide(abnormal_count, measured_count,
+                          out=np.zeros(len(values)), where=measured_count > 0)
+        risk = np.where(ratio > 0.5, 'high', np.where(ratio > 0.25, 'medium', 'low'))
+        
+        return {
+            'metrics': keys,
+            'values': values,
+            'min': mins,
+            'max': maxs,
+            'flags': flags,
+            'measured': measured,
+            'abnormal': abnormal,
+            'measured_count': measured_count,
+            'abnormal_count': abnormal_count,
+            'risk': risk
+        }
+    
     def _extract_metrics_from_text(self, text):
         """
-        Extract numerical health metrics from text using regex
+        Extract numerical health metrics from text in a single regex pass
+        The first reading of each metric wins
         """
         metrics = {}
-        
-        # Hemoglobin patterns
-        hemoglobin_pattern = r'hemoglobin[:\s]+(\d+\.?\d*)'
-        match = re.search(hemoglobin_pattern, text, re.IGNORECASE)
-        if match:
-            metrics['hemoglobin'] = float(match.group(1))
-        
-        # Glucose patterns
-        glucose_pattern = r'glucose[:\s]+(\d+\.?\d*)'
-        match = re.search(glucose_pattern, text, re.IGNORECASE)
-        if match:
-            metrics['glucose'] = float(match.group(1))
-        
-        # Cholesterol patterns
-        cholesterol_pattern = r'cholesterol[:\s]+(\d+\.?\d*)'
-        match = re.search(cholesterol_pattern, text, re.IGNORECASE)
-        if match:
-            metrics['cholesterol'] = float(match.group(1))
-        
-        # Blood pressure patterns
-        bp_pattern = r'blood\s+pressure[:\s]+(\d+)/(\d+)'
-        match = re.search(bp_pattern, text, re.IGNORECASE)
-        if match:
-            metrics['blood_pressure_systolic'] = int(match.group(1))
-            metrics['blood_pressure_diastolic'] = int(match.group(2))
+        for index, value, _ in self.catalogue.scan(text):
+            metrics.setdefault(self.catalogue.keys[index], value)
         
         return metrics
     
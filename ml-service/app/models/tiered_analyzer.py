@@ -0,0 +1,79 @@
+import re
+from app.config import Config
+from app.models.report_analyzer import ReportAnalyzer
+
+# A line that looks like a test result: a name, then a number on the same line
+RESULT_LINE = re.compile(r'\s*[A-Za-z][A-Za-z0-9 ().,/%-]{1,60}?[:\s]+\d')
+# Report header lines that also have that shape but are not results
+HEADER_LINE = re.compile(r'\s*(?:date|age|sex|id|patient|page|phone|mobile|time|reg|ref|sample|lab)\b', re.IGNORECASE)
+
+
+class TieredAnalyzer:
+    """
+    Rule-based analysis first, the LLM only when the rules are not enough
+
+    For callers that do not need narrative advice, the rules answer when they
+    recognise at least min_coverage of the lines that look like test
+    results; otherwise the caller falls back to the LLM.
+    """
+
+    def __init__(self, min_coverage=None):
+        self.analyzer = ReportAnalyzer()
+        self.min_coverage = Config.FAST_PATH_MIN_COVERAGE if min_coverage is None else min_coverage
+
+    def coverage(self, text):
+        """(recognised result lines, result-looking lines) in the text"""
+        candidates = [
+            line for line in text.splitlines()
+            if RESULT_LINE.match(line) and not HEADER_LINE.match(line)
+        ]
+        recognised = sum(1 for line in candidates if self.analyzer._extract_metrics_from_text(line))
+        return recognised, len(candidates)
+
+    def fast_path(self, text):
+        """
+        (analysis, coverage); analysis is None when the rules do not cover
+        enough of the report to answer on their own
+        """
+        recognised, candidates = self.coverage(text)
+        coverage = recognised / candidates if candidates else 0.0
+        if recognised == 0 or coverage < self.min_coverage:
+            return None, coverage
+        return self.to_report_analysis(self.analyzer.analyze_from_text(text)), coverage
+
+    def to_report_analysis(self, result):
+        """ReportAnalyzer output in the same shape as the LLM's JSON answer"""
+        values = []
+        concerns = []
+        positive = []
+        for metric in result['metrics']:
+            low, high = metric['normalRange']['min'], metric['normalRange']['max']
+            status = metric['flag'].upper()
+
+            values.append({
+                'test': metric['name'],
+                'value': str(metric['value']),
+                'unit': metric['unit'],
+                'reference': f"{low}-{high}",
+                'status': status,
+            })
+            if status == 'NORMAL':
+                positive.append(f"{metric['name']} is within the normal range.")
+            else:
+                concerns.append(
+                    f"{metric['name']} is {status.lower()} at {metric['value']} {metric['unit']} "
+                    f"(normal {low}-{high})."
+                )
+
+        abnormal = len(concerns)
+        return {
+            'summary': (
+                f"{len(values)} value(s) checked against standard reference ranges; "
+                f"{abnormal} outside the range. Overall risk: {result['overallRisk']}."
+            ),
+            'values': values,
+            'concerns': ' '.join(concerns) if concerns else 'All values are normal.',
+            'positive': ' '.join(positive),
+            'recommendations': '\n'.join(f"- {item}" for item in result['recommendations']),
+            'risk': result['overallRisk'],
+        }
@@ -1,47 +1,110 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, request, jsonify, stream_with_context
 from doctr.io import DocumentFile
-from doctr.models import ocr_predictor
+import numpy as np
 import requests
 import os
-import tempfile
 import json
+from contextlib import closing
+
+from app.config import Config
+from app.utils.ocr_cache import OCRCache, document_hash
+from app.utils.ocr_batcher import OCRBatcher
+from app.utils.ocr_model import predict, model_status
+from app.utils.ollama_client import (
+    OllamaClient, parse_analysis, replay_analysis_events, sse_event, stream_analysis_events,
+)
+from app.utils.llm_cache import LLMCache, cache_key
+from app.models.tiered_analyzer import TieredAnalyzer
 
 analysis_bp = Blueprint('analysis', __name__)
 
-# Load OCR model once at startup
-print("Loading DocTR model...")
-ocr_model = ocr_predictor(det_arch='db_resnet50', reco_arch='crnn_vgg16_bn', pretrained=True, assume_straight_pages=True)
-print("DocTR ready!")
+# Pages from concurrent requests share one model call; the DocTR model
+# itself is loaded per process by app.utils.ocr_model
+ocr_batcher = OCRBatcher(predict, Config.OCR_MAX_BATCH_SIZE, Config.OCR_BATCH_WAIT_MS)
+
+# Bump when OCR output would change for the same input
+OCR_ENGINE_TAG = 'doctr-1:db_resnet50+crnn_vgg16_bn:straight'
+ocr_cache = OCRCache(Config.OCR_CACHE_PATH) if Config.OCR_CACHE_PATH else None
 
 # External Ollama API (your ngrok URL)
 OLLAMA_URL = os.getenv('OLLAMA_URL', 'http://localhost:11434/api/generate')
+ANALYSIS_MODEL = 'report_analysis_model'
+ollama = OllamaClient(OLLAMA_URL, pool_size=Config.OLLAMA_POOL_SIZE)
 
+# Bump when the prompts change, so cached analyses from older prompts are not reused
+PROMPT_VERSION = '1'
+llm_cache = LLMCache(Config.LLM_CACHE_SIZE, Config.LLM_CACHE_TTL, Config.LLM_CACHE_PATH) if Config.LLM_CACHE_SIZE > 0 else None
 
-def extract_text(image_path):
-    """Extract text from image or PDF using DocTR"""
-    # Check file extension to use appropriate loader
-    file_ext = image_path.lower().split('.')[-1]
-    
-    if file_ext == 'pdf':
-        doc = DocumentFile.from_pdf(image_path)
-    else:
-        doc = DocumentFile.from_images(image_path)
-    
-    result = ocr_model(doc)
+# Reference-range rules answer first; the LLM only handles what they cannot
+tiered_analyzer = TieredAnalyzer()
+
+# Population-level scoring shares the same catalogue
+report_analyzer = tiered_analyzer.analyzer
+
+
+def extract_text(content, file_ext):
+    """
+    Extract text from an image or PDF held in memory, reusing cached results
+    for identical files; content may be bytes or a memoryview
+    """
+    content = bytes(content)
+    if ocr_cache is None:
+        return run_ocr(content, file_ext)
+
+    sha256 = document_hash(content)
+
+    # Concurrent requests for the same document share one OCR run
+    with ocr_cache.single_flight(sha256, OCR_ENGINE_TAG):
+        cached = ocr_cache.get(sha256, OCR_ENGINE_TAG)
+        if cached is not None:
+            return cached['text']
+
+        text = run_ocr(content, file_ext)
+        ocr_cache.put(sha256, OCR_ENGINE_TAG, text)
+        return text
+
+
+def load_document(content, file_ext):
+    """Decode PDF or image bytes into DocTR pages, without touching disk"""
+    if file_ext == '.pdf':
+        return DocumentFile.from_pdf(bytes(content))
+    return DocumentFile.from_images(bytes(content))
+
+
+def run_ocr(content, file_ext):
+    """Extract text from image or PDF bytes using DocTR"""
+    pages = ocr_batcher.recognize(load_document(content, file_ext), timeout=Config.OCR_TIMEOUT)
     
+    return '\n'.join(page_text(page) for page in pages)
+
+
+def upload_extension(filename):
+    """Lower-case extension of an upload, defaulting to PDF like before"""
+    return '.' + filename.split('.')[-1].lower() if '.' in filename else '.pdf'
+
+
+def page_text(page):
+    """Text of one DocTR page, one line per detected text line"""
     lines = []
-    for page in result.pages:
-        for block in page.blocks:
-            for line in block.lines:
-                text = ' '.join([word.value for word in line.words])
-                lines.append(text)
-    
+    for block in page.blocks:
+        for line in block.lines:
+            text = ' '.join([word.value for word in line.words])
+            lines.append(text)
     return '\n'.join(lines)
 
 
 @analysis_bp.route('/health', methods=['GET'])
 def health():
-    return jsonify({"status": "ok", "model": "doctr"})
+    """Readiness check: 503 until this worker's model is loaded and warmed up"""
+    model = model_status()
+    body = {
+        "status": "ok" if model["ready"] else model["status"],
+        "model": "doctr",
+        "warmup": model,
+        "batching": ocr_batcher.stats(),
+        "llm_cache": llm_cache.stats() if llm_cache is not None else None,
+    }
+    return jsonify(body), 200 if model["ready"] else 503
 
 
 @analysis_bp.route('/ocr', methods=['POST'])
@@ -52,41 +115,68 @@ def ocr_only():
     
     file = request.files['file']
     
-    # Preserve original file extension for DocTR to handle PDFs correctly
-    filename = file.filename or 'document'
-    file_ext = '.' + filename.split('.')[-1].lower() if '.' in filename else '.pdf'
+    # The extension tells DocTR whether to decode a PDF or an image
+    file_ext = upload_extension(file.filename or 'document')
     
-    with tempfile.NamedTemporaryFile(delete=False, suffix=file_ext) as tmp:
-        file.save(tmp.name)
-        try:
-            text = extract_text(tmp.name)
-            return jsonify({"text": text})
-        finally:
-            os.unlink(tmp.name)
+    text = extract_text(file.read(), file_ext)
+    return jsonify({"text": text})
 
 
-@analysis_bp.route('/analyze', methods=['POST'])
-def analyze():
-    """OCR + AI Analysis with structured health insights"""
-    if 'file' not in request.files:
-        return jsonify({"error": "No file uploaded"}), 400
-    
-    file = request.files['file']
-    
-    # Preserve original file extension for DocTR to handle PDFs correctly
-    filename = file.filename or 'document'
-    file_ext = '.' + filename.split('.')[-1].lower() if '.' in filename else '.pdf'
-    
-    with tempfile.NamedTemporaryFile(delete=False, suffix=file_ext) as tmp:
-        file.save(tmp.name)
-        try:
-            # Step 1: OCR
-            extracted_text = extract_text(tmp.name)
-            
-            # Step 2: Send to Ollama
-            response = requests.post(OLLAMA_URL, json={
-                "model": "report_analysis_model",
-                "prompt": f"""You are a doctor analyzing a lab report. Read the extracted text carefully and analyze ONLY the values present in it.
+@analysis_bp.route('/ocr/batch', methods=['POST'])
+def ocr_batch():
+    """
+    Extract text from several images/PDFs, streamed back as NDJSON
+    One line per page as soon as it is recognised, then one per document:
+        {"event": "page", "document": i, "filename", "page", "text"}
+        {"event": "document", "document": i, "filename", "pages", "cached"}
+        {"event": "error", "document": i, "filename", "error"}
+    Documents found in the OCR cache come back as a single page event with
+    "page": null holding the whole text.
+    """
+    files = request.files.getlist('files')
+    if not files:
+        return jsonify({"error": "No files uploaded"}), 400
+
+    # Read everything now; the request stream is gone once the response starts
+    documents = [(file.filename or 'document', file.read()) for file in files]
+
+    def generate():
+        for index, (filename, content) in enumerate(documents):
+            for event in ocr_document_pages(index, filename, content):
+                yield json.dumps(event) + '\n'
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+
+def ocr_document_pages(index, filename, content):
+    """Events for one batch document; its pages are recognised in shared batches"""
+    sha256 = document_hash(content) if ocr_cache is not None else None
+    cached = ocr_cache.get(sha256, OCR_ENGINE_TAG) if ocr_cache is not None else None
+    if cached is not None:
+        yield {"event": "page", "document": index, "filename": filename, "page": None, "text": cached['text']}
+        yield {"event": "document", "document": index, "filename": filename, "pages": None, "cached": True}
+        return
+
+    try:
+        pages = load_document(content, upload_extension(filename))
+
+        texts = []
+        with closing(ocr_batcher.iter_recognize(pages, timeout=Config.OCR_TIMEOUT)) as results:
+            for page_number, result in enumerate(results, 1):
+                text = page_text(result)
+                texts.append(text)
+                yield {"event": "page", "document": index, "filename": filename, "page": page_number, "text": text}
+
+        if ocr_cache is not None:
+            ocr_cache.put(sha256, OCR_ENGINE_TAG, '\n'.join(texts))
+        yield {"event": "document", "document": index, "filename": filename, "pages": len(texts), "cached": False}
+    except Exception as e:
+        yield {"event": "error", "document": index, "filename": filename, "error": str(e)}
+
+
+def report_prompt(extracted_text):
+    """Prompt asking the model for a structured analysis of OCR'd report text"""
+    return f"""You are a doctor analyzing a lab report. Read the extracted text carefully and analyze ONLY the values present in it.
 
 EXTRACTED LAB REPORT TEXT:
 ---
@@ -120,54 +210,12 @@ IMPORTANT:
 - ONLY include tests that are ACTUALLY in the extracted text above
 - Do NOT copy example values - read the ACTUAL report
 - If you cannot find a value in the text, do NOT include it
-- Return ONLY valid JSON""",
-                "stream": False
-            }, timeout=120)
-            
-            ai_response = response.json().get('response', '{}')
-            
-            # Clean and parse JSON
-            try:
-                cleaned = ai_response.strip()
-                if cleaned.startswith('```json'):
-                    cleaned = cleaned[7:]
-                if cleaned.startswith('```'):
-                    cleaned = cleaned[3:]
-                if cleaned.endswith('```'):
-                    cleaned = cleaned[:-3]
-                cleaned = cleaned.strip()
-                
-                parsed = json.loads(cleaned)
-                
-                return jsonify({
-                    "extracted_text": extracted_text,
-                    "analysis": parsed
-                })
-            except json.JSONDecodeError as e:
-                print(f"JSON Parse Error: {e}")
-                print(f"Response: {ai_response}")
-                return jsonify({
-                    "extracted_text": extracted_text,
-                    "analysis": {
-                        "summary": ai_response
-                    }
-                })
-        finally:
-            os.unlink(tmp.name)
+- Return ONLY valid JSON"""
 
 
-@analysis_bp.route('/analyze-text', methods=['POST'])
-def analyze_text():
-    """Analyze manually entered lab values"""
-    data = request.json
-    lab_values = data.get('lab_values', '')
-    
-    if not lab_values:
-        return jsonify({"error": "No values provided"}), 400
-    
-    response = requests.post(OLLAMA_URL, json={
-        "model": "report_analysis_model",
-        "prompt": f"""You are a doctor. Analyze ONLY the lab values provided below.
+def lab_values_prompt(lab_values):
+    """Prompt asking the model to analyse manually entered lab values"""
+    return f"""You are a doctor. Analyze ONLY the lab values provided below.
 
 LAB VALUES:
 ---
@@ -195,28 +243,209 @@ Return JSON:
   "recommendations": "3-5 action items"
 }}
 
-ONLY include values that were actually provided. Return ONLY JSON.""",
-        "stream": False
-    }, timeout=60)
+ONLY include values that were actually provided. Return ONLY JSON."""
+
+
+def wants_stream():
+    """Clients opt into Server-Sent Events with ?stream=true or Accept: text/event-stream"""
+    return (request.args.get('stream', '').lower() == 'true'
+            or 'text/event-stream' in request.headers.get('Accept', ''))
+
+
+def wants_narrative():
+    """
+    Whether the caller needs the diet/lifestyle/doctor advice only the LLM
+    writes; on by default, ?narrative=false lets the rules answer alone
+    """
+    return request.args.get('narrative', '').lower() != 'false'
+
+
+def rules_analysis(text, extra):
+    """
+    Response for the rule-based fast path, or None when the LLM is needed
+    (narrative wanted, or the rules cover too little of the text)
+    """
+    if wants_narrative():
+        return None
+    analysis, coverage = tiered_analyzer.fast_path(text)
+    if analysis is None:
+        return None
+
+    body = dict(extra, engine='rules', coverage=round(coverage, 2))
+    if wants_stream():
+        def generate():
+            if 'extracted_text' in extra:
+                yield sse_event('text', {"extracted_text": extra['extracted_text']})
+            yield from replay_analysis_events(analysis, body)
+        return sse_response(generate())
+    return jsonify(dict(body, analysis=analysis))
+
+
+def fallback_analysis(text, extra, error):
+    """
+    Rule-based response for when Ollama errors or times out, so the caller
+    still gets values and concerns (without the narrative advice)
+    """
+    print(f"Ollama request failed, answering from the rules: {error}")
+    analysis = tiered_analyzer.to_report_analysis(report_analyzer.analyze_from_text(text))
+    return jsonify(dict(extra, analysis=analysis, engine='rules', llm_error=f"Ollama request failed: {error}"))
+
+
+def cached_analysis(prompt_name, text):
+    """(cache key, cached analysis or None) for text sent with the named prompt"""
+    if llm_cache is None:
+        return None, None
+    key = cache_key(text, ANALYSIS_MODEL, f'{prompt_name}:{PROMPT_VERSION}')
+    return key, llm_cache.get(key)
+
+
+def remember_analysis(key, analysis):
+    if key is not None:
+        llm_cache.put(key, analysis)
+
+
+def sse_response(events):
+    return Response(events, mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no',
+    })
+
+
+@analysis_bp.route('/analyze', methods=['POST'])
+def analyze():
+    """
+    OCR + AI Analysis with structured health insights
+    With ?stream=true the answer is streamed as Server-Sent Events: "text"
+    with the extracted text, then "token"/"field" events while the model
+    writes, then "done" with the same body as the JSON response.
+    """
+    if 'file' not in request.files:
+        return jsonify({"error": "No file uploaded"}), 400
+    
+    file = request.files['file']
+    
+    # The extension tells DocTR whether to decode a PDF or an image
+    file_ext = upload_extension(file.filename or 'document')
+    
+    # Step 1: OCR
+    extracted_text = extract_text(file.read(), file_ext)
     
-    ai_response = response.json().get('response', '{}')
+    # Step 2: Reference-range rules, if they cover the report
+    fast = rules_analysis(extracted_text, {"extracted_text": extracted_text})
+    if fast is not None:
+        return fast
+    
+    # Step 3: Send to Ollama, unless this text was analysed recently
+    key, cached = cached_analysis('report', extracted_text)
+    if wants_stream():
+        def generate():
+            yield sse_event('text', {"extracted_text": extracted_text})
+            if cached is not None:
+                yield from replay_analysis_events(cached, {"extracted_text": extracted_text, "engine": "llm", "cached": True})
+                return
+            yield from stream_analysis_events(ollama, ANALYSIS_MODEL, report_prompt(extracted_text), timeout=120,
+                                              done_extra={"extracted_text": extracted_text, "engine": "llm", "cached": False},
+                                              on_complete=lambda analysis: remember_analysis(key, analysis))
+        return sse_response(generate())
+    
+    if cached is not None:
+        return jsonify({"extracted_text": extracted_text, "analysis": cached, "engine": "llm", "cached": True})
     
     try:
-        cleaned = ai_response.strip()
-        if cleaned.startswith('```json'):
-            cleaned = cleaned[7:]
-        if cleaned.startswith('```'):
-            cleaned = cleaned[3:]
-        if cleaned.endswith('```'):
-            cleaned = cleaned[:-3]
-        cleaned = cleaned.strip()
-        
-        parsed = json.loads(cleaned)
-        return jsonify({"analysis": parsed})
-    except json.JSONDecodeError:
-        return jsonify({
-            "analysis": {
-                "summary": ai_response
-            }
-        })
+        ai_response = ollama.generate(ANALYSIS_MODEL, report_prompt(extracted_text), timeout=120)
+    except requests.exceptions.RequestException as e:
+        return fallback_analysis(extracted_text, {"extracted_text": extracted_text}, e)
+    
+    parsed = parse_analysis(ai_response)
+    if parsed is None:
+        print(f"JSON Parse Error, response: {ai_response}")
+        parsed = {"summary": ai_response}
+    else:
+        remember_analysis(key, parsed)
+    
+    return jsonify({
+        "extracted_text": extracted_text,
+        "analysis": parsed,
+        "engine": "llm",
+        "cached": False
+    })
+
+
+@analysis_bp.route('/analyze-text', methods=['POST'])
+def analyze_text():
+    """Analyze manually entered lab values (?stream=true for Server-Sent Events)"""
+    data = request.json
+    lab_values = data.get('lab_values', '')
+    
+    if not lab_values:
+        return jsonify({"error": "No values provided"}), 400
+    
+    fast = rules_analysis(lab_values, {})
+    if fast is not None:
+        return fast
+    
+    key, cached = cached_analysis('lab_values', lab_values)
+    if wants_stream():
+        if cached is not None:
+            return sse_response(replay_analysis_events(cached, {"engine": "llm", "cached": True}))
+        return sse_response(stream_analysis_events(
+            ollama, ANALYSIS_MODEL, lab_values_prompt(lab_values), timeout=60,
+            done_extra={"engine": "llm", "cached": False}, on_complete=lambda analysis: remember_analysis(key, analysis),
+        ))
+    
+    if cached is not None:
+        return jsonify({"analysis": cached, "engine": "llm", "cached": True})
+    
+    try:
+        ai_response = ollama.generate(ANALYSIS_MODEL, lab_values_prompt(lab_values), timeout=60)
+    except requests.exceptions.RequestException as e:
+        return fallback_analysis(lab_values, {}, e)
+    
+    parsed = parse_analysis(ai_response)
+    if parsed is None:
+        return jsonify({"analysis": {"summary": ai_response}, "engine": "llm", "cached": False})
+    remember_analysis(key, parsed)
+    return jsonify({"analysis": parsed, "engine": "llm", "cached": False})
+
 
+@analysis_bp.route('/analyze-batch', methods=['POST'])
+def analyze_batch():
+    """
+    Score many patients against the reference ranges in one call
+    Body is columnar: {"metrics": {"hemoglobin": [13.1, 11.2, null], ...},
+    "sex": ["female", "male", null], "age": [34, 61, null]}; null means not
+    measured (or unknown). Returns per-patient risk and, per metric, flags of
+    -1 (low), 0 (normal) or 1 (high), or null where it was not measured.
+    """
+    data = request.get_json(silent=True) or {}
+    columns = data.get('metrics')
+    
+    if not isinstance(columns, dict) or not columns:
+        return jsonify({"error": "No metrics provided"}), 400
+    
+    lengths = {len(values) for values in columns.values() if isinstance(values, list)}
+    if len(lengths) != 1 or len(columns) != sum(isinstance(values, list) for values in columns.values()):
+        return jsonify({"error": "Metric columns must be lists of the same length"}), 400
+    patients = lengths.pop()
+    
+    sex, age = data.get('sex'), data.get('age')
+    for name, column in (('sex', sex), ('age', age)):
+        if isinstance(column, list) and len(column) != patients:
+            return jsonify({"error": f"'{name}' must have one value per patient"}), 400
+    
+    try:
+        result = report_analyzer.analyze_batch(columns, sex=sex, age=age)
+    except (TypeError, ValueError) as e:
+        return jsonify({"error": f"Invalid metric values: {e}"}), 400
+    
+    # A flag of 0 on an unmeasured value would read as "normal"
+    flags = np.where(result['measured'], result['flags'], None)
+    return jsonify({
+        "patients": patients,
+        "metrics": result['metrics'],
+        "ignored": [name for name in columns if report_analyzer.catalogue.lookup(name) is None],
+        "risk": result['risk'].tolist(),
+        "abnormal_count": result['abnormal_count'].tolist(),
+        "measured_count": result['measured_count'].tolist(),
+        "flags": {key: flags[:, i].tolist() for i, key in enumerate(result['metrics'])}
+    })
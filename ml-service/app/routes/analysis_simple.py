@@ -2,14 +2,18 @@
 Simplified Analysis Routes - Direct proxy to Ollama OCR API
 No local OCR processing needed
 """
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, request, jsonify
 import requests
 import os
 
+from app.config import Config
+from app.utils.ollama_client import OllamaClient, parse_analysis, stream_analysis_events
+
 analysis_bp = Blueprint('analysis', __name__)
 
 # External Ollama API with OCR (your teammate's ngrok URL)
 OLLAMA_URL = os.getenv('OLLAMA_URL', 'https://dizzied-unpropitiating-ute.ngrok-free.dev/api/generate')
+ollama = OllamaClient(OLLAMA_URL, pool_size=Config.OLLAMA_POOL_SIZE)
 
 
 @analysis_bp.route('/health', methods=['GET'])
@@ -34,7 +38,7 @@ def analyze():
         # Note: Update this if your Ollama API expects multipart/form-data
         files = {'file': (file.filename, file.stream, file.content_type)}
         
-        response = requests.post(
+        response = ollama.session.post(
             OLLAMA_URL.replace('/api/generate', '/api/ocr-analyze'),  # Adjust endpoint as needed
             files=files,
             timeout=120
@@ -62,10 +66,7 @@ def analyze_text():
     if not lab_values:
         return jsonify({"error": "No values provided"}), 400
     
-    try:
-        response = requests.post(OLLAMA_URL, json={
-            "model": "report_analysis_model",
-            "prompt": f"""Analyze these lab results and return a JSON response:
+    prompt = f"""Analyze these lab results and return a JSON response:
 
 {lab_values}
 
@@ -79,21 +80,20 @@ Return ONLY valid JSON in this exact format:
 }}
 
 Set "risk": true for any value that is LOW or HIGH. Set "risk": false for NORMAL values.
-Return ONLY the JSON, no other text.""",
-            "stream": False
-        }, timeout=60)
+Return ONLY the JSON, no other text."""
+    
+    # ?stream=true forwards the answer as Server-Sent Events while it is generated
+    if request.args.get('stream', '').lower() == 'true':
+        return Response(stream_analysis_events(ollama, "report_analysis_model", prompt, timeout=60),
+                        mimetype='text/event-stream', headers={'Cache-Control': 'no-cache'})
+    
+    try:
+        ai_response = ollama.generate("report_analysis_model", prompt, timeout=60)
         
-        if response.status_code == 200:
-            ai_response = response.json().get('response', '{}')
-            
-            try:
-                import json
-                parsed = json.loads(ai_response)
-                return jsonify({"analysis": parsed})
-            except:
-                return jsonify({"analysis": ai_response})
-        else:
-            return jsonify({"error": "Ollama API error"}), response.status_code
+        parsed = parse_analysis(ai_response)
+        return jsonify({"analysis": parsed if parsed is not None else ai_response})
             
+    except requests.exceptions.HTTPError as e:
+        return jsonify({"error": "Ollama API error"}), e.response.status_code
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -0,0 +1,167 @@
+"""
+OCR Micro-Batcher
+Collects pages from concurrent requests and runs them through the model together
+
+Request threads call recognize() with their pages and block (or iterate
+iter_recognize() to get each page as it is done); a single
+server thread takes the first waiting page, keeps collecting for up to
+max_wait_ms (or until max_batch_size pages), runs one model call over the
+whole batch and hands each page's result back to the thread that sent it.
+If the model call fails in any way, even with an exception that stops the
+server thread, every page still waiting gets that error instead of
+blocking its caller forever.
+"""
+
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional, Sequence
+from collections import deque
+from concurrent.futures import Future
+import os
+import queue
+import threading
+import time
+
+
+class OCRBatcher:
+    """Dynamic batching front-end for a DocTR-style predictor"""
+
+    def __init__(self, model: Callable[[List[Any]], Any], max_batch_size: int = 8, max_wait_ms: float = 10):
+        self.model = model
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000
+        self._queue: "queue.Queue" = queue.Queue()
+        self._thread = None
+        self._pid = None
+        self._start_lock = threading.Lock()
+        self._batches = 0
+        self._pages = 0
+
+    def _ensure_started(self) -> None:
+        """
+        Start the server thread on first use in this process; threads do not
+        survive fork, so a pre-forked worker starts its own
+        """
+        if self._pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._pid != os.getpid() or not self._thread.is_alive():
+                if self._pid != os.getpid():
+                    # Pages queued in the parent belong to its threads
+                    self._queue = queue.Queue()
+                self._thread = threading.Thread(target=self._serve, name="ocr-batcher", daemon=True)
+                self._thread.start()
+                self._pid = os.getpid()
+
+    def recognize(self, pages: Sequence[Any], timeout: Optional[float] = None) -> List[Any]:
+        """
+        Model output page for each input page, in order
+        Raises concurrent.futures.TimeoutError if the pages are not all
+        recognised within timeout seconds; pages not yet taken into a batch
+        are then withdrawn.
+        """
+        return list(self.iter_recognize(pages, timeout=timeout, window=len(pages)))
+
+    def iter_recognize(
+        self, pages: Sequence[Any], timeout: Optional[float] = None, window: Optional[int] = None
+    ) -> Iterator[Any]:
+        """
+        Model output page for each input page, in order, each as soon as it
+        is ready
+
+        Up to window pages (max_batch_size by default) are queued at once,
+        so one document's pages share batches without a long document
+        holding up every other request behind it. The timeout covers all
+        pages; pages still queued when it expires, or when the caller stops
+        iterating, are withdrawn.
+        """
+        if not pages:
+            return
+        self._ensure_started()
+        window = self.max_batch_size if window is None else max(1, window)
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        pending: Deque[Future] = deque()
+        submitted = 0
+        try:
+            while pending or submitted < len(pages):
+                while submitted < len(pages) and len(pending) < window:
+                    future = Future()
+                    self._queue.put((pages[submitted], future))
+                    pending.append(future)
+                    submitted += 1
+                result = pending[0].result(None if deadline is None else max(0.0, deadline - time.monotonic()))
+                pending.popleft()
+                yield result
+        finally:
+            for future in pending:
+                future.cancel()
+
+    def _collect(self, batch: List[Any]) -> None:
+        """
+        Block for one page, then gather more into batch until it is full or
+        the wait is over; pages whose caller gave up are dropped
+        """
+        deadline = None
+        while len(batch) < self.max_batch_size:
+            try:
+                if deadline is None:
+                    item = self._queue.get()
+                    deadline = time.monotonic() + self.max_wait
+                else:
+                    remaining = deadline - time.monotonic()
+                    item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item[1].set_running_or_notify_cancel():
+                batch.append(item)
+
+    def _serve(self) -> None:
+        batch: List[Any] = []
+        try:
+            while True:
+                batch = []
+                self._collect(batch)
+                if not batch:
+                    continue
+                pages = [page for page, _ in batch]
+                try:
+                    results = list(self.model(pages).pages)
+                    if len(results) != len(batch):
+                        raise RuntimeError(f"OCR model returned {len(results)} pages for {len(batch)}")
+                except Exception as e:
+                    for _, future in batch:
+                        future.set_exception(e)
+                    continue
+
+                self._batches += 1
+                self._pages += len(batch)
+                for (_, future), result in zip(batch, results):
+                    future.set_result(result)
+        except BaseException as e:
+            # The thread is going down (KeyboardInterrupt, SystemExit, ...):
+            # fail this batch and everything queued behind it; the next
+            # recognize() starts a new thread
+            error = RuntimeError(f"OCR batcher stopped: {e!r}")
+            error.__cause__ = e
+            self._fail_pending(batch, error)
+            raise
+
+    def _fail_pending(self, batch: List[Any], error: BaseException) -> None:
+        for _, future in batch:
+            if not future.done():
+                future.set_exception(error)
+        while True:
+            try:
+                _, future = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            if future.set_running_or_notify_cancel():
+                future.set_exception(error)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000,
+            "batches": self._batches,
+            "pages": self._pages,
+            "mean_batch_size": round(self._pages / self._batches, 2) if self._batches else 0,
+        }
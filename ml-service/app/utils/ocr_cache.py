@@ -0,0 +1,22 @@
+"""
+OCR Result Cache
+The store lives in shared/python/medibytes_shared/ocr_cache.py and is the
+same one the backend uses, so with both OCR_CACHE_PATH settings on one file
+a document is OCR'd once whichever service sees it first.
+
+Keys are upload hashes and OCR_ENGINE_TAG; request threads call it directly
+and wrap get -> OCR -> put in single_flight.
+"""
+
+import os
+import sys
+
+_SHARED_PYTHON = os.path.normpath(
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', '..', 'shared', 'python')
+)
+if _SHARED_PYTHON not in sys.path:
+    sys.path.append(_SHARED_PYTHON)
+
+from medibytes_shared.ocr_cache import OCRCache, document_hash, engine_name
+
+__all__ = ['OCRCache', 'document_hash', 'engine_name']
@@ -1,99 +1,242 @@
-import easyocr
+"""
+EasyOCR Engine
+One lazily loaded easyocr.Reader per process and language set, with a
+single recognition pass per image serving plain text, structured output
+and language detection, and a batched API over many images
+"""
+
+from collections import Counter, OrderedDict
+import hashlib
+import os
+import threading
+import unicodedata
+
 import numpy as np
 from PIL import Image
 
+from app.config import Config
+
+# Unicode script (first word of a character's name) -> EasyOCR language codes
+SCRIPT_LANGUAGES = {
+    'LATIN': ['en', 'fr', 'de', 'es', 'it', 'pt', 'nl', 'id', 'ms', 'tr', 'vi'],
+    'DEVANAGARI': ['hi', 'mr', 'ne'],
+    'BENGALI': ['bn', 'as'],
+    'TAMIL': ['ta'],
+    'TELUGU': ['te'],
+    'KANNADA': ['kn'],
+    'ARABIC': ['ar', 'fa', 'ur'],
+    'CYRILLIC': ['ru', 'uk', 'bg'],
+    'THAI': ['th'],
+    'HANGUL': ['ko'],
+    'HIRAGANA': ['ja'],
+    'KATAKANA': ['ja'],
+    'CJK': ['ch_sim', 'ch_tra', 'ja'],
+}
+
+_engines = {}
+_engines_pid = None
+_engines_lock = threading.Lock()
+
+
+def get_engine(languages=None, gpu=None):
+    """
+    The process-wide engine for a language set (Config.OCR_LANGUAGES and
+    Config.OCR_GPU by default); its model loads on first use
+    """
+    global _engines_pid
+    languages = tuple(languages or Config.OCR_LANGUAGES)
+    gpu = Config.OCR_GPU if gpu is None else gpu
+    with _engines_lock:
+        # Readers must not be shared across fork
+        if _engines_pid != os.getpid():
+            _engines.clear()
+            _engines_pid = os.getpid()
+        engine = _engines.get((languages, gpu))
+        if engine is None:
+            engine = _engines[(languages, gpu)] = OCREngine(list(languages), gpu=gpu)
+    return engine
+
+
+def _as_input(image):
+    """PIL images become arrays; paths, bytes and arrays go to EasyOCR as they are"""
+    if isinstance(image, Image.Image):
+        return np.array(image)
+    return image
+
+
+def _image_key(image):
+    """Content key for an image, so a repeated image is not recognised twice"""
+    digest = hashlib.blake2b(digest_size=16)
+    if isinstance(image, np.ndarray):
+        digest.update(str((image.shape, image.dtype.str)).encode())
+        digest.update(np.ascontiguousarray(image).data)
+    elif isinstance(image, str):
+        digest.update(image.encode())
+        if os.path.exists(image):
+            stat = os.stat(image)
+            digest.update(f'{stat.st_size}:{stat.st_mtime_ns}'.encode())
+    else:
+        digest.update(bytes(image))
+    return digest.hexdigest()
+
+
 class OCREngine:
-    def __init__(self, languages=['en'], gpu=False):
+    def __init__(self, languages=['en'], gpu=False, result_cache_size=8):
         """
-        Initialize EasyOCR reader
+        Configure the EasyOCR reader; the model is only loaded on first use
+        (see get_engine for the shared per-process instance)
+        """
+        self.languages = list(languages)
+        self.gpu = gpu
+        self._reader = None
+        self._lock = threading.Lock()
+        # Most recent results by image content, so extract_text,
+        # extract_structured and detect_language share one pass
+        self.result_cache_size = result_cache_size
+        self._results = OrderedDict()
+        self._results_lock = threading.Lock()
+
+    @property
+    def reader(self):
+        if self._reader is None:
+            with self._lock:
+                if self._reader is None:
+                    import easyocr
+                    try:
+                        self._reader = easyocr.Reader(self.languages, gpu=self.gpu)
+                    except Exception as e:
+                        print(f"Warning: Could not initialize EasyOCR with GPU. Falling back to CPU. Error: {e}")
+                        self._reader = easyocr.Reader(self.languages, gpu=False)
+                        self.gpu = False
+        return self._reader
+
+    def read(self, image, batch_size=8):
+        """
+        Recognise an image once and return everything derived from it
+
+        Args:
+            image: PIL Image, numpy array, path or encoded bytes
+            batch_size: text boxes recognised per model call
+
+        Returns:
+            dict: text, confidence, structured (text/bbox/confidence per
+            box) and language
+        """
+        return self.read_batch([image], batch_size=batch_size)[0]
+
+    def read_batch(self, images, batch_size=8):
+        """
+        Recognise many images; images of the same size go through text
+        detection together, and results for images seen recently are reused
+
+        Returns:
+            list: one read() result per image, in order
         """
+        images = [_as_input(image) for image in images]
+        keys = [_image_key(image) for image in images]
+        results = [self._cached(key) for key in keys]
+
+        # Group the remaining images by size, once per distinct image
+        groups = {}
+        for i, (image, key) in enumerate(zip(images, keys)):
+            if results[i] is None:
+                shape = image.shape if isinstance(image, np.ndarray) else None
+                groups.setdefault(shape, {}).setdefault(key, []).append(i)
+
         try:
-            self.reader = easyocr.Reader(languages, gpu=gpu)
-            self.gpu = gpu
+            for shape, pending in groups.items():
+                firsts = [positions[0] for positions in pending.values()]
+                if shape is not None and len(firsts) > 1:
+                    raw = self.reader.readtext_batched([images[i] for i in firsts], batch_size=batch_size)
+                else:
+                    raw = [self.reader.readtext(images[i], batch_size=batch_size) for i in firsts]
+
+                for (key, positions), boxes in zip(pending.items(), raw):
+                    result = self._to_result(boxes)
+                    self._remember(key, result)
+                    for i in positions:
+                        results[i] = result
         except Exception as e:
-            print(f"Warning: Could not initialize EasyOCR with GPU. Falling back to CPU. Error: {e}")
-            self.reader = easyocr.Reader(languages, gpu=False)
-            self.gpu = False
-    
+            raise Exception(f"OCR extraction failed: {str(e)}")
+
+        return results
+
     def extract_text(self, image):
         """
         Extract text from image using EasyOCR
-        
+
         Args:
             image: PIL Image or path to image file
-            
+
         Returns:
             tuple: (extracted_text, confidence)
         """
-        try:
-            # Convert PIL Image to numpy array if needed
-            if isinstance(image, Image.Image):
-                image = np.array(image)
-            
-            # Perform OCR
-            results = self.reader.readtext(image)
-            
-            # Extract text and calculate average confidence
-            extracted_texts = []
-            confidences = []
-            
-            for (bbox, text, confidence) in results:
-                extracted_texts.append(text)
-                confidences.append(confidence)
-            
-            # Combine texts
-            full_text = ' '.join(extracted_texts)
-            
-            # Calculate average confidence
-            avg_confidence = np.mean(confidences) if confidences else 0.0
-            
-            return full_text, float(avg_confidence)
-            
-        except Exception as e:
-            raise Exception(f"OCR extraction failed: {str(e)}")
-    
+        result = self.read(image)
+        return result['text'], result['confidence']
+
     def extract_structured(self, image):
         """
         Extract text with bounding box information
-        
+
         Args:
             image: PIL Image or path to image file
-            
+
         Returns:
             list: List of dictionaries with text, bbox, and confidence
         """
-        try:
-            if isinstance(image, Image.Image):
-                image = np.array(image)
-            
-            results = self.reader.readtext(image)
-            
-            structured_results = []
-            for (bbox, text, confidence) in results:
-                structured_results.append({
-                    'text': text,
-                    'bbox': bbox,
-                    'confidence': float(confidence)
-                })
-            
-            return structured_results
-            
-        except Exception as e:
-            raise Exception(f"Structured OCR extraction failed: {str(e)}")
-    
-    def detect_language(self, image):
+        return self.read(image)['structured']
+
+    def detect_language(self, image=None, text=None):
         """
         Detect primary language in image
+        Picked among the reader's languages from the scripts in the text the
+        image was recognised as; with a single language nothing is recognised
         """
-        try:
-            if isinstance(image, Image.Image):
-                image = np.array(image)
-            
-            results = self.reader.readtext(image, detail=1)
-            
-            # For now, return 'en' as default
-            # In production, you might want to use language detection
-            return 'en'
-            
-        except Exception as e:
-            return 'en'
+        if len(self.languages) == 1:
+            return self.languages[0]
+        if text is None:
+            if image is None:
+                return self.languages[0]
+            return self.read(image)['language']
+        return self._language_of(text)
+
+    def _language_of(self, text):
+        scripts = Counter(
+            unicodedata.name(char, 'UNKNOWN').split(' ')[0]
+            for char in text if char.isalpha()
+        )
+        for script, _ in scripts.most_common():
+            for language in SCRIPT_LANGUAGES.get(script, []):
+                if language in self.languages:
+                    return language
+        return self.languages[0]
+
+    def _to_result(self, boxes):
+        structured = [{
+            'text': text,
+            'bbox': np.asarray(bbox).tolist(),
+            'confidence': float(confidence)
+        } for bbox, text, confidence in boxes]
+        full_text = ' '.join(item['text'] for item in structured)
+        confidences = [item['confidence'] for item in structured]
+        return {
+            'text': full_text,
+            'confidence': float(np.mean(confidences)) if confidences else 0.0,
+            'structured': structured,
+            'language': self.detect_language(text=full_text),
+        }
+
+    def _cached(self, key):
+        with self._results_lock:
+            result = self._results.get(key)
+            if result is not None:
+                self._results.move_to_end(key)
+            return result
+
+    def _remember(self, key, result):
+        if self.result_cache_size <= 0:
+            return
+        with self._results_lock:
+            self._results[key] = result
+            while len(self._results) > self.result_cache_size:
+                self._results.popitem(last=False)
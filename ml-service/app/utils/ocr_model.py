@@ -0,0 +1,80 @@
+"""
+DocTR Model Holder
+Loads the OCR predictor once per process, on first use or via warm-up
+
+Nothing is loaded at import, so a pre-forking server (gunicorn.conf.py)
+can fork workers from a light parent and each worker loads its own copy
+after fork, with its own torch thread count.
+"""
+
+import os
+import threading
+import time
+
+import numpy as np
+
+from app.config import Config
+
+_lock = threading.Lock()
+_model = None
+_warm_up_started = False
+_warm_up_lock = threading.Lock()
+_state = {"status": "cold", "error": None, "load_seconds": None, "warmup_seconds": None}
+
+
+def get_model():
+    """The process-wide DocTR predictor, loading it on first call"""
+    global _model
+    if _model is not None:
+        return _model
+    with _lock:
+        if _model is None:
+            import torch
+            from doctr.models import ocr_predictor
+
+            if Config.TORCH_THREADS > 0:
+                torch.set_num_threads(Config.TORCH_THREADS)
+
+            if _state["status"] == "cold":
+                _state["status"] = "loading"
+            print(f"Loading DocTR model (pid {os.getpid()}, {torch.get_num_threads()} threads)...")
+            start = time.perf_counter()
+            _model = ocr_predictor(det_arch='db_resnet50', reco_arch='crnn_vgg16_bn',
+                                   pretrained=True, assume_straight_pages=True)
+            _state["load_seconds"] = round(time.perf_counter() - start, 2)
+            print("DocTR ready!")
+    return _model
+
+
+def predict(pages):
+    """Run the predictor over a list of page arrays"""
+    return get_model()(pages)
+
+
+def warm_up():
+    """Load the model and run one blank page so the first request is not slow"""
+    try:
+        model = get_model()
+        _state["status"] = "warming"
+        start = time.perf_counter()
+        model([np.full((1024, 768, 3), 255, dtype=np.uint8)])
+        _state["warmup_seconds"] = round(time.perf_counter() - start, 2)
+        _state["status"] = "ready"
+    except Exception as e:
+        _state["status"] = "error"
+        _state["error"] = str(e)
+        print(f"DocTR warm-up failed: {e}")
+
+
+def start_warm_up():
+    """Warm up in the background so the server can answer /health meanwhile"""
+    global _warm_up_started
+    with _warm_up_lock:
+        if _warm_up_started:
+            return
+        _warm_up_started = True
+    threading.Thread(target=warm_up, name="ocr-warmup", daemon=True).start()
+
+
+def model_status():
+    return dict(_state, ready=_state["status"] == "ready", pid=os.getpid())
@@ -0,0 +1,195 @@
+"""
+Ollama Client
+Pooled HTTP session for /api/generate, with token streaming and an
+incremental parser that picks complete top-level fields out of a JSON
+answer while it is still being generated
+"""
+
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+import json
+import os
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+def parse_analysis(text):
+    """Parse a model answer as JSON, tolerating ```json fences; None if it is not JSON"""
+    cleaned = text.strip()
+    if cleaned.startswith('```json'):
+        cleaned = cleaned[7:]
+    if cleaned.startswith('```'):
+        cleaned = cleaned[3:]
+    if cleaned.endswith('```'):
+        cleaned = cleaned[:-3]
+    try:
+        return json.loads(cleaned.strip())
+    except json.JSONDecodeError:
+        return None
+
+
+class JSONFieldStream:
+    """
+    Feed text chunks of a JSON object; get (key, value) pairs for each
+    top-level field as soon as its value is complete
+
+    A value is only taken once the comma or closing brace after it has
+    arrived, so a number or literal cut off mid-chunk (e.g. '145.' of
+    '145.2') is never reported early. Anything before the opening brace
+    (e.g. a ```json fence) is skipped.
+    """
+
+    def __init__(self):
+        self._buffer = ''
+        self._pos = None
+        self._decoder = json.JSONDecoder()
+        self.fields: Dict[str, Any] = {}
+        self.closed = False
+
+    def _skip(self, chars):
+        while self._pos < len(self._buffer) and self._buffer[self._pos] in chars:
+            self._pos += 1
+
+    def feed(self, chunk: str) -> Iterator[Tuple[str, Any]]:
+        self._buffer += chunk
+        if self._pos is None:
+            start = self._buffer.find('{')
+            if start < 0:
+                return
+            self._pos = start + 1
+
+        while not self.closed:
+            self._skip(' \t\r\n,')
+            if self._pos >= len(self._buffer):
+                return
+            if self._buffer[self._pos] == '}':
+                self.closed = True
+                return
+            try:
+                key, end = self._decoder.raw_decode(self._buffer, self._pos)
+                colon = self._buffer.index(':', end)
+                start = colon + 1
+                while start < len(self._buffer) and self._buffer[start] in ' \t\r\n':
+                    start += 1
+                value, end = self._decoder.raw_decode(self._buffer, start)
+            except (json.JSONDecodeError, ValueError):
+                # Incomplete so far; wait for more text
+                return
+            # A scalar is only complete once the separator after it is in:
+            # '145.' decodes as 145 but may still become 145.2
+            after = end
+            while after < len(self._buffer) and self._buffer[after] in ' \t\r\n':
+                after += 1
+            if after >= len(self._buffer) or self._buffer[after] not in ',}':
+                return
+
+            self._pos = end
+            self.fields[key] = value
+            yield key, value
+
+
+class OllamaClient:
+    """
+    Keep-alive connection pool to Ollama, one per process (sessions must not
+    be shared across fork)
+    """
+
+    def __init__(self, url: str, pool_size: int = 10, connect_timeout: float = 10):
+        self.url = url
+        self.pool_size = pool_size
+        self.connect_timeout = connect_timeout
+        self._session: Optional[requests.Session] = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    @property
+    def session(self) -> requests.Session:
+        if self._session is None or self._pid != os.getpid():
+            with self._lock:
+                if self._session is None or self._pid != os.getpid():
+                    session = requests.Session()
+                    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+                    session.mount('http://', adapter)
+                    session.mount('https://', adapter)
+                    session.headers['ngrok-skip-browser-warning'] = 'true'
+                    self._session = session
+                    self._pid = os.getpid()
+        return self._session
+
+    def generate(self, model: str, prompt: str, timeout: float = 120) -> str:
+        """Full (non-streamed) generation; returns the model's answer text"""
+        response = self.session.post(self.url, json={
+            "model": model,
+            "prompt": prompt,
+            "stream": False
+        }, timeout=(self.connect_timeout, timeout))
+        response.raise_for_status()
+        return response.json().get('response', '{}')
+
+    def stream(self, model: str, prompt: str, timeout: float = 120) -> Iterator[str]:
+        """
+        Yield answer text as Ollama generates it; timeout is the longest
+        wait between two chunks, not for the whole answer
+        """
+        with self.session.post(self.url, json={
+            "model": model,
+            "prompt": prompt,
+            "stream": True
+        }, stream=True, timeout=(self.connect_timeout, timeout)) as response:
+            response.raise_for_status()
+            for line in response.iter_lines():
+                if not line:
+                    continue
+                message = json.loads(line)
+                if message.get('error'):
+                    raise RuntimeError(message['error'])
+                if message.get('response'):
+                    yield message['response']
+                if message.get('done'):
+                    return
+
+
+def sse_event(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def stream_analysis_events(client: OllamaClient, model: str, prompt: str, timeout: float = 120,
+                           done_extra: Optional[Dict[str, Any]] = None,
+                           on_complete: Optional[Callable[[Any], None]] = None) -> Iterator[str]:
+    """
+    Server-Sent Events for a streamed JSON analysis:
+        token  {"text"}            every chunk of generated text
+        field  {"name", "value"}   each top-level field once complete
+        done   {"analysis", ...}   the whole answer (plus done_extra)
+        error  {"error"}           if generation fails
+    on_complete receives the parsed answer, if it was valid JSON.
+    """
+    fields = JSONFieldStream()
+    answer = []
+    try:
+        for chunk in client.stream(model, prompt, timeout):
+            answer.append(chunk)
+            yield sse_event('token', {"text": chunk})
+            for name, value in fields.feed(chunk):
+                yield sse_event('field', {"name": name, "value": value})
+    except requests.exceptions.RequestException as e:
+        yield sse_event('error', {"error": f"Ollama request failed: {e}"})
+        return
+    except Exception as e:
+        yield sse_event('error', {"error": str(e)})
+        return
+
+    text = ''.join(answer)
+    parsed = parse_analysis(text)
+    if parsed is not None and on_complete is not None:
+        on_complete(parsed)
+    yield sse_event('done', dict(done_extra or {}, analysis=parsed if parsed is not None else {"summary": text}))
+
+
+def replay_analysis_events(analysis: Any, done_extra: Optional[Dict[str, Any]] = None) -> Iterator[str]:
+    """The field/done events of a stream, for an analysis that is already known"""
+    if isinstance(analysis, dict):
+        for name, value in analysis.items():
+            yield sse_event('field', {"name": name, "value": value})
+    yield sse_event('done', dict(done_extra or {}, analysis=analysis))
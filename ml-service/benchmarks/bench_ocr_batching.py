@@ -0,0 +1,107 @@
+"""
+Benchmark DocTR throughput with and without dynamic micro-batching
+
+Simulates --clients concurrent request threads, each recognising
+--requests single-page documents. "direct" calls the predictor per request
+(what the routes used to do); "batched" sends pages through OCRBatcher.
+Pages are synthetic lab-report-like images so no sample files are needed.
+
+Requires python-doctr[torch]; the pretrained weights are downloaded on
+first run.
+
+Usage (from ml-service/):
+    python benchmarks/bench_ocr_batching.py [--clients 8] [--requests 4] [--batch-size 8] [--wait-ms 10]
+"""
+import argparse
+import sys
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from doctr.models import ocr_predictor
+from app.utils.ocr_batcher import OCRBatcher
+
+REPORT_LINES = [
+    "Hemoglobin 13.5 g/dL 13.0-17.0",
+    "Total WBC Count 7200 /uL 4000-11000",
+    "Fasting Glucose 96 mg/dL 70-100",
+    "Serum Creatinine 0.9 mg/dL 0.7-1.3",
+    "Total Cholesterol 182 mg/dL <200",
+]
+
+
+def synthetic_page() -> np.ndarray:
+    try:
+        font = ImageFont.truetype("DejaVuSans.ttf", 28)
+    except OSError:
+        font = ImageFont.load_default()
+    image = Image.new("RGB", (1240, 1754), "white")
+    draw = ImageDraw.Draw(image)
+    for row, line in enumerate(REPORT_LINES * 4):
+        draw.text((120, 150 + row * 60), line, fill="black", font=font)
+    return np.asarray(image)
+
+
+def run_clients(recognize, page, clients: int, requests: int) -> float:
+    latencies = []
+    lock = threading.Lock()
+
+    def client():
+        for _ in range(requests):
+            start = time.perf_counter()
+            recognize([page])
+            with lock:
+                latencies.append(time.perf_counter() - start)
+
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    total = clients * requests
+    print(f"   {total / elapsed:6.2f} pages/s   "
+          f"p50 {latencies[total // 2] * 1000:7.0f} ms   "
+          f"p95 {latencies[min(total - 1, int(total * 0.95))] * 1000:7.0f} ms")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=4, help="Pages per client")
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--wait-ms", type=float, default=10)
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print(f"📦 DocTR Micro-batching Benchmark ({args.clients} clients x {args.requests} pages)")
+    print("=" * 60)
+
+    model = ocr_predictor(det_arch='db_resnet50', reco_arch='crnn_vgg16_bn',
+                          pretrained=True, assume_straight_pages=True)
+    page = synthetic_page()
+    model([page])  # warm-up
+
+    print("\n🐢 direct (one model call per request)")
+    direct = run_clients(lambda pages: model(pages).pages, page, args.clients, args.requests)
+
+    batcher = OCRBatcher(model, args.batch_size, args.wait_ms)
+    print(f"\n🚀 batched (up to {args.batch_size} pages, {args.wait_ms:g} ms wait)")
+    batched = run_clients(batcher.recognize, page, args.clients, args.requests)
+    print(f"   mean batch size {batcher.stats()['mean_batch_size']}")
+
+    print(f"\n📊 Speed-up: {direct / batched:.2f}x")
+    print("\n" + "=" * 60)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Benchmark OCR image preprocessing, old full-resolution pipeline vs new
+
+"legacy" is the previous preprocess_image: Otsu threshold, full-resolution
+fastNlMeansDenoising, then minAreaRect over every foreground pixel.
+"pipeline" is app.utils.preprocessing.preprocess, which measures threshold
+and skew on a downsampled copy and picks the denoiser from the estimated
+noise level. Pages are synthetic lab-report-like scans, rotated by
+--angle degrees, at several noise levels; per-stage timings are printed
+for the pipeline.
+
+Usage (from ml-service/):
+    python benchmarks/bench_preprocessing.py [--angle 3] [--repeat 3]
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.utils.preprocessing import preprocess
+
+REPORT_LINES = [
+    "Hemoglobin 13.5 g/dL 13.0-17.0",
+    "Total WBC Count 7200 /uL 4000-11000",
+    "Fasting Glucose 96 mg/dL 70-100",
+    "Serum Creatinine 0.9 mg/dL 0.7-1.3",
+    "Total Cholesterol 182 mg/dL <200",
+]
+
+
+def synthetic_scan(angle: float, noise: float, seed: int = 0) -> np.ndarray:
+    try:
+        font = ImageFont.truetype("DejaVuSans.ttf", 40)
+    except OSError:
+        font = ImageFont.load_default()
+    image = Image.new("L", (2480, 3508), 255)  # A4 at 300 dpi
+    draw = ImageDraw.Draw(image)
+    for row, line in enumerate(REPORT_LINES * 8):
+        draw.text((200, 250 + row * 75), line, fill=0, font=font)
+    image = image.rotate(angle, resample=Image.BILINEAR, fillcolor=255)
+    page = np.asarray(image, dtype=np.float32)
+    page += np.random.default_rng(seed).normal(0, noise, page.shape)
+    return np.clip(page, 0, 255).astype(np.uint8)
+
+
+def legacy(gray: np.ndarray) -> np.ndarray:
+    _, thresh = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    denoised = cv2.fastNlMeansDenoising(thresh, h=10)
+    coords = np.column_stack(np.where(denoised > 0))
+    if len(coords) > 0:
+        angle = cv2.minAreaRect(coords)[-1]
+        angle = -(90 + angle) if angle < -45 else -angle
+        if abs(angle) > 0.5:
+            (h, w) = denoised.shape
+            M = cv2.getRotationMatrix2D((w // 2, h // 2), angle, 1.0)
+            denoised = cv2.warpAffine(denoised, M, (w, h), flags=cv2.INTER_CUBIC,
+                                      borderMode=cv2.BORDER_REPLICATE)
+    return denoised
+
+
+def best_of(fn, page, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(page)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--angle', type=float, default=3.0)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    for noise in (0.0, 5.0, 15.0):
+        page = synthetic_scan(args.angle, noise)
+        legacy_seconds = best_of(legacy, page, args.repeat)
+        pipeline_seconds = best_of(preprocess, page, args.repeat)
+        _, info = preprocess(page)
+        print(f"noise {noise:4.1f}: legacy {legacy_seconds * 1000:8.1f} ms  "
+              f"pipeline {pipeline_seconds * 1000:7.1f} ms  "
+              f"({legacy_seconds / pipeline_seconds:.1f}x)  "
+              f"denoise={info['denoise']} est_noise={info['noise']} angle={info['angle']}")
+        print("            stages (ms): " + ", ".join(f"{k}={v}" for k, v in info['timings'].items()))
+
+
+if __name__ == '__main__':
+    main()
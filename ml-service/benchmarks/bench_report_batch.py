@@ -0,0 +1,81 @@
+"""
+Benchmark batch report analysis against per-patient evaluate_metrics
+
+Generates --patients synthetic patients with --metrics catalogued lab
+values each (about 10% missing), plus sex and age, then scores them:
+"loop" calls ReportAnalyzer.evaluate_metrics once per patient (what a
+caller of analyze_from_metrics has to do today); "batch" passes the whole
+population as columns to ReportAnalyzer.analyze_batch. Risk levels from
+both are checked to agree.
+
+Usage (from ml-service/):
+    python benchmarks/bench_report_batch.py [--patients 10000] [--metrics 12]
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.models.report_analyzer import ReportAnalyzer
+
+
+def synthetic_population(analyzer, patients, metrics, seed=0):
+    rng = np.random.default_rng(seed)
+    catalogue = analyzer.catalogue
+    indices = rng.choice(len(catalogue.keys), size=min(metrics, len(catalogue.keys)), replace=False)
+
+    columns = {}
+    for i in indices:
+        low, high = catalogue.default_min[i], catalogue.default_max[i]
+        span = max(high - low, 1.0)
+        values = rng.uniform(low - 0.3 * span, high + 0.3 * span, size=patients).round(2)
+        values[rng.random(patients) < 0.1] = np.nan
+        columns[catalogue.keys[i]] = values
+
+    sex = rng.choice(np.array(['male', 'female', None], dtype=object), size=patients)
+    age = rng.integers(1, 90, size=patients).astype(float)
+    return columns, sex, age
+
+
+def time_loop(analyzer, columns, sex, age):
+    start = time.perf_counter()
+    risks = []
+    for p in range(len(age)):
+        metrics = {key: float(values[p]) for key, values in columns.items() if not np.isnan(values[p])}
+        risks.append(analyzer.evaluate_metrics(metrics, sex=sex[p], age=age[p])['overallRisk'])
+    return time.perf_counter() - start, risks
+
+
+def time_batch(analyzer, columns, sex, age):
+    start = time.perf_counter()
+    result = analyzer.analyze_batch(columns, sex=sex, age=age)
+    return time.perf_counter() - start, result['risk'].tolist()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--patients', type=int, default=10000)
+    parser.add_argument('--metrics', type=int, default=12)
+    args = parser.parse_args()
+
+    analyzer = ReportAnalyzer()
+    columns, sex, age = synthetic_population(analyzer, args.patients, args.metrics)
+    print(f"{args.patients} patients x {len(columns)} metrics")
+
+    loop_seconds, loop_risks = time_loop(analyzer, columns, sex, age)
+    batch_seconds, batch_risks = time_batch(analyzer, columns, sex, age)
+    if loop_risks != batch_risks:
+        mismatches = sum(a != b for a, b in zip(loop_risks, batch_risks))
+        sys.exit(f"risk levels disagree for {mismatches} patient(s)")
+
+    for name, seconds in (('loop', loop_seconds), ('batch', batch_seconds)):
+        print(f"{name:>6}: {seconds * 1000:9.1f} ms  {args.patients / seconds:12.0f} patients/s")
+    print(f"speedup: {loop_seconds / batch_seconds:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
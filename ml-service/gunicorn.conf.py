@@ -0,0 +1,61 @@
+"""
+MediBytes ML Service - Production Server Configuration
+    gunicorn -c gunicorn.conf.py run:app
+
+Pre-forks ML_WORKERS processes. The app is not preloaded, so each worker
+imports it after fork and loads its own DocTR model (in the background;
+/api/health answers 503 until it is warm). Each worker is pinned to its own
+slice of CPUs and gets TORCH_THREADS = cores per worker, so workers do not
+compete for the same cores. Within a worker, ML_REQUEST_THREADS request
+threads feed the OCR micro-batcher.
+"""
+
+import os
+
+_cpus = sorted(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else list(range(os.cpu_count() or 1))
+
+bind = f"{os.environ.get('HOST', '0.0.0.0')}:{os.environ.get('PORT', '5000')}"
+workers = int(os.environ.get("ML_WORKERS", max(1, len(_cpus) // 4)))
+worker_class = "gthread"
+threads = int(os.environ.get("ML_REQUEST_THREADS", 8))
+preload_app = False
+
+# OCR + LLM requests can take minutes; model load happens off the request path
+timeout = int(os.environ.get("REQUEST_TIMEOUT", 180))
+graceful_timeout = 30
+
+pin_cpus = os.environ.get("ML_PIN_CPUS", "true").lower() == "true"
+torch_threads = int(os.environ.get("TORCH_THREADS", 0)) or max(1, len(_cpus) // workers)
+
+
+# CPU slices held by live workers, tracked in the master: a replacement
+# worker takes the lowest free slice, never one a live worker is pinned to
+_slots_in_use = set()
+
+
+def pre_fork(server, worker):
+    """Runs in the master; the slot is inherited by the forked worker"""
+    slot = min(set(range(len(_slots_in_use) + 1)) - _slots_in_use)
+    _slots_in_use.add(slot)
+    worker.cpu_slot = slot
+
+
+def child_exit(server, worker):
+    """Runs in the master once a worker has exited, freeing its slot"""
+    _slots_in_use.discard(getattr(worker, "cpu_slot", None))
+
+
+def post_fork(server, worker):
+    """Runs in the new worker before the app (and torch) is imported"""
+    # More workers than slices (TTIN) share the slices round-robin
+    slot = worker.cpu_slot % workers
+    if pin_cpus and hasattr(os, "sched_setaffinity") and len(_cpus) >= workers:
+        per_worker = len(_cpus) // workers
+        cores = _cpus[slot * per_worker:(slot + 1) * per_worker]
+        os.sched_setaffinity(0, cores)
+        server.log.info(f"Worker {worker.pid} pinned to CPUs {cores}")
+
+    threads_env = str(torch_threads)
+    os.environ["TORCH_THREADS"] = threads_env
+    os.environ["OMP_NUM_THREADS"] = threads_env
+    os.environ["MKL_NUM_THREADS"] = threads_env
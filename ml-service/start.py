@@ -87,7 +87,9 @@ def main():
     try:
         from app import create_app
         app = create_app()
-        app.run(host='0.0.0.0', port=5000, debug=True)
+        # The reloader would load the OCR model twice; the debugger only on request
+        debug = os.environ.get('FLASK_DEBUG', 'false').lower() == 'true'
+        app.run(host='0.0.0.0', port=5000, debug=debug, use_reloader=False, threaded=True)
     except KeyboardInterrupt:
         print("\n\n👋 Server stopped\n")
     except Exception as e:
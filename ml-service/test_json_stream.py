@@ -0,0 +1,55 @@
+"""
+Test script for JSONFieldStream: a streamed JSON answer must yield the
+same fields as parsing the whole answer, however it is chunked
+"""
+
+import json
+
+from app.utils.ollama_client import JSONFieldStream, parse_analysis
+
+ANSWER = '''```json
+{
+  "summary": "Glucose is high; \\"fasting\\" sample {not a brace}",
+  "glucose": 145.2,
+  "hba1c": 6.5e0,
+  "cholesterol": -12,
+  "abnormal": true,
+  "notes": null,
+  "concerns": ["Glucose 145.2 mg/dL", "HbA1c, borderline"],
+  "values": {"ldl": 130, "hdl": 40.5},
+  "risk_level": "medium"
+}
+```'''
+
+
+def stream_fields(answer, size):
+    stream = JSONFieldStream()
+    seen = []
+    for i in range(0, len(answer), size):
+        seen.extend(stream.feed(answer[i:i + size]))
+    return stream, seen
+
+
+def test_json_stream():
+    print("=" * 60)
+    print("🧪 Testing JSONFieldStream against json.loads")
+    print("=" * 60)
+
+    expected = parse_analysis(ANSWER)
+    assert expected == json.loads(ANSWER.strip('`').removeprefix('json'))
+
+    for size in (1, 2, 3, 7, len(ANSWER)):
+        stream, seen = stream_fields(ANSWER, size)
+        # Every field once, in order, and never a truncated value
+        assert seen == list(expected.items()), (size, seen)
+        assert stream.fields == expected
+        assert stream.closed
+        print(f"   ✅ {size}-character chunks: {len(seen)} fields")
+
+    print("\n" + "=" * 60)
+    print("✅ Test Complete")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    test_json_stream()
@@ -0,0 +1,36 @@
+"""
+Test script for metric extraction: report lines that have been read wrong
+before, with the readings the catalogue must take from them
+"""
+
+from app.models.metric_catalogue import get_catalogue
+
+CASES = [
+    ("Hemoglobin: 13.5 g/dL", [('hemoglobin', 13.5)]),
+    ("Glucose (Fasting): 110 mg/dL", [('glucose', 110)]),
+    ("Blood Pressure: 120/80 mmHg", [('blood_pressure_systolic', 120), ('blood_pressure_diastolic', 80)]),
+    # The 25 of the 25-OH qualifier is not the reading
+    ("Vitamin D 25-OH 30 ng/mL", [('vitamin_d', 30)]),
+    ("Vitamin D (25-OH): 30 ng/mL", [('vitamin_d', 30)]),
+    ("25-OH Vitamin D 30 ng/mL", [('vitamin_d', 30)]),
+]
+
+
+def test_metric_extraction():
+    print("=" * 60)
+    print("🧪 Testing metric extraction")
+    print("=" * 60)
+
+    catalogue = get_catalogue()
+    for line, expected in CASES:
+        found = [(catalogue.keys[i], value) for i, value, _ in catalogue.scan(line)]
+        assert found == expected, (line, found)
+        print(f"   ✅ {line!r}: {found}")
+
+    print("\n" + "=" * 60)
+    print("✅ Test Complete")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    test_metric_extraction()
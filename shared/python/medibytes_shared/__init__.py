@@ -0,0 +1,3 @@
+"""
+MediBytes shared Python code, used by both the backend and the ML service
+"""
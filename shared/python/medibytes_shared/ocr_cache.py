@@ -0,0 +1,128 @@
+"""
+MediBytes - OCR Result Cache
+One SQLite store of OCR output used by both the backend (Tesseract) and the
+ML service (DocTR). Point both services' OCR_CACHE_PATH at the same file and
+a document OCR'd by either one is not OCR'd again by the other.
+
+Rows are keyed by the SHA-256 of the document bytes and an engine tag of the
+form "<engine>-<version>[:<settings>]" (e.g. "tesseract-1:dpi=300:..." or
+"doctr-1:db_resnet50+crnn_vgg16_bn:straight"). A lookup prefers the caller's
+own tag; failing that it takes the newest result of a different engine, but
+never one of its own engine made with another version or other settings,
+since changing those is meant to invalidate old results.
+
+Calls block: the backend runs them with asyncio.to_thread (and does its
+single-flight with asyncio locks), the ML service calls them from request
+threads and uses single_flight.
+"""
+
+from typing import Dict, Any, Iterator, List, Optional
+from contextlib import contextmanager
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS ocr_results (
+    sha256 TEXT NOT NULL,
+    engine TEXT NOT NULL,
+    text TEXT NOT NULL,
+    pages TEXT,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (sha256, engine)
+)
+"""
+
+
+def document_hash(content: bytes) -> str:
+    """SHA-256 hex digest of the raw document bytes"""
+    return hashlib.sha256(content).hexdigest()
+
+
+def engine_name(engine: str) -> str:
+    """Engine of a tag without version and settings: "tesseract-1:dpi=300" -> "tesseract" """
+    return engine.split(":", 1)[0].rsplit("-", 1)[0]
+
+
+class OCRCache:
+    """
+    OCR text (and per-page detail where the engine stores it), safe to use
+    from threads and from several worker processes of both services at once
+    (SQLite WAL)
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+        self._local = threading.local()
+        self._locks: Dict[str, List[Any]] = {}
+        self._locks_guard = threading.Lock()
+
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        """
+        One connection per thread (and per process, since connections must
+        not be used across fork); SQLite connections are not shareable
+        """
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30)
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def get(self, sha256: str, engine: str) -> Optional[Dict[str, Any]]:
+        """
+        Cached result as {"text", "pages", "engine"}, or None
+        pages is None for engines that store text only; engine is the tag
+        the result was made with, which differs from the one asked for when
+        it comes from the other service's engine.
+        """
+        rows = self._connect().execute(
+            "SELECT engine, text, pages FROM ocr_results WHERE sha256 = ? ORDER BY created_at DESC",
+            (sha256,),
+        ).fetchall()
+
+        own = engine_name(engine)
+        row = next((row for row in rows if row[0] == engine), None)
+        if row is None:
+            row = next((row for row in rows if engine_name(row[0]) != own), None)
+        if row is None:
+            return None
+        return {"text": row[1], "pages": json.loads(row[2]) if row[2] else None, "engine": row[0]}
+
+    def put(self, sha256: str, engine: str, text: str, pages: Optional[list] = None) -> None:
+        """Store a result, replacing any previous one for the same key"""
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO ocr_results VALUES (?, ?, ?, ?, ?)",
+                (sha256, engine, text, json.dumps(pages) if pages is not None else None, time.time()),
+            )
+
+    @contextmanager
+    def single_flight(self, sha256: str, engine: str) -> Iterator[None]:
+        """
+        Serialise OCR of the same document within this process
+        Wrap get -> OCR -> put in it so concurrent requests for one document
+        wait for the first instead of OCR'ing it again.
+        """
+        key = f"{engine}:{sha256}"
+        with self._locks_guard:
+            entry = self._locks.setdefault(key, [threading.Lock(), 0])
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with self._locks_guard:
+                entry[1] -= 1
+                if entry[1] == 0:
+                    del self._locks[key]